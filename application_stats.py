@@ -0,0 +1,108 @@
+"""
+戰隊申請統計服務
+以 COUNT/GROUP BY 聚合查詢計算各狀態數量、每日申請量與審核積壓，結果短暫快取於內存，
+申請創建或審核後立即失效，儀表板不需載入任何申請記錄
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+APPLICATION_STATUSES = ('pending', 'approved', 'rejected')
+
+
+class ApplicationStatsService:
+    """申請統計（帶 TTL 的內存快取）"""
+
+    def __init__(self, db=None, ttl=None, days=14):
+        self._db = db
+        self.ttl = ttl if ttl is not None else float(os.getenv('APPLICATION_STATS_TTL', '30'))
+        self.days = days
+        self._cached = None
+        self._expires_at = 0.0
+        self._generation = 0  # 每次失效遞增，避免查詢期間失效的舊結果被寫回快取
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            from models import get_bot_database
+            self._db = get_bot_database()
+        return self._db
+
+    def invalidate(self):
+        """清除快取（申請創建、通過或拒絕後呼叫）"""
+        with self._lock:
+            self._cached = None
+            self._generation += 1
+
+    def get_stats(self):
+        """獲取申請統計（快取有效時不查詢資料庫）"""
+        now = time.monotonic()
+        cached = self._cached
+        if cached is not None and now < self._expires_at:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        generation = self._generation
+        stats = self._compute()
+        with self._lock:
+            if generation == self._generation:
+                self._cached = stats
+                self._expires_at = time.monotonic() + self.ttl
+        return stats
+
+    def _compute(self):
+        today = datetime.utcnow().date()
+        first_day = today - timedelta(days=self.days - 1)
+        status_counts, daily_counts, oldest_pending = self.db.get_application_stats(
+            datetime.combine(first_day, datetime.min.time())
+        )
+
+        counts = {status: status_counts.get(status, 0) for status in APPLICATION_STATUSES}
+        # 補齊沒有申請的日期
+        per_day = dict(daily_counts)
+        daily = [
+            {'date': str(day), 'count': per_day.get(str(day), 0)}
+            for day in (first_day + timedelta(days=offset) for offset in range(self.days))
+        ]
+        backlog_hours = None
+        if oldest_pending is not None:
+            backlog_hours = round((datetime.utcnow() - oldest_pending).total_seconds() / 3600, 1)
+
+        return {
+            'counts': counts,
+            'total': sum(status_counts.values()),
+            'daily': daily,
+            'backlog': {
+                'pending': counts['pending'],
+                'oldest_pending_at': oldest_pending.isoformat() if oldest_pending else None,
+                'oldest_pending_hours': backlog_hours
+            },
+            'generated_at': datetime.utcnow().isoformat()
+        }
+
+    def get_cache_info(self):
+        """獲取快取命中統計"""
+        return {'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
+
+
+_stats_service = None
+
+
+def get_application_stats_service():
+    """獲取申請統計服務（延遲初始化）"""
+    global _stats_service
+    if _stats_service is None:
+        _stats_service = ApplicationStatsService()
+    return _stats_service
+
+
+def invalidate_application_stats():
+    """使申請統計快取失效（服務尚未建立時無需處理）"""
+    if _stats_service is not None:
+        _stats_service.invalidate()
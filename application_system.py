@@ -7,30 +7,35 @@ import discord
 from discord.ext import commands
 import asyncio
 import logging
-from models import DatabaseManager, TeamApplication
+from repositories import get_application_repository
 from datetime import datetime
+from metrics import timed_event
+from member_index import MEMBER_STATUSES, UNAPPLIED
+from bulk_review import build_approval_embed, build_rejection_embed, build_report_embed, get_review_notifier, review_applications
 
 class ApplicationView(discord.ui.View):
     """申請表單視圖"""
     
-    def __init__(self, bot):
+    def __init__(self, bot, guild_id=None):
         super().__init__(timeout=300)  # 5分鐘超時
         self.bot = bot
-        self.db = DatabaseManager()
+        self.guild_id = guild_id  # 申請加入的伺服器
+        self.db = get_application_repository()
         
     @discord.ui.button(label='📝 填寫申請表', style=discord.ButtonStyle.green)
     async def apply_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """開啟申請表單"""
-        modal = ApplicationModal(self.bot, self.db)
+        modal = ApplicationModal(self.bot, self.db, self.guild_id)
         await interaction.response.send_modal(modal)
 
 class ApplicationModal(discord.ui.Modal):
     """申請表單彈窗"""
     
-    def __init__(self, bot, db):
+    def __init__(self, bot, db, guild_id=None):
         super().__init__(title="🎮 ɢʀᴠ戰隊申請表")
         self.bot = bot
         self.db = db
+        self.guild_id = guild_id
         
     # 遊戲ID輸入框
     game_id = discord.ui.TextInput(
@@ -51,15 +56,23 @@ class ApplicationModal(discord.ui.Modal):
     
     async def on_submit(self, interaction: discord.Interaction):
         """提交申請表單"""
+        # 申請所屬的伺服器：表單指定的伺服器，否則為提交所在的伺服器，再否則為與申請者唯一的共同伺服器
+        if self.guild_id is None:
+            if interaction.guild is not None:
+                self.guild_id = interaction.guild.id
+            elif len(interaction.user.mutual_guilds) == 1:
+                self.guild_id = interaction.user.mutual_guilds[0].id
+        
         # 創建申請記錄
-        app_id = self.db.add_application(
+        app_id = await self.db.add_application(
             user_id=str(interaction.user.id),
             username=interaction.user.name,
             display_name=interaction.user.display_name,
             game_id=self.game_id.value,
             avatar_url=interaction.user.avatar.url if interaction.user.avatar else None,
             photos=[],  # 稍後會更新照片
-            application_text=self.application_text.value
+            application_text=self.application_text.value,
+            guild_id=str(self.guild_id) if self.guild_id else None
         )
         
         # 提示用戶上傳照片
@@ -126,14 +139,7 @@ class ApplicationModal(discord.ui.Modal):
             logging.error(f"照片上傳過程發生錯誤: {e}")
         
         # 更新申請記錄中的照片
-        session = self.db.get_session()
-        try:
-            application = session.query(TeamApplication).filter_by(id=app_id).first()
-            if application:
-                application.application_photos = photos
-                session.commit()
-        finally:
-            session.close()
+        await self.db.update_application_photos(app_id, photos)
         
         # 通知申請完成
         final_embed = discord.Embed(
@@ -148,8 +154,12 @@ class ApplicationModal(discord.ui.Modal):
     
     async def notify_admins(self, app_id, user):
         """通知管理員有新申請"""
+        guild = self.bot.get_guild(self.guild_id) if self.guild_id else None
+        if guild is None:
+            logging.warning(f"申請 #{app_id} 無法確定所屬伺服器，未通知管理員")
+            return
+        
         # 尋找"申請"頻道
-        guild = self.bot.guilds[0]  # 假設機器人只在一個伺服器
         application_channel = discord.utils.get(guild.text_channels, name='申請')
         
         if application_channel:
@@ -162,29 +172,43 @@ class ApplicationModal(discord.ui.Modal):
             await application_channel.send(embed=embed)
 
 class ApplicationListView(discord.ui.View):
-    """申請列表視圖"""
+    """申請列表視圖（以 (created_at, id) 游標分頁，只保留當前頁的申請）"""
     
-    def __init__(self, applications, db, bot):
+    def __init__(self, db, bot, items_per_page=5):
         super().__init__(timeout=300)
-        self.applications = applications
         self.db = db
         self.bot = bot
         self.current_page = 0
-        self.items_per_page = 5
-        
-        # 添加申請項目按鈕
+        self.items_per_page = items_per_page
+        self.applications = []  # 當前頁的申請
+        self.has_prev = False
+        self.has_next = False
+        self.total = 0
+    
+    async def load_page(self, after=None, before=None):
+        """載入 after 之後或 before 之前的一頁申請並更新按鈕"""
+        applications, has_more = await self.db.get_pending_applications_page(
+            self.items_per_page, after=after, before=before
+        )
+        if before is not None and not applications:
+            # 前面的申請已被審核，回到第一頁
+            return await self.load_page()
+        
+        if before is not None:
+            self.has_prev, self.has_next = has_more, True
+        else:
+            self.has_prev, self.has_next = after is not None, has_more
+        self.applications = applications
+        self.total = await self.db.get_pending_count()
         self.update_buttons()
+        return applications
     
     def update_buttons(self):
         """更新按鈕列表"""
         self.clear_items()
         
-        start_idx = self.current_page * self.items_per_page
-        end_idx = start_idx + self.items_per_page
-        page_applications = self.applications[start_idx:end_idx]
-        
         # 為每個申請添加按鈕
-        for i, app in enumerate(page_applications):
+        for i, app in enumerate(self.applications):
             button = discord.ui.Button(
                 label=f"{app.display_name}",
                 style=discord.ButtonStyle.secondary,
@@ -194,17 +218,26 @@ class ApplicationListView(discord.ui.View):
             button.callback = self.create_application_callback(app)
             self.add_item(button)
         
-        # 分頁按鈕
-        if len(self.applications) > self.items_per_page:
-            if self.current_page > 0:
-                prev_button = discord.ui.Button(label="◀️ 上一頁", style=discord.ButtonStyle.primary, row=4)
-                prev_button.callback = self.prev_page
-                self.add_item(prev_button)
+        # 本頁批量審核按鈕
+        if self.applications:
+            approve_all_button = discord.ui.Button(label="✅ 接受本頁全部", style=discord.ButtonStyle.green, row=3)
+            approve_all_button.callback = self.approve_page
+            self.add_item(approve_all_button)
             
-            if (self.current_page + 1) * self.items_per_page < len(self.applications):
-                next_button = discord.ui.Button(label="▶️ 下一頁", style=discord.ButtonStyle.primary, row=4)
-                next_button.callback = self.next_page
-                self.add_item(next_button)
+            reject_all_button = discord.ui.Button(label="❌ 拒絕本頁全部", style=discord.ButtonStyle.red, row=3)
+            reject_all_button.callback = self.reject_page
+            self.add_item(reject_all_button)
+        
+        # 分頁按鈕
+        if self.has_prev:
+            prev_button = discord.ui.Button(label="◀️ 上一頁", style=discord.ButtonStyle.primary, row=4)
+            prev_button.callback = self.prev_page
+            self.add_item(prev_button)
+        
+        if self.has_next:
+            next_button = discord.ui.Button(label="▶️ 下一頁", style=discord.ButtonStyle.primary, row=4)
+            next_button.callback = self.next_page
+            self.add_item(next_button)
     
     def create_application_callback(self, application):
         """創建申請按鈕的回調函數"""
@@ -235,43 +268,161 @@ class ApplicationListView(discord.ui.View):
     
     async def prev_page(self, interaction):
         """上一頁"""
+        first = self.applications[0] if self.applications else None
         self.current_page = max(0, self.current_page - 1)
-        self.update_buttons()
+        if first is None or self.current_page == 0:
+            await self.load_page()
+        else:
+            await self.load_page(before=(first.created_at, first.id))
+        if not self.has_prev:
+            self.current_page = 0
         embed = self.create_list_embed()
         await interaction.response.edit_message(embed=embed, view=self)
     
     async def next_page(self, interaction):
         """下一頁"""
-        max_pages = (len(self.applications) - 1) // self.items_per_page
-        self.current_page = min(max_pages, self.current_page + 1)
-        self.update_buttons()
+        last = self.applications[-1] if self.applications else None
+        if last is not None:
+            self.current_page += 1
+            await self.load_page(after=(last.created_at, last.id))
         embed = self.create_list_embed()
         await interaction.response.edit_message(embed=embed, view=self)
     
+    async def review_page(self, interaction, status, reason=None):
+        """批量審核本頁所有申請，完成後重新載入列表"""
+        if not interaction.user.guild_permissions.manage_guild:
+            embed = discord.Embed(
+                title="❌ 權限不足",
+                description="您沒有審核申請的權限",
+                color=0xff0000
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        report = await review_applications(
+            get_review_notifier(self.bot), [app.id for app in self.applications], status,
+            interaction.user.id, reason, interaction.guild, db=self.db
+        )
+        await interaction.followup.send(embed=build_report_embed(report, status), ephemeral=True)
+        
+        self.current_page = 0
+        await self.load_page()
+        await interaction.edit_original_response(embed=self.create_list_embed(), view=self)
+    
+    async def approve_page(self, interaction):
+        """接受本頁全部申請"""
+        await self.review_page(interaction, 'approved')
+    
+    async def reject_page(self, interaction):
+        """拒絕本頁全部申請（先輸入拒絕原因）"""
+        if not interaction.user.guild_permissions.manage_guild:
+            await self.review_page(interaction, 'rejected')
+            return
+        await interaction.response.send_modal(BulkRejectReasonModal(self))
+    
     def create_list_embed(self):
         """創建列表嵌入式訊息"""
         embed = discord.Embed(
             title="📋 戰隊申請列表",
-            description=f"共 {len(self.applications)} 份待審核申請",
+            description=f"共 {self.total} 份待審核申請",
             color=0x0099ff
         )
         
-        start_idx = self.current_page * self.items_per_page
-        end_idx = start_idx + self.items_per_page
-        page_applications = self.applications[start_idx:end_idx]
-        
-        for app in page_applications:
+        for app in self.applications:
             embed.add_field(
                 name=f"#{app.id} - {app.display_name}",
                 value=f"🎮 {app.game_id}\n📅 {app.created_at.strftime('%m-%d %H:%M')}",
                 inline=True
             )
         
-        if len(self.applications) > self.items_per_page:
-            embed.set_footer(text=f"頁面 {self.current_page + 1}/{((len(self.applications) - 1) // self.items_per_page) + 1}")
+        if self.has_prev or self.has_next:
+            total_pages = max(1, (self.total - 1) // self.items_per_page + 1)
+            embed.set_footer(text=f"頁面 {self.current_page + 1}/{max(total_pages, self.current_page + 1)}")
         
         return embed
 
+class MemberStatusListView(discord.ui.View):
+    """按申請狀態列出伺服器成員的分頁視圖（從成員申請狀態索引讀取，每頁只取當前頁的成員）"""
+    
+    def __init__(self, guild, index, statuses, items_per_page=20):
+        super().__init__(timeout=300)
+        self.guild = guild
+        self.index = index
+        self.statuses = statuses
+        self.items_per_page = items_per_page
+        self.current_page = 0
+        self.member_ids = []
+        self.total = 0
+        self.load_page()
+    
+    def load_page(self):
+        """載入當前頁的成員並更新按鈕"""
+        self.member_ids, self.total = self.index.members(
+            self.guild.id, self.statuses, self.current_page * self.items_per_page, self.items_per_page
+        )
+        if not self.member_ids and self.current_page > 0:
+            # 成員已離開或狀態已變更，回到最後一頁
+            self.current_page = max(0, (self.total - 1) // self.items_per_page)
+            self.member_ids, self.total = self.index.members(
+                self.guild.id, self.statuses, self.current_page * self.items_per_page, self.items_per_page
+            )
+        self.update_buttons()
+    
+    @property
+    def total_pages(self):
+        return max(1, (self.total - 1) // self.items_per_page + 1)
+    
+    def update_buttons(self):
+        """更新分頁按鈕"""
+        self.clear_items()
+        if self.current_page > 0:
+            prev_button = discord.ui.Button(label="◀️ 上一頁", style=discord.ButtonStyle.primary)
+            prev_button.callback = self.prev_page
+            self.add_item(prev_button)
+        if self.current_page + 1 < self.total_pages:
+            next_button = discord.ui.Button(label="▶️ 下一頁", style=discord.ButtonStyle.primary)
+            next_button.callback = self.next_page
+            self.add_item(next_button)
+    
+    async def prev_page(self, interaction):
+        """上一頁"""
+        self.current_page = max(0, self.current_page - 1)
+        self.load_page()
+        await interaction.response.edit_message(embed=self.create_list_embed(), view=self)
+    
+    async def next_page(self, interaction):
+        """下一頁"""
+        self.current_page += 1
+        self.load_page()
+        await interaction.response.edit_message(embed=self.create_list_embed(), view=self)
+    
+    def create_list_embed(self):
+        """創建成員列表嵌入式訊息"""
+        labels = '、'.join(MEMBER_STATUSES[status] for status in self.statuses)
+        embed = discord.Embed(
+            title="⚠️ 未通過申請的成員",
+            description=f"共 {self.total} 位成員（{labels}）：\n\n",
+            color=0xffaa00
+        )
+        lines = []
+        for member_id in self.member_ids:
+            member = self.guild.get_member(member_id)
+            status = MEMBER_STATUSES[self.index.get_status(self.guild.id, member_id) or UNAPPLIED]
+            name = member.display_name if member else member_id
+            lines.append(f"• {name} (<@{member_id}>) - {status}")
+        embed.description += "\n".join(lines)
+        
+        counts = self.index.count(self.guild.id)
+        embed.add_field(
+            name="📊 統計",
+            value=" | ".join(f"{label} {counts[status]}" for status, label in MEMBER_STATUSES.items()),
+            inline=False
+        )
+        embed.add_field(name="建議操作", value="使用 `!要求申請 @成員` 要求特定成員補交申請", inline=False)
+        embed.set_footer(text=f"頁面 {self.current_page + 1}/{self.total_pages}")
+        return embed
+
 class ApplicationDetailView(discord.ui.View):
     """申請詳情和審核視圖"""
     
@@ -325,7 +476,7 @@ class ApplicationDetailView(discord.ui.View):
             return
         
         # 更新申請狀態
-        success = self.db.update_application_status(
+        success = await self.db.update_application_status(
             self.application.id, 
             'approved', 
             str(interaction.user.id)
@@ -335,12 +486,7 @@ class ApplicationDetailView(discord.ui.View):
             # 私信通知申請者
             try:
                 user = await self.bot.fetch_user(int(self.application.user_id))
-                embed = discord.Embed(
-                    title="🎉 恭喜！您的戰隊申請已通過！",
-                    description="歡迎加入 ɢʀᴠ 戰隊！\n\n請等待管理員邀請您進入戰隊伺服器。",
-                    color=0x00ff00
-                )
-                await user.send(embed=embed)
+                await user.send(embed=build_approval_embed())
             except:
                 pass
             
@@ -417,7 +563,7 @@ class RejectReasonModal(discord.ui.Modal):
     async def on_submit(self, interaction: discord.Interaction):
         """提交拒絕原因"""
         # 更新申請狀態
-        success = self.db.update_application_status(
+        success = await self.db.update_application_status(
             self.application.id,
             'rejected',
             str(interaction.user.id),
@@ -428,12 +574,7 @@ class RejectReasonModal(discord.ui.Modal):
             # 私信通知申請者
             try:
                 user = await self.bot.fetch_user(int(self.application.user_id))
-                embed = discord.Embed(
-                    title="😔 您的戰隊申請未通過審核",
-                    description=f"很抱歉，您的申請未能通過審核。\n\n**拒絕原因：**\n{self.reason.value}\n\n歡迎您改善後重新申請！",
-                    color=0xff0000
-                )
-                await user.send(embed=embed)
+                await user.send(embed=build_rejection_embed(self.reason.value))
             except:
                 pass
             
@@ -445,12 +586,31 @@ class RejectReasonModal(discord.ui.Modal):
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
+class BulkRejectReasonModal(discord.ui.Modal):
+    """批量拒絕原因輸入模態"""
+    
+    def __init__(self, list_view):
+        super().__init__(title=f"❌ 拒絕本頁 {len(list_view.applications)} 份申請")
+        self.list_view = list_view
+    
+    reason = discord.ui.TextInput(
+        label='拒絕原因',
+        placeholder='請輸入拒絕這些申請的原因...',
+        style=discord.TextStyle.paragraph,
+        required=True,
+        max_length=500
+    )
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        """提交拒絕原因"""
+        await self.list_view.review_page(interaction, 'rejected', self.reason.value)
+
 def setup_application_system(bot):
     """設置申請系統事件處理"""
-    db = DatabaseManager()
-    
-    @bot.event
-    async def on_member_join(member):
+    # 使用 listen 而非 event，避免覆蓋 bot.py 中發送歡迎訊息的 on_member_join
+    @bot.listen('on_member_join')
+    @timed_event('on_member_join:application')
+    async def send_application_form(member):
         """新成員加入時顯示申請表單"""
         embed = discord.Embed(
             title="🎮 歡迎來到 ɢʀᴠ 戰隊！",
@@ -464,7 +624,7 @@ def setup_application_system(bot):
         )
         embed.set_footer(text="感謝您的理解與配合！")
         
-        view = ApplicationView(bot)
+        view = ApplicationView(bot, member.guild.id)
         
         try:
             await member.send(embed=embed, view=view)
@@ -0,0 +1,4 @@
+"""
+效能基準測試套件（離線執行）
+在專案根目錄執行：python -m benchmarks.<模組名稱>
+"""
@@ -0,0 +1,125 @@
+"""
+戰隊申請查詢基準測試
+在臨時 SQLite 資料庫中寫入大量申請記錄，先移除索引模擬遷移前的資料庫，
+再套用遷移，比較 get_pending_applications 與按用戶查詢的耗時
+
+用法：python -m benchmarks.bench_applications [--rows 1000000] [--pending-ratio 0.005] [--lookups 200]
+"""
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+BATCH_SIZE = 50000
+
+
+def seed(engine, table, rows, pending_ratio, rng):
+    """批量寫入申請記錄（核心層 executemany，不經過 ORM）"""
+    base_time = datetime(2024, 1, 1)
+    statuses = ('approved', 'rejected')
+    with engine.begin() as connection:
+        for offset in range(0, rows, BATCH_SIZE):
+            batch = []
+            for i in range(offset, min(rows, offset + BATCH_SIZE)):
+                status = 'pending' if rng.random() < pending_ratio else rng.choice(statuses)
+                batch.append({
+                    'user_id': str(100000000000000000 + i),
+                    'username': f'user{i}',
+                    'display_name': f'User {i}',
+                    'game_id': f'game{i}',
+                    'application_photos': [],
+                    'status': status,
+                    'created_at': base_time + timedelta(seconds=i),
+                })
+            connection.execute(insert(table), batch)
+
+
+def drop_indexes(engine):
+    """移除索引與遷移記錄，模擬只用 create_all 建立的舊資料庫"""
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX IF EXISTS ix_team_applications_status_created_at'))
+        connection.execute(text('DROP INDEX IF EXISTS ix_team_applications_status_created_id'))
+        connection.execute(text('DROP INDEX IF EXISTS ix_team_applications_user_id_status'))
+        connection.execute(text('DELETE FROM schema_migrations'))
+
+
+def time_calls(func, args_list):
+    """執行並返回每次呼叫的耗時（毫秒）"""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def measure(db, user_ids, repeats):
+    """量測待審核列表與按用戶查詢"""
+    pending = time_calls(db.get_pending_applications, [()] * repeats)
+    by_user = time_calls(db.get_application_by_user_id, [(user_id,) for user_id in user_ids])
+    return {
+        '待審核列表 (get_pending_applications)': statistics.median(pending),
+        '按用戶查詢 (get_application_by_user_id)': statistics.median(by_user),
+    }
+
+
+def run(rows, pending_ratio, lookups, repeats, seed_value=42):
+    from models import DatabaseManager, TeamApplication
+    from migrations import upgrade
+
+    rng = random.Random(seed_value)
+    db = DatabaseManager()
+    engine = db.engine
+
+    drop_indexes(engine)
+    start = time.perf_counter()
+    seed(engine, TeamApplication.__table__, rows, pending_ratio, rng)
+    print(f'寫入 {rows:,} 筆申請耗時 {time.perf_counter() - start:.1f} 秒')
+
+    pending_count = len(db.get_pending_applications())
+    user_ids = [str(100000000000000000 + rng.randrange(rows)) for _ in range(lookups)]
+    print(f'待審核申請: {pending_count:,} 筆, 按用戶查詢: {lookups} 次, 列表查詢: {repeats} 次')
+
+    before = measure(db, user_ids, repeats)
+
+    start = time.perf_counter()
+    applied = upgrade(engine)
+    print(f'套用遷移 {applied} 耗時 {time.perf_counter() - start:.1f} 秒')
+    with engine.begin() as connection:
+        connection.execute(text('ANALYZE'))
+
+    after = measure(db, user_ids, repeats)
+
+    print(f'{"查詢":<42}{"遷移前 (ms)":>14}{"遷移後 (ms)":>14}{"加速":>10}')
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float('inf')
+        print(f'{name:<42}{before[name]:>14.3f}{after[name]:>14.3f}{speedup:>9.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='戰隊申請查詢基準測試')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--pending-ratio', type=float, default=0.005)
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    db_dir = tempfile.mkdtemp(prefix='grv_bench_')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(db_dir, "applications.db")}'
+    try:
+        run(args.rows, args.pending_ratio, args.lookups, args.repeats)
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
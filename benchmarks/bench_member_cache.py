@@ -0,0 +1,73 @@
+"""
+成員快取內存基準測試
+在離線的假伺服器中載入大量成員，以 tracemalloc 量測成員快取實際佔用的內存，
+並與 /api/bot/status 回報的取樣估算值比較，同時量測估算本身的耗時（中位數）
+
+用法：python -m benchmarks.bench_member_cache [--members 50000] [--repeats 10]
+"""
+
+import argparse
+import logging
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.fake_discord import build_offline_bot, member_payload, prepare_environment, user_payload
+
+
+def add_members(guild, count):
+    """加入成員（一半有全域顯示名稱，三分之一有伺服器暱稱）"""
+    import discord
+
+    state = guild._state
+    for i in range(count):
+        name = f'member{i}'
+        data = {
+            'user': {**user_payload(10 ** 6 + i, name), 'global_name': name.title() if i % 2 else None},
+            **member_payload(),
+            'nick': f'[GRV]{name}' if i % 3 == 0 else None
+        }
+        guild._add_member(discord.Member(data=data, guild=guild, state=state))
+
+
+def run(member_count, repeats):
+    from member_cache import estimate_member_bytes
+
+    _, guild, _, _ = build_offline_bot()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    add_members(guild, member_count)
+    load_ms = (time.perf_counter() - start) * 1000
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    actual = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        members, estimated = estimate_member_bytes([guild])
+        samples.append((time.perf_counter() - start) * 1000)
+    estimate_ms = statistics.median(samples)
+
+    print(f'載入 {members:,} 位成員耗時 {load_ms:.0f} ms（tracemalloc 下）')
+    print(f'{"":<12}{"總計 (MB)":>12}{"每位 (B)":>12}')
+    print(f'{"實際":<12}{actual / 2 ** 20:>12.1f}{actual // members:>12}')
+    print(f'{"估算":<12}{estimated / 2 ** 20:>12.1f}{estimated // members:>12}')
+    print(f'估算耗時 {estimate_ms:.2f} ms，估算值為實際的 {estimated / actual:.0%}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='成員快取內存基準測試')
+    parser.add_argument('--members', type=int, default=50000)
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    prepare_environment()
+    run(args.members, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
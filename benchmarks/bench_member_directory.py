@@ -0,0 +1,88 @@
+"""
+成員目錄搜尋基準測試
+在離線的假伺服器中載入大量成員，量測建立名稱索引的耗時，
+並比較索引搜尋與逐一走訪成員比對名稱的查詢耗時
+
+用法：python -m benchmarks.bench_member_directory [--members 50000] [--repeats 50]
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+
+from benchmarks.fake_discord import build_offline_bot, member_payload, prepare_environment, user_payload
+
+SYLLABLES = ('ka', 'ri', 'to', 'mo', 'na', 'shi', 'dra', 'gon', '龍', '戰', '神', 'pro', 'gg', 'xx')
+QUERIES = ('k', 'kari', 'dragon', '龍戰', 'ragonna', '[grv]', 'zzz')
+
+
+def add_members(guild, count, rng):
+    """加入隨機名稱的成員（部分有全域顯示名稱或伺服器暱稱）"""
+    import discord
+
+    state = guild._state
+    for i in range(count):
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + str(i % 97)
+        data = {
+            'user': {**user_payload(10 ** 6 + i, name), 'global_name': name.title() if i % 3 else None},
+            **member_payload(),
+            'nick': f'[GRV]{name}' if i % 5 == 0 else None
+        }
+        guild._add_member(discord.Member(data=data, guild=guild, state=state))
+
+
+def linear_search(guild, query, limit=20):
+    """逐一走訪成員比對名稱（沒有索引時的做法）"""
+    query = query.casefold()
+    results = []
+    for member in guild.members:
+        names = (member.name, member.global_name, member.nick)
+        if any(name and query in name.casefold() for name in names):
+            results.append(member.id)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def median_ms(func, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(member_count, repeats, seed=42):
+    from member_directory import MemberDirectory
+
+    _, guild, _, _ = build_offline_bot()
+    add_members(guild, member_count, random.Random(seed))
+
+    directory = MemberDirectory()
+    start = time.perf_counter()
+    directory.build_guild(guild)
+    print(f'建立 {member_count:,} 位成員的索引耗時 {(time.perf_counter() - start) * 1000:.0f} ms, {directory.get_stats()}')
+
+    print(f'{"查詢":<12}{"走訪 (ms)":>12}{"索引 (ms)":>12}{"加速":>10}')
+    for query in QUERIES:
+        linear = median_ms(lambda: linear_search(guild, query), repeats)
+        indexed = median_ms(lambda: directory.search(query), repeats)
+        print(f'{query:<12}{linear:>12.3f}{indexed:>12.3f}{linear / indexed:>9.0f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='成員目錄搜尋基準測試')
+    parser.add_argument('--members', type=int, default=50000)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    prepare_environment()
+    run(args.members, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+on_message 吞吐量基準測試
+以假網關與假 HTTP 層建立 DiscordBot，將生成的訊息送入 on_message（含 process_commands），
+分別報告一般聊天、敏感詞命中、提及機器人與前綴指令的吞吐量與 p50/p99 延遲
+
+用法：python -m benchmarks.bench_on_message [--messages 5000] [--words 2000]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import shutil
+import string
+import time
+
+from benchmarks.fake_discord import BOT_USER_ID, build_offline_bot, make_message, prepare_environment
+
+CHAT_SAMPLES = [
+    '今天晚上有人要一起打排位嗎',
+    'gg 剛剛那場太扯了',
+    'ɢʀᴠ 戰隊加油！！',
+    'anyone up for a match tonight?',
+    '我等等上線，先吃飯',
+    'lol that clutch was insane',
+]
+
+
+def percentile(samples, pct):
+    """計算百分位數（samples 必須已排序）"""
+    index = min(len(samples) - 1, int(len(samples) * pct / 100))
+    return samples[index]
+
+
+def build_mixes(state, channel, count, words, prefix, rng):
+    """生成四種訊息組合"""
+    def author():
+        return rng.randint(1, 5000)
+
+    def chat_text():
+        return f'{rng.choice(CHAT_SAMPLES)} {"".join(rng.choice(string.ascii_lowercase) for _ in range(8))}'
+
+    return {
+        '一般聊天': [make_message(state, channel, chat_text(), author()) for _ in range(count)],
+        '敏感詞命中': [
+            make_message(state, channel, f'{chat_text()} {rng.choice(words)}', author())
+            for _ in range(count)
+        ],
+        '提及機器人': [
+            make_message(state, channel, f'<@{BOT_USER_ID}> {chat_text()}', author(), mention_bot=True)
+            for _ in range(count)
+        ],
+        '前綴指令': [make_message(state, channel, f'{prefix}hello', author()) for _ in range(count)],
+    }
+
+
+async def run_mix(on_message, messages):
+    """依序送入訊息並記錄每則處理延遲（微秒）"""
+    samples = []
+    start_total = time.perf_counter()
+    for message in messages:
+        start = time.perf_counter()
+        await on_message(message)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    total = time.perf_counter() - start_total
+    # 讓排程中的背景任務（審核佇列、錯誤處理）完成
+    await asyncio.sleep(0)
+    samples.sort()
+    return len(messages) / total, percentile(samples, 50), percentile(samples, 99)
+
+
+async def run(message_count, word_count, seed=42):
+    """執行所有訊息組合的基準測試"""
+    from word_filter import publish_words
+
+    rng = random.Random(seed)
+    discord_bot, guild, channel, fake_http = build_offline_bot()
+    discord_bot.moderation_queue.batch_window = 0
+    bot = discord_bot.bot
+
+    words = sorted({''.join(rng.choice(string.ascii_lowercase) for _ in range(10)) for _ in range(word_count)})
+    publish_words([(None, word) for word in words])
+
+    mixes = build_mixes(bot._connection, channel, message_count, words, discord_bot.config.COMMAND_PREFIX, rng)
+
+    # 預熱
+    for message in mixes['一般聊天'][:100]:
+        await bot.on_message(message)
+
+    print(f'訊息數量: 每組 {message_count}, 敏感詞數量: {len(words)}')
+    print(f'{"組合":<10}{"吞吐量 (訊息/秒)":>18}{"p50 (µs)":>12}{"p99 (µs)":>12}')
+    for name, messages in mixes.items():
+        throughput, p50, p99 = await run_mix(bot.on_message, messages)
+        print(f'{name:<10}{throughput:>18,.0f}{p50:>12.1f}{p99:>12.1f}')
+
+    await asyncio.sleep(0.1)
+    print(f'假 HTTP 呼叫次數: {fake_http.calls}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='on_message 吞吐量基準測試')
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=2000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    db_dir = prepare_environment()
+    try:
+        asyncio.run(run(args.messages, args.words))
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+SQLite 讀寫混合吞吐量基準測試
+以多個線程同時讀寫同一個 SQLite 檔案（模擬網站線程與機器人事件循環），
+比較預設設置與生產模式（WAL、PRAGMA、單一寫入線程）的吞吐量、延遲與鎖定錯誤
+
+用法：python -m benchmarks.bench_sqlite [--seconds 5] [--readers 4] [--writers 2] [--rows 10000]
+"""
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.bench_applications import seed
+
+
+def percentile(samples, pct):
+    """計算百分位數（samples 必須已排序）"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(len(samples) * pct / 100))
+    return samples[index]
+
+
+def worker(db, rows, deadline, is_writer, results, seed_value):
+    """持續執行讀取或寫入直到截止時間"""
+    rng = random.Random(seed_value)
+    latencies = []
+    errors = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if is_writer:
+                if rng.random() < 0.5:
+                    db.add_application(str(rng.randrange(10 ** 17)), 'bench', 'Bench', 'game', None, [])
+                else:
+                    db.update_application_status(rng.randrange(1, rows + 1), rng.choice(('approved', 'rejected')), 'bench')
+            else:
+                if rng.random() < 0.5:
+                    db.get_application_by_id(rng.randrange(1, rows + 1))
+                else:
+                    db.get_application_by_user_id(str(100000000000000000 + rng.randrange(rows)))
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    results.append((is_writer, latencies, errors))
+
+
+def run_mode(name, production, db_dir, args):
+    """以指定模式建立資料庫並執行讀寫混合負載"""
+    from models import DatabaseManager, TeamApplication
+
+    os.environ['SQLITE_PRODUCTION_MODE'] = 'true' if production else 'false'
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(db_dir, name + ".db")}'
+    db = DatabaseManager()
+    seed(db.engine, TeamApplication.__table__, args.rows, 0.01, random.Random(1))
+
+    results = []
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=worker, args=(db, args.rows, deadline, i < args.writers, results, i))
+        for i in range(args.writers + args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    row = [name]
+    for is_writer in (False, True):
+        latencies = sorted(sample for writer, samples, _ in results if writer == is_writer for sample in samples)
+        errors = sum(count for writer, _, count in results if writer == is_writer)
+        row.append((len(latencies) / args.seconds, percentile(latencies, 50), percentile(latencies, 99), errors))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite 讀寫混合吞吐量基準測試')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    db_dir = tempfile.mkdtemp(prefix='grv_bench_')
+    try:
+        rows = [run_mode('預設', False, db_dir, args), run_mode('生產模式', True, db_dir, args)]
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    print(f'讀取線程: {args.readers}, 寫入線程: {args.writers}, 每種模式 {args.seconds:g} 秒')
+    print(f'{"模式":<8}{"":>4}{"次/秒":>10}{"p50 (ms)":>10}{"p99 (ms)":>10}{"鎖定錯誤":>10}')
+    for name, reads, writes in rows:
+        for label, (throughput, p50, p99, errors) in (('讀取', reads), ('寫入', writes)):
+            print(f'{name:<8}{label:>4}{throughput:>10,.0f}{p50:>10.2f}{p99:>10.2f}{errors:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+敏感詞過濾基準測試
+測量正規化 + 匹配的單訊息耗時，超出時間預算時以非零狀態碼結束
+
+用法：python -m benchmarks.bench_word_filter [--words 3000] [--messages 20000] [--budget-us 250]
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+
+from text_normalizer import normalize_text
+from word_filter import FilterSnapshot
+
+# 生成訊息時使用的字元：ASCII、中文與各種繞過過濾的變形字元
+MIXED_CHARS = string.ascii_letters + ' ' * 8 + '戰隊說話遊戲時間們來' + 'ɢʀᴠＡＢＣ​'
+
+
+def generate_words(count, rng):
+    """生成隨機敏感詞"""
+    words = set()
+    while len(words) < count:
+        length = rng.randint(3, 10)
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    return sorted(words)
+
+
+def generate_messages(count, words, rng, hit_ratio=0.1, repeat_ratio=0.2):
+    """生成測試訊息（包含命中敏感詞與重複洗版訊息）"""
+    messages = []
+    for _ in range(count):
+        if messages and rng.random() < repeat_ratio:
+            messages.append(rng.choice(messages))
+            continue
+        length = rng.randint(10, 200)
+        text = ''.join(rng.choice(MIXED_CHARS) for _ in range(length))
+        if rng.random() < hit_ratio:
+            pos = rng.randint(0, len(text))
+            text = text[:pos] + rng.choice(words).upper() + text[pos:]
+        messages.append(text)
+    return messages
+
+
+def percentile(samples, pct):
+    """計算百分位數（samples 必須已排序）"""
+    index = min(len(samples) - 1, int(len(samples) * pct / 100))
+    return samples[index]
+
+
+def run(word_count, message_count, budget_us, seed=42):
+    """執行基準測試，返回是否在時間預算內"""
+    rng = random.Random(seed)
+    words = generate_words(word_count, rng)
+    messages = generate_messages(message_count, words, rng)
+
+    start = time.perf_counter()
+    snapshot = FilterSnapshot(1, [(None, word) for word in words])
+    build_ms = (time.perf_counter() - start) * 1000
+
+    normalize_text.cache_clear()
+    samples = []
+    hits = 0
+    for message in messages:
+        start = time.perf_counter()
+        if snapshot.find_all(message):
+            hits += 1
+        samples.append((time.perf_counter() - start) * 1_000_000)
+
+    samples.sort()
+    total_s = sum(samples) / 1_000_000
+    p50, p99 = percentile(samples, 50), percentile(samples, 99)
+    cache = normalize_text.cache_info()
+
+    print(f"敏感詞數量: {word_count}, 訊息數量: {message_count}")
+    print(f"匹配器建立時間: {build_ms:.1f} ms")
+    print(f"吞吐量: {message_count / total_s:,.0f} 訊息/秒, 命中 {hits} 則")
+    print(f"單訊息耗時 p50={p50:.1f}µs p99={p99:.1f}µs max={samples[-1]:.1f}µs (預算 p99 ≤ {budget_us}µs)")
+    print(f"正規化快取: 命中 {cache.hits}, 未命中 {cache.misses}")
+
+    if p99 > budget_us:
+        print("❌ 超出單訊息時間預算")
+        return False
+    print("✅ 在時間預算內")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='敏感詞過濾基準測試')
+    parser.add_argument('--words', type=int, default=3000)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--budget-us', type=float, default=250.0)
+    args = parser.parse_args()
+    ok = run(args.words, args.messages, args.budget_us)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
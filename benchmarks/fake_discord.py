@@ -0,0 +1,160 @@
+"""
+離線基準測試用的 Discord 假物件
+以真實的 discord.py 模型建立伺服器、頻道與訊息，並以假 HTTP 層取代網路請求
+"""
+
+import itertools
+import os
+import tempfile
+
+BOT_USER_ID = 900000000000000001
+GUILD_ID = 900000000000000100
+CHANNEL_ID = 900000000000000200
+TIMESTAMP = '2025-01-01T00:00:00+00:00'
+
+_snowflakes = itertools.count(910000000000000000)
+
+
+def next_snowflake():
+    """生成遞增的假 Snowflake ID"""
+    return next(_snowflakes)
+
+
+def user_payload(user_id, name):
+    """用戶資料"""
+    return {
+        'id': str(user_id),
+        'username': name,
+        'discriminator': '0',
+        'global_name': None,
+        'avatar': None,
+        'bot': user_id == BOT_USER_ID
+    }
+
+
+def member_payload():
+    """伺服器成員資料（不含 user 欄位）"""
+    return {'roles': [], 'joined_at': TIMESTAMP, 'deaf': False, 'mute': False, 'flags': 0}
+
+
+def guild_payload(member_count=1000):
+    """伺服器資料（一個 @everyone 角色、一個文字頻道）"""
+    return {
+        'id': str(GUILD_ID),
+        'name': 'ɢʀᴠ 基準測試伺服器',
+        'owner_id': str(BOT_USER_ID),
+        'member_count': member_count,
+        'roles': [{
+            'id': str(GUILD_ID), 'name': '@everyone', 'permissions': '0', 'position': 0,
+            'color': 0, 'hoist': False, 'managed': False, 'mentionable': False
+        }],
+        'channels': [{
+            'id': str(CHANNEL_ID), 'type': 0, 'name': 'general', 'position': 0,
+            'permission_overwrites': [], 'guild_id': str(GUILD_ID)
+        }],
+        'members': [],
+        'emojis': [],
+        'stickers': [],
+        'features': []
+    }
+
+
+class FakeHTTPClient:
+    """取代 discord.http.HTTPClient 中會發出網路請求的方法"""
+
+    def __init__(self, http):
+        self.calls = {}
+        self.bot_user = user_payload(BOT_USER_ID, 'grv-bot')
+        for name in ('send_message', 'edit_message', 'delete_message', 'delete_messages',
+                     'start_private_message', 'edit_member'):
+            setattr(http, name, getattr(self, name))
+
+    def _record(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _message(self, channel_id, params=None):
+        payload = getattr(params, 'payload', None) or {}
+        return {
+            'id': str(next_snowflake()), 'channel_id': str(channel_id), 'author': self.bot_user,
+            'content': payload.get('content') or '', 'timestamp': TIMESTAMP, 'edited_timestamp': None,
+            'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [],
+            'attachments': [], 'embeds': payload.get('embeds') or [], 'pinned': False, 'type': 0
+        }
+
+    async def send_message(self, channel_id, *, params):
+        self._record('send_message')
+        return self._message(channel_id, params)
+
+    async def edit_message(self, channel_id, message_id, *, params):
+        self._record('edit_message')
+        return self._message(channel_id, params)
+
+    async def delete_message(self, channel_id, message_id, *, reason=None):
+        self._record('delete_message')
+
+    async def delete_messages(self, channel_id, message_ids, *, reason=None):
+        self._record('delete_messages')
+
+    async def start_private_message(self, user_id):
+        self._record('start_private_message')
+        return {'id': str(next_snowflake()), 'type': 1, 'recipients': [user_payload(user_id, 'member')]}
+
+    async def edit_member(self, guild_id, user_id, *, reason=None, **fields):
+        self._record('edit_member')
+        return {'user': user_payload(user_id, 'member'), **member_payload()}
+
+
+def prepare_environment():
+    """設置離線運行所需的環境變數（假令牌、臨時 SQLite 資料庫）"""
+    os.environ.setdefault('DISCORD_TOKEN', 'offline-benchmark-token')
+    db_dir = tempfile.mkdtemp(prefix='grv-bench-')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(db_dir, "bench.db")}'
+    return db_dir
+
+
+def build_offline_bot():
+    """建立不連接網關的 DiscordBot，並載入一個假伺服器
+
+    返回 (discord_bot, guild, channel, fake_http)
+    """
+    import discord
+    from bot import DiscordBot
+
+    discord_bot = DiscordBot()
+    bot = discord_bot.bot
+    state = bot._connection
+    fake_http = FakeHTTPClient(bot.http)
+
+    state.user = discord.ClientUser(state=state, data=fake_http.bot_user)
+    guild = discord.Guild(data=guild_payload(), state=state)
+    state._add_guild(guild)
+    channel = guild.get_channel(CHANNEL_ID)
+    return discord_bot, guild, channel, fake_http
+
+
+def make_message(state, channel, content, author_id, mention_bot=False):
+    """建立一則真實的 discord.Message 物件"""
+    import discord
+
+    mentions = []
+    if mention_bot:
+        mentions.append({**user_payload(BOT_USER_ID, 'grv-bot'), 'member': member_payload()})
+    data = {
+        'id': str(next_snowflake()),
+        'channel_id': str(channel.id),
+        'guild_id': str(channel.guild.id),
+        'author': user_payload(author_id, f'user{author_id % 10000}'),
+        'member': member_payload(),
+        'content': content,
+        'timestamp': TIMESTAMP,
+        'edited_timestamp': None,
+        'tts': False,
+        'mention_everyone': False,
+        'mentions': mentions,
+        'mention_roles': [],
+        'attachments': [],
+        'embeds': [],
+        'pinned': False,
+        'type': 0
+    }
+    return discord.Message(state=state, channel=channel, data=data)
@@ -3,15 +3,26 @@ Discord Bot - 核心機器人類別
 包含機器人的主要功能和事件處理
 """
 
+import asyncio
+import time
 import discord
 from discord.ext import commands
 import logging
 import os
 import lavalink
 from config import Config
-from commands import setup_commands
+from commands import setup_commands, apply_timeout
 from application_system import setup_application_system
-from web_models import WelcomeSettings
+from repositories import run_db
+from welcome_cache import get_welcome_cache
+from member_index import get_member_index
+from member_directory import get_member_directory
+from member_cache import CHUNK_STARTUP, index_guild, member_cache_flags, setup_member_chunking
+from word_filter import get_snapshot, load_sensitive_words
+from moderation_queue import ModerationQueue
+from custom_commands import get_command_table, load_custom_commands
+from flood_detector import FloodDetector
+from metrics import setup_metrics, timed_event, observe_command
 
 class DiscordBot:
     def __init__(self):
@@ -20,6 +31,14 @@ class DiscordBot:
         self.config = Config()
         self.lavalink_active = False
         self.voice_clients = {}  # 存儲每個伺服器的語音客戶端
+        self.moderation_queue = ModerationQueue(self.config.MODERATION_BATCH_WINDOW)
+        self.punish_tasks = set()  # 進行中的防洗版處罰任務（保留引用，避免任務完成前被回收）
+        self.flood_detector = FloodDetector(
+            max_messages=self.config.FLOOD_MAX_MESSAGES,
+            interval=self.config.FLOOD_INTERVAL,
+            max_duplicates=self.config.FLOOD_MAX_DUPLICATES,
+            max_mentions=self.config.FLOOD_MAX_MENTIONS
+        )
         
         # 設置機器人意圖 (Intents)
         intents = discord.Intents.default()
@@ -29,16 +48,52 @@ class DiscordBot:
         intents.voice_states = True
         intents.members = True  # 必須啟用才能訪問成員列表
         
-        # 創建機器人實例
-        self.bot = commands.Bot(
+        # 成員快取：非 startup 模式不在就緒前分塊載入所有伺服器成員，由 member_cache 按需載入
+        cache_flags = member_cache_flags(self.config)
+        
+        # 創建機器人實例（分片模式下由 AutoShardedBot 管理多個網關連接）
+        bot_options = {
+            'member_cache_flags': cache_flags,
+            'chunk_guilds_at_startup': self.config.MEMBER_CHUNKING == CHUNK_STARTUP
+        }
+        if self.config.BOT_SHARDED:
+            bot_class = commands.AutoShardedBot
+            if self.config.SHARD_COUNT:
+                bot_options['shard_count'] = self.config.SHARD_COUNT
+            if self.config.SHARD_IDS:
+                bot_options['shard_ids'] = self.config.SHARD_IDS
+        else:
+            bot_class = commands.Bot
+        self.bot = bot_class(
             command_prefix=self.config.COMMAND_PREFIX,
             intents=intents,
-            help_command=None  # 禁用預設的help指令，我們會自己實現
+            help_command=None,  # 禁用預設的help指令，我們會自己實現
+            **bot_options
         )
         
+        # 載入敏感詞快照（訊息處理路徑只讀取內存中的快照）
+        try:
+            snapshot = load_sensitive_words()
+            self.logger.info(f'已載入 {len(snapshot.words)} 個全域敏感詞、{len(snapshot.guild_words)} 個伺服器自訂詞表 (版本 {snapshot.version})')
+        except Exception as e:
+            self.logger.warning(f'載入敏感詞失敗: {e}')
+        
+        # 載入自定義指令分派表
+        try:
+            table = load_custom_commands()
+            self.logger.info(f'已載入 {len(table)} 個自定義指令 (版本 {table.version})')
+        except Exception as e:
+            self.logger.warning(f'載入自定義指令失敗: {e}')
+        
         # 設置事件處理器
         self.setup_events()
         
+        # 設置效能指標（指令計時、網關延遲與事件循環延遲）
+        setup_metrics(self.bot)
+        
+        # 設置成員分塊（分塊耗時與成員快取內存指標）
+        self.member_chunker = setup_member_chunking(self.bot, self.config.MEMBER_CHUNKING, cache_flags)
+        
         # 設置指令
         setup_commands(self.bot)
         
@@ -68,11 +123,12 @@ class DiscordBot:
         """設置機器人事件處理器"""
         
         @self.bot.event
+        @timed_event('on_ready')
         async def on_ready():
             """機器人準備就緒時觸發"""
             self.logger.info(f'機器人 {self.bot.user} 已成功登入!')
             self.logger.info(f'機器人ID: {self.bot.user.id if self.bot.user else "未知"}')
-            self.logger.info(f'已連接到 {len(self.bot.guilds)} 個伺服器')
+            self.logger.info(f'已連接到 {len(self.bot.guilds)} 個伺服器（{self.bot.shard_count or 1} 個分片）')
             
             # 設置機器人狀態
             activity = discord.Game(name=self.config.BOT_STATUS)
@@ -95,12 +151,67 @@ class DiscordBot:
             # 列出所有連接的伺服器
             for guild in self.bot.guilds:
                 self.logger.info(f'已連接伺服器: {guild.name} (ID: {guild.id})')
+            
+            # 預先載入所有伺服器的歡迎設置
+            try:
+                loaded = await run_db(get_welcome_cache().warm, [guild.id for guild in self.bot.guilds])
+                self.logger.info(f'已預載 {loaded} 個伺服器的歡迎設置')
+            except Exception as e:
+                self.logger.warning(f'預載歡迎設置失敗: {e}')
+            
+            # 只為成員已全部載入的伺服器建立索引，其餘伺服器在分塊完成後建立
+            loaded_guilds = [guild for guild in self.bot.guilds if self.member_chunker.is_loaded(guild)]
+            self.logger.info(
+                f'成員分塊模式: {self.config.MEMBER_CHUNKING}，'
+                f'{len(loaded_guilds)}/{len(self.bot.guilds)} 個伺服器的成員已載入'
+            )
+            
+            # 建立成員申請狀態索引
+            try:
+                member_index = get_member_index()
+                await run_db(member_index.load_statuses)
+                indexed = sum(member_index.build_guild(guild) for guild in loaded_guilds)
+                self.logger.info(f'已建立 {indexed} 位成員的申請狀態索引')
+            except Exception as e:
+                self.logger.warning(f'建立成員申請狀態索引失敗: {e}')
+            
+            # 建立成員名稱搜尋索引
+            indexed = sum(get_member_directory().build_guild(guild) for guild in loaded_guilds)
+            self.logger.info(f'已建立 {indexed} 位成員的名稱搜尋索引')
+            
+            # 記錄啟動分塊耗時；lazy 模式開始在背景分塊其餘伺服器
+            self.member_chunker.on_ready()
+        
+        @self.bot.event
+        @timed_event('on_shard_ready')
+        async def on_shard_ready(shard_id):
+            """分片準備就緒時觸發（僅分片模式）"""
+            guild_count = sum(1 for guild in self.bot.guilds if guild.shard_id == shard_id)
+            self.logger.info(f'分片 {shard_id} 已就緒，負責 {guild_count} 個伺服器')
+        
+        @self.bot.event
+        @timed_event('on_shard_disconnect')
+        async def on_shard_disconnect(shard_id):
+            """分片斷線時觸發（僅分片模式）"""
+            self.logger.warning(f'分片 {shard_id} 已斷線，等待重新連接')
         
         @self.bot.event
+        @timed_event('on_shard_resumed')
+        async def on_shard_resumed(shard_id):
+            """分片恢復連線時觸發（僅分片模式）"""
+            self.logger.info(f'分片 {shard_id} 已恢復連線')
+        
+        @self.bot.event
+        @timed_event('on_guild_join')
         async def on_guild_join(guild):
             """機器人加入新伺服器時觸發"""
             self.logger.info(f'機器人已加入新伺服器: {guild.name} (ID: {guild.id})')
             
+            if self.member_chunker.is_loaded(guild):
+                index_guild(guild)
+            else:
+                self.member_chunker.schedule(guild)
+            
             # 尋找系統頻道或第一個文字頻道發送歡迎訊息
             channel = guild.system_channel
             if not channel:
@@ -122,26 +233,26 @@ class DiscordBot:
                     self.logger.warning(f'無法在 {guild.name} 的 {channel.name} 頻道發送歡迎訊息')
         
         @self.bot.event
+        @timed_event('on_guild_remove')
         async def on_guild_remove(guild):
             """機器人離開伺服器時觸發"""
             self.logger.info(f'機器人已離開伺服器: {guild.name} (ID: {guild.id})')
+            get_member_index().remove_guild(guild.id)
+            get_member_directory().remove_guild(guild.id)
+            self.member_chunker.forget(guild.id)
         
         @self.bot.event
+        @timed_event('on_member_join')
         async def on_member_join(member):
             """新成員加入伺服器時觸發"""
+            get_member_index().add_member(member)
+            get_member_directory().update_member(member)
+            
             try:
-                from web_models import get_web_database
-                web_db = get_web_database()
-                
-                # 獲取該伺服器的歡迎設置
-                session = web_db.get_session()
-                welcome_settings = session.query(WelcomeSettings).filter_by(
-                    guild_id=str(member.guild.id),
-                    is_enabled=True
-                ).first()
-                session.close()
+                # 獲取該伺服器的歡迎設置（讀穿透快取，已快取時不查詢資料庫）
+                welcome_settings = await get_welcome_cache().get_async(member.guild.id)
                 
-                if not welcome_settings:
+                if not welcome_settings or not welcome_settings.is_enabled:
                     return
                 
                 # 1. 自動改名
@@ -173,28 +284,62 @@ class DiscordBot:
                 self.logger.error(f"成員加入事件處理失敗: {e}")
         
         @self.bot.event
+        @timed_event('on_member_remove')
+        async def on_member_remove(member):
+            """成員離開伺服器時觸發"""
+            get_member_index().remove_member(member.guild.id, member.id)
+            get_member_directory().remove_member(member.guild.id, member.id)
+        
+        @self.bot.event
+        @timed_event('on_member_update')
+        async def on_member_update(before, after):
+            """成員資料變更時觸發（更新暱稱索引）"""
+            if before.nick != after.nick:
+                get_member_directory().update_member(after)
+        
+        @self.bot.event
+        @timed_event('on_user_update')
+        async def on_user_update(before, after):
+            """用戶資料變更時觸發（更新所有共同伺服器的名稱索引）"""
+            if before.name == after.name and before.global_name == after.global_name:
+                return
+            for guild in after.mutual_guilds:
+                member = guild.get_member(after.id)
+                if member is not None:
+                    get_member_directory().update_member(member)
+        
+        @self.bot.event
+        @timed_event('on_message')
         async def on_message(message):
             """收到訊息時觸發"""
             # 忽略機器人自己的訊息
             if message.author == self.bot.user:
                 return
             
-            # 記錄收到的訊息（僅在調試模式下）
-            if self.config.DEBUG:
-                self.logger.debug(f'收到訊息 - 使用者: {message.author}, 內容: {message.content}')
+            # 記錄收到的訊息（僅在調試等級下，可從網站面板即時切換）
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug('收到訊息 - 使用者: %s, 內容: %s', message.author, message.content)
             
             # 敏感詞過濾
             try:
-                from web_app import SENSITIVE_WORDS
-                content_lower = message.content.lower()
-                for word in SENSITIVE_WORDS:
-                    if word in content_lower:
-                        await message.delete()
-                        await message.author.send(f"⚠️ 訊息包含不允許的詞彙: {word}")
-                        return
+                guild_id = message.guild.id if message.guild else None
+                matched_words = get_snapshot().find_all(message.content, guild_id)
+                if matched_words:
+                    # 交給審核佇列批量刪除與合併警告，不在事件處理中逐一等待
+                    self.moderation_queue.enqueue(message, matched_words)
+                    return
             except Exception as e:
                 self.logger.debug(f'敏感詞過濾錯誤: {e}')
             
+            # 防洗版偵測
+            if self.config.FLOOD_ENABLED and message.guild and not message.author.bot:
+                flood_reason = self.flood_detector.check(message)
+                if flood_reason:
+                    task = asyncio.create_task(self.punish_flood(message.author, flood_reason))
+                    self.punish_tasks.add(task)
+                    task.add_done_callback(self.punish_tasks.discard)
+                    return
+            
             # 處理 @機器人 的訊息
             if self.bot.user and self.bot.user.mentioned_in(message) and not message.mention_everyone:
                 embed = discord.Embed(
@@ -204,10 +349,29 @@ class DiscordBot:
                 )
                 await message.channel.send(embed=embed)
             
+            # 處理自定義指令（內建指令優先；與內建指令一樣不回應其他機器人，避免機器人之間互相觸發）
+            prefix = self.config.COMMAND_PREFIX
+            if message.content.startswith(prefix) and not message.author.bot and len(get_command_table()):
+                parts = message.content[len(prefix):].split(maxsplit=1)
+                if parts and not self.bot.get_command(parts[0]):
+                    custom_command = get_command_table().get(parts[0])
+                    if custom_command:
+                        start = time.perf_counter()
+                        failed = False
+                        try:
+                            await message.channel.send(custom_command.template.render(message))
+                        except Exception:
+                            failed = True
+                            raise
+                        finally:
+                            observe_command(f'custom:{custom_command.name}', time.perf_counter() - start, failed)
+                        return
+            
             # 處理指令
             await self.bot.process_commands(message)
         
         @self.bot.event
+        @timed_event('on_command_error')
         async def on_command_error(ctx, error):
             """指令錯誤處理"""
             if isinstance(error, commands.CommandNotFound):
@@ -253,6 +417,7 @@ class DiscordBot:
                 await ctx.send(embed=embed)
         
         @self.bot.event
+        @timed_event('on_voice_state_update')
         async def on_voice_state_update(member, before, after):
             """機器人加入語音頻道時觸發警告訊息"""
             try:
@@ -286,6 +451,21 @@ class DiscordBot:
             except Exception as e:
                 self.logger.warning(f'語音狀態更新事件出錯: {str(e)}')
     
+    async def punish_flood(self, member, reason):
+        """對洗版成員執行自動禁言"""
+        if not isinstance(member, discord.Member):
+            return
+        permissions = member.guild_permissions
+        if permissions.administrator or permissions.moderate_members:
+            return
+        try:
+            await apply_timeout(member, self.config.FLOOD_TIMEOUT_MINUTES, f'自動防洗版: {reason}')
+            self.logger.info(f'已自動禁言 {member} ({reason})')
+        except discord.Forbidden:
+            self.logger.warning(f'無法禁言洗版成員 {member}，權限不足')
+        except Exception as e:
+            self.logger.warning(f'自動禁言失敗: {e}')
+    
     async def start_bot(self):
         """啟動機器人"""
         try:
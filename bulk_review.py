@@ -0,0 +1,252 @@
+"""
+Discord Bot - 戰隊申請批量審核
+以單一交易更新多份申請，再由限制並發數的發送器私信通知申請者並指派身分組，返回每份申請的處理結果
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+
+import discord
+
+from config import Config
+from member_cache import members_loaded
+from repositories import get_application_repository
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_REVIEW = 500  # 單次批量審核的申請數上限（限制 IN 查詢的參數數量與私信發送量）
+
+# 審核動作 -> 申請狀態
+REVIEW_ACTIONS = {
+    'approve': 'approved',
+    'reject': 'rejected',
+    '接受': 'approved',
+    '拒絕': 'rejected',
+}
+
+
+def build_approval_embed():
+    """申請通過的私信內容"""
+    return discord.Embed(
+        title="🎉 恭喜！您的戰隊申請已通過！",
+        description="歡迎加入 ɢʀᴠ 戰隊！\n\n請等待管理員邀請您進入戰隊伺服器。",
+        color=0x00ff00
+    )
+
+
+def build_rejection_embed(reason):
+    """申請被拒絕的私信內容"""
+    return discord.Embed(
+        title="😔 您的戰隊申請未通過審核",
+        description=f"很抱歉，您的申請未能通過審核。\n\n**拒絕原因：**\n{reason}\n\n歡迎您改善後重新申請！",
+        color=0xff0000
+    )
+
+
+class ReviewNotifier:
+    """限制並發數的審核結果發送器（遇到速率限制或伺服器錯誤時等待後重試）"""
+
+    def __init__(self, bot, concurrency=5, approved_role_id=0, max_retries=3):
+        self.bot = bot
+        self.concurrency = max(1, concurrency)
+        self.approved_role_id = approved_role_id
+        self.max_retries = max_retries
+
+    async def _with_retry(self, make_call):
+        """執行 Discord API 呼叫，429 與 5xx 錯誤時退避重試"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await make_call()
+            except discord.Forbidden:
+                raise
+            except discord.HTTPException as e:
+                if attempt == self.max_retries or not (e.status == 429 or e.status >= 500):
+                    raise
+                retry_after = getattr(e, 'retry_after', None) or 2 ** attempt
+                await asyncio.sleep(retry_after)
+
+    async def _resolve_user(self, guild, user_id):
+        member = guild.get_member(user_id) if guild else None
+        if member is None and guild is not None and not members_loaded(guild):
+            # 伺服器成員尚未分塊載入時向 Discord 查詢，不為單一成員載入整個伺服器
+            try:
+                member = await self._with_retry(lambda: guild.fetch_member(user_id))
+            except discord.NotFound:
+                member = None
+        if member is not None:
+            return member, member
+        user = self.bot.get_user(user_id)
+        if user is None:
+            user = await self._with_retry(lambda: self.bot.fetch_user(user_id))
+        return user, None
+
+    async def notify_one(self, application, status, reason, guild, role):
+        """通知單一申請者並指派身分組，返回結果"""
+        result = {
+            'id': application.id,
+            'user_id': application.user_id,
+            'display_name': application.display_name,
+            'status': status,
+            'dm': None,
+            'role': None,
+        }
+        try:
+            user, member = await self._resolve_user(guild, int(application.user_id))
+        except discord.HTTPException as e:
+            result['dm'] = 'failed'
+            result['error'] = f'找不到用戶: {e}'
+            return result
+
+        embed = build_approval_embed() if status == 'approved' else build_rejection_embed(reason or '未提供原因')
+        try:
+            await self._with_retry(lambda: user.send(embed=embed))
+            result['dm'] = 'sent'
+        except discord.Forbidden:
+            result['dm'] = 'closed'  # 用戶關閉了私信
+        except discord.HTTPException as e:
+            result['dm'] = 'failed'
+            result['error'] = str(e)
+
+        if status == 'approved' and role is not None:
+            if member is None:
+                result['role'] = 'not_member'
+            else:
+                try:
+                    await self._with_retry(lambda: member.add_roles(role, reason='戰隊申請已通過'))
+                    result['role'] = 'added'
+                except discord.HTTPException as e:
+                    result['role'] = 'failed'
+                    result['error'] = str(e)
+        return result
+
+    def resolve_guild(self, application, default=None):
+        """申請所屬的伺服器（舊記錄沒有伺服器ID時使用 default）"""
+        if application.guild_id:
+            return self.bot.get_guild(int(application.guild_id)) or default
+        return default
+
+    async def notify(self, applications, status, reason=None, guild=None):
+        """並發通知所有申請者（同時進行的數量不超過 concurrency），按輸入順序返回結果
+
+        每份申請在其所屬的伺服器指派身分組，沒有記錄伺服器的申請使用 guild
+        """
+        roles = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        def role_in(app_guild):
+            if app_guild is None or not self.approved_role_id:
+                return None
+            if app_guild.id not in roles:
+                roles[app_guild.id] = app_guild.get_role(self.approved_role_id)
+            return roles[app_guild.id]
+
+        async def bounded(application):
+            app_guild = self.resolve_guild(application, guild)
+            async with semaphore:
+                return await self.notify_one(application, status, reason, app_guild, role_in(app_guild))
+
+        return await asyncio.gather(*(bounded(application) for application in applications))
+
+
+_notifier = None
+
+
+def get_review_notifier(bot):
+    """獲取審核結果發送器（延遲初始化，使用機器人配置的並發數與身分組）"""
+    global _notifier
+    if _notifier is None or _notifier.bot is not bot:
+        config = Config()
+        _notifier = ReviewNotifier(bot, config.REVIEW_DM_CONCURRENCY, config.APPROVED_ROLE_ID)
+    return _notifier
+
+
+async def send_bulk_welcome(guild, applications):
+    """在歡迎頻道以一則訊息歡迎所有通過的新成員"""
+    welcome_channel = discord.utils.get(guild.text_channels, name='歡迎') if guild else None
+    if not welcome_channel or not applications:
+        return
+    names = '\n'.join(f'• **{application.display_name}**（🎮 {application.game_id}）' for application in applications[:30])
+    if len(applications) > 30:
+        names += f'\n…以及另外 {len(applications) - 30} 位'
+    embed = discord.Embed(
+        title="🎉 歡迎新戰隊成員！",
+        description=f"歡迎以下成員進入我們的戰隊~\n\n{names}\n\n**ɢʀᴠ** 期待你們的表演~ 🎮✨",
+        color=0x00ff00
+    )
+    embed.set_footer(text=f"加入時間: {datetime.now().strftime('%Y-%m-%d')}")
+    try:
+        await welcome_channel.send(embed=embed)
+    except discord.HTTPException as e:
+        logger.error(f"發送歡迎訊息失敗: {e}")
+
+
+def unsent_results(applications, status, dm):
+    """未發送通知時的處理結果（dm 為 skipped：機器人未連接；pending：仍在發送中）"""
+    return [{'id': application.id, 'user_id': application.user_id, 'display_name': application.display_name,
+             'status': status, 'dm': dm, 'role': None} for application in applications]
+
+
+def summarize(results, skipped):
+    """彙總批量審核結果"""
+    return {
+        'updated': len(results),
+        'skipped': skipped,
+        'dm_sent': sum(1 for item in results if item['dm'] == 'sent'),
+        'dm_closed': sum(1 for item in results if item['dm'] == 'closed'),
+        'dm_failed': sum(1 for item in results if item['dm'] == 'failed'),
+        'dm_pending': sum(1 for item in results if item['dm'] == 'pending'),
+        'roles_added': sum(1 for item in results if item['role'] == 'added'),
+        'results': results,
+    }
+
+
+async def notify_reviewed(notifier, applications, status, reason=None, guild=None):
+    """通知已審核的申請者，通過時另在各伺服器的歡迎頻道發送一則合併的歡迎訊息"""
+    results = await notifier.notify(applications, status, reason, guild)
+    if status == 'approved':
+        by_guild = {}
+        for application in applications:
+            by_guild.setdefault(notifier.resolve_guild(application, guild), []).append(application)
+        for app_guild, guild_applications in by_guild.items():
+            await send_bulk_welcome(app_guild, guild_applications)
+    return results
+
+
+async def review_applications(notifier, app_ids, status, reviewer_id, reason=None, guild=None, db=None):
+    """批量審核：單一交易更新狀態後通知申請者，返回彙總報告"""
+    db = db or get_application_repository()
+    applications, skipped = await db.bulk_update_application_status(app_ids, status, str(reviewer_id), reason)
+    logger.info(f'批量審核 {status}: 更新 {len(applications)} 份，跳過 {len(skipped)} 份')
+
+    results = await notify_reviewed(notifier, applications, status, reason, guild)
+    return summarize(results, skipped)
+
+
+def build_report_embed(report, status):
+    """將批量審核報告轉為 Discord 嵌入式訊息"""
+    action = '接受' if status == 'approved' else '拒絕'
+    embed = discord.Embed(
+        title=f"📋 批量{action}完成",
+        description=(
+            f"已{action} **{report['updated']}** 份申請"
+            + (f"，跳過 {len(report['skipped'])} 份（不存在或已審核）" if report['skipped'] else '')
+        ),
+        color=0x00ff00 if status == 'approved' else 0xff0000
+    )
+    embed.add_field(
+        name="📨 私信",
+        value=f"成功 {report['dm_sent']} | 關閉私信 {report['dm_closed']} | 失敗 {report['dm_failed']}",
+        inline=False
+    )
+    if status == 'approved':
+        embed.add_field(name="🏷️ 身分組", value=f"已指派 {report['roles_added']} 位", inline=False)
+
+    problems = [item for item in report['results'] if item['dm'] != 'sent' or item['role'] == 'failed']
+    if problems:
+        lines = [f"#{item['id']} {item['display_name']}: 私信 {item['dm']}"
+                 + (f"，身分組 {item['role']}" if item['role'] else '') for item in problems[:10]]
+        if len(problems) > 10:
+            lines.append(f"…還有 {len(problems) - 10} 份")
+        embed.add_field(name="⚠️ 需要注意", value='\n'.join(lines), inline=False)
+    return embed
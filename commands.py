@@ -9,8 +9,39 @@ import asyncio
 import random
 import time
 import logging
-from models import DatabaseManager
-from application_system import ApplicationListView
+from datetime import timedelta
+from repositories import get_application_repository
+from application_system import ApplicationListView, MemberStatusListView
+from member_index import UNAPPLIED, ensure_guild_index
+from bulk_review import MAX_BULK_REVIEW, REVIEW_ACTIONS, build_report_embed, get_review_notifier, review_applications
+
+# !檢查成員 的狀態篩選 -> 成員狀態
+MEMBER_STATUS_FILTERS = {
+    '全部': (UNAPPLIED, 'pending', 'rejected'),
+    'all': (UNAPPLIED, 'pending', 'rejected'),
+    '未申請': (UNAPPLIED,),
+    '待審核': ('pending',),
+    '已拒絕': ('rejected',),
+}
+
+async def apply_timeout(member, minutes, reason):
+    """禁言成員並私信通知（供指令與自動防洗版共用）"""
+    # 計算禁言結束時間
+    timeout_until = discord.utils.utcnow() + timedelta(minutes=minutes)
+    
+    # 執行禁言
+    await member.timeout(timeout_until, reason=reason)
+    
+    # 私信通知被禁言者
+    try:
+        embed_dm = discord.Embed(
+            title="🔇 您已被禁言",
+            description=f"您在 **{member.guild.name}** 戰隊被禁言 {minutes} 分鐘\n\n**原因:** {reason}",
+            color=0xffaa00
+        )
+        await member.send(embed=embed_dm)
+    except:
+        pass
 
 def setup_commands(bot):
     """設置所有機器人指令"""
@@ -291,7 +322,8 @@ def setup_commands(bot):
             )
             admin_commands = [
                 "`!申請` - 查看待審核申請",
-                "`!檢查成員` - 檢查未申請的成員",
+                "`!批量審核 <接受|拒絕> <ID…|全部> [| 原因]` - 批量審核申請",
+                "`!檢查成員 [未申請|待審核|已拒絕]` - 檢查未通過申請的成員",
                 "`!要求申請 @成員` - 要求成員補交申請",
                 "`!kick <成員> [原因]` - 踢出成員",
                 "`!ban <成員> [原因]` - 封鎖成員",
@@ -309,8 +341,9 @@ def setup_commands(bot):
     @commands.has_permissions(manage_guild=True)
     async def applications_command(ctx):
         """查看所有待審核申請（管理員專用）"""
-        db = DatabaseManager()
-        applications = db.get_pending_applications()
+        # 創建申請列表視圖（只載入第一頁）
+        view = ApplicationListView(get_application_repository(), bot)
+        applications = await view.load_page()
         
         if not applications:
             embed = discord.Embed(
@@ -321,12 +354,55 @@ def setup_commands(bot):
             await ctx.send(embed=embed)
             return
         
-        # 創建申請列表視圖
-        view = ApplicationListView(applications, db, bot)
         embed = view.create_list_embed()
         
         await ctx.send(embed=embed, view=view)
     
+    @bot.command(name='批量審核', aliases=['bulk_review'])
+    @commands.has_permissions(manage_guild=True)
+    async def bulk_review_command(ctx, action, *, targets):
+        """批量接受或拒絕申請，例如 `!批量審核 接受 12 13 20-45`、`!批量審核 拒絕 全部 | 原因`"""
+        status = REVIEW_ACTIONS.get(action.lower())
+        if status is None:
+            await ctx.send("❌ 審核動作只能是 `接受` 或 `拒絕`")
+            return
+        
+        targets, _, reason = targets.partition('|')
+        reason = reason.strip() or ('未提供原因' if status == 'rejected' else None)
+        
+        repository = get_application_repository()
+        tokens = targets.split()
+        if any(token.lower() in ('全部', 'all') for token in tokens):
+            app_ids = await repository.get_pending_application_ids(MAX_BULK_REVIEW)
+        else:
+            app_ids = []
+            try:
+                for token in tokens:
+                    start, _, end = token.partition('-')
+                    start, end = int(start), int(end or start)
+                    if end - start + 1 > MAX_BULK_REVIEW:
+                        await ctx.send(f"❌ 單一範圍最多 {MAX_BULK_REVIEW} 份申請：`{token}`")
+                        return
+                    app_ids.extend(range(start, end + 1))
+            except ValueError:
+                await ctx.send(f"❌ 無法解析申請ID：`{token}`")
+                return
+            if len(app_ids) > MAX_BULK_REVIEW:
+                await ctx.send(f"❌ 單次最多審核 {MAX_BULK_REVIEW} 份申請，請分批執行")
+                return
+        
+        if not app_ids:
+            await ctx.send("ℹ️ 沒有需要審核的申請")
+            return
+        
+        async with ctx.typing():
+            report = await review_applications(
+                get_review_notifier(bot), app_ids, status, ctx.author.id, reason, ctx.guild, db=repository
+            )
+        await ctx.send(embed=build_report_embed(report, status))
+        if len(app_ids) == MAX_BULK_REVIEW and any(token.lower() in ('全部', 'all') for token in tokens):
+            await ctx.send(f"ℹ️ 單次最多審核 {MAX_BULK_REVIEW} 份申請，如仍有待審核的申請請再次執行")
+    
     @bot.command(name='kick', aliases=['踢'])
     @commands.has_permissions(kick_members=True)
     async def kick_command(ctx, member: discord.Member, *, reason="未提供原因"):
@@ -465,23 +541,8 @@ def setup_commands(bot):
             return
         
         try:
-            # 計算禁言結束時間
-            from datetime import timedelta
-            timeout_until = discord.utils.utcnow() + timedelta(minutes=minutes)
-            
-            # 執行禁言
-            await member.timeout(timeout_until, reason=reason)
-            
-            # 私信通知被禁言者
-            try:
-                embed_dm = discord.Embed(
-                    title="🔇 您已被禁言",
-                    description=f"您在 **{ctx.guild.name}** 戰隊被禁言 {minutes} 分鐘\n\n**原因:** {reason}",
-                    color=0xffaa00
-                )
-                await member.send(embed=embed_dm)
-            except:
-                pass
+            # 執行禁言並私信通知被禁言者
+            await apply_timeout(member, minutes, reason)
             
             # 確認訊息
             embed = discord.Embed(
@@ -523,74 +584,42 @@ def setup_commands(bot):
     
     @bot.command(name='檢查成員', aliases=['check_members'])
     @commands.has_permissions(manage_guild=True)
-    async def check_members_command(ctx):
-        """檢查伺服器中未申請的成員"""
-        db = DatabaseManager()
+    async def check_members_command(ctx, status_filter='全部'):
+        """檢查伺服器中未通過申請的成員，可按狀態篩選：未申請、待審核、已拒絕、全部"""
+        statuses = MEMBER_STATUS_FILTERS.get(status_filter.lower())
+        if statuses is None:
+            await ctx.send(f"❌ 未知的狀態 `{status_filter}`，可用：{'、'.join(MEMBER_STATUS_FILTERS)}")
+            return
         
-        # 獲取所有已申請的用戶ID
-        session = db.get_session()
-        try:
-            approved_users = session.query(TeamApplication).filter_by(status='approved').all()
-            approved_user_ids = set(app.user_id for app in approved_users)
-        finally:
-            session.close()
-        
-        # 檢查伺服器成員
-        unchecked_members = []
-        for member in ctx.guild.members:
-            if (not member.bot and  # 不是機器人
-                str(member.id) not in approved_user_ids and  # 沒有通過申請
-                member != ctx.guild.owner):  # 不是伺服器擁有者
-                unchecked_members.append(member)
-        
-        if not unchecked_members:
+        # 從成員申請狀態索引讀取，只走訪符合狀態的成員
+        index = await ensure_guild_index(ctx.guild)
+        view = MemberStatusListView(ctx.guild, index, statuses)
+        
+        if not view.total:
             embed = discord.Embed(
                 title="✅ 檢查完成",
-                description="所有成員都已通過申請流程",
+                description="所有成員都已通過申請流程" if status_filter == '全部' else f"沒有{status_filter}的成員",
                 color=0x00ff00
             )
             await ctx.send(embed=embed)
             return
         
-        # 顯示未申請的成員
-        embed = discord.Embed(
-            title="⚠️ 未通過申請的成員",
-            description=f"發現 {len(unchecked_members)} 位成員尚未完成申請流程：",
-            color=0xffaa00
-        )
-        
-        member_list = []
-        for member in unchecked_members[:10]:  # 最多顯示10個
-            member_list.append(f"• {member.display_name} ({member.mention})")
-        
-        embed.add_field(name="成員列表", value="\n".join(member_list), inline=False)
-        
-        if len(unchecked_members) > 10:
-            embed.add_field(name="注意", value=f"還有 {len(unchecked_members) - 10} 位成員未顯示", inline=False)
-        
-        embed.add_field(name="建議操作", value="使用 `!要求申請 @成員` 要求特定成員補交申請", inline=False)
-        
-        await ctx.send(embed=embed)
+        await ctx.send(embed=view.create_list_embed(), view=view)
     
     @bot.command(name='要求申請', aliases=['require_application'])
     @commands.has_permissions(manage_guild=True)
     async def require_application_command(ctx, member: discord.Member):
         """要求特定成員補交申請"""
         # 檢查該成員是否已有申請記錄
-        db = DatabaseManager()
-        session = db.get_session()
-        try:
-            existing_app = session.query(TeamApplication).filter_by(user_id=str(member.id)).first()
-            if existing_app and existing_app.status == 'approved':
-                embed = discord.Embed(
-                    title="ℹ️ 成員已申請",
-                    description=f"{member.display_name} 已經通過申請審核",
-                    color=0x0099ff
-                )
-                await ctx.send(embed=embed)
-                return
-        finally:
-            session.close()
+        existing_app = await get_application_repository().get_application_by_user_id(member.id)
+        if existing_app and existing_app.status == 'approved':
+            embed = discord.Embed(
+                title="ℹ️ 成員已申請",
+                description=f"{member.display_name} 已經通過申請審核",
+                color=0x0099ff
+            )
+            await ctx.send(embed=embed)
+            return
         
         # 發送申請表單給該成員
         from application_system import ApplicationView
@@ -607,7 +636,7 @@ def setup_commands(bot):
         )
         embed.set_footer(text="請儘快完成申請，感謝配合！")
         
-        view = ApplicationView(bot)
+        view = ApplicationView(bot, ctx.guild.id)
         
         try:
             await member.send(embed=embed, view=view)
@@ -19,9 +19,35 @@ class Config:
         self.COMMAND_PREFIX = os.getenv('COMMAND_PREFIX', '!')
         self.BOT_STATUS = os.getenv('BOT_STATUS', '使用 !help 獲取幫助')
         
+        # 分片設置（啟用後使用 AutoShardedBot；分片數為 0 時使用 Discord 建議值，分片ID留空時運行所有分片）
+        self.BOT_SHARDED = os.getenv('BOT_SHARDED', 'False').lower() == 'true'
+        self.SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0'))
+        self.SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id.strip()]
+        
+        # 成員快取設置（分塊模式：startup 啟動時載入所有成員、lazy 就緒後在背景載入、on_demand 需要時才載入；
+        # joined 快取加入事件的成員，voice 快取語音頻道中的成員）
+        self.MEMBER_CHUNKING = os.getenv('MEMBER_CHUNKING', 'startup').lower()
+        self.MEMBER_CACHE_JOINED = os.getenv('MEMBER_CACHE_JOINED', 'True').lower() == 'true'
+        self.MEMBER_CACHE_VOICE = os.getenv('MEMBER_CACHE_VOICE', 'True').lower() == 'true'
+        
         # 公告頻道設置
         self.ANNOUNCEMENT_CHANNEL_ID = 1410846655980503040  # ɢʀᴠ戰隊群公告頻道（永久預設）
         
+        # 審核佇列設置（敏感詞命中後合併處理的等待秒數）
+        self.MODERATION_BATCH_WINDOW = float(os.getenv('MODERATION_BATCH_WINDOW', '1.0'))
+        
+        # 防洗版設置
+        self.FLOOD_ENABLED = os.getenv('FLOOD_ENABLED', 'False').lower() == 'true'
+        self.FLOOD_MAX_MESSAGES = int(os.getenv('FLOOD_MAX_MESSAGES', '6'))
+        self.FLOOD_INTERVAL = float(os.getenv('FLOOD_INTERVAL', '5'))
+        self.FLOOD_MAX_DUPLICATES = int(os.getenv('FLOOD_MAX_DUPLICATES', '3'))
+        self.FLOOD_MAX_MENTIONS = int(os.getenv('FLOOD_MAX_MENTIONS', '8'))
+        self.FLOOD_TIMEOUT_MINUTES = int(os.getenv('FLOOD_TIMEOUT_MINUTES', '10'))
+        
+        # 申請審核設置（通過後指派的身分組，0 表示不指派；批量審核私信的並發數）
+        self.APPROVED_ROLE_ID = int(os.getenv('APPROVED_ROLE_ID', '0'))
+        self.REVIEW_DM_CONCURRENCY = int(os.getenv('REVIEW_DM_CONCURRENCY', '5'))
+        
         # 日誌設置
         self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
         self.DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
@@ -38,6 +64,15 @@ class Config:
         
         if len(self.COMMAND_PREFIX) > 5:
             raise ValueError("指令前綴不能超過5個字符")
+        
+        if self.SHARD_IDS and not self.SHARD_COUNT:
+            raise ValueError("指定 SHARD_IDS 時必須同時設置 SHARD_COUNT")
+        
+        if any(shard_id >= self.SHARD_COUNT for shard_id in self.SHARD_IDS):
+            raise ValueError("SHARD_IDS 中的分片ID必須小於 SHARD_COUNT")
+        
+        if self.MEMBER_CHUNKING not in ('startup', 'lazy', 'on_demand'):
+            raise ValueError("MEMBER_CHUNKING 必須是 startup、lazy 或 on_demand")
     
     def get_all_settings(self):
         """獲取所有配置設置（隱藏敏感資訊）"""
@@ -46,5 +81,11 @@ class Config:
             'COMMAND_PREFIX': self.COMMAND_PREFIX,
             'BOT_STATUS': self.BOT_STATUS,
             'LOG_LEVEL': self.LOG_LEVEL,
-            'DEBUG': self.DEBUG
+            'DEBUG': self.DEBUG,
+            'BOT_SHARDED': self.BOT_SHARDED,
+            'SHARD_COUNT': self.SHARD_COUNT or '自動',
+            'SHARD_IDS': self.SHARD_IDS or '全部',
+            'MEMBER_CHUNKING': self.MEMBER_CHUNKING,
+            'MEMBER_CACHE_JOINED': self.MEMBER_CACHE_JOINED,
+            'MEMBER_CACHE_VOICE': self.MEMBER_CACHE_VOICE
         }
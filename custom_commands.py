@@ -0,0 +1,109 @@
+"""
+Discord Bot - 自定義指令引擎
+從資料庫載入網站面板設置的自定義指令，在內存中以指令名稱/別名查表分派
+"""
+
+import threading
+from string import Formatter
+
+# 回應模板中可使用的參數
+TEMPLATE_FIELDS = ('user', 'mention', 'server', 'channel')
+
+
+class ResponseTemplate:
+    """預先解析的回應模板，渲染時只需拼接字串"""
+
+    __slots__ = ('source', 'parts')
+
+    def __init__(self, source):
+        self.source = source
+        self.parts = []  # (文字, 參數名稱或None)
+        try:
+            for literal, field, _, _ in Formatter().parse(source):
+                if field is not None and field not in TEMPLATE_FIELDS:
+                    # 不支援的參數保持原樣輸出
+                    literal, field = literal + '{' + field + '}', None
+                self.parts.append((literal, field))
+        except ValueError:
+            # 括號不成對時視為純文字
+            self.parts = [(source, None)]
+
+    def render(self, message):
+        """以訊息內容填入參數"""
+        values = None
+        chunks = []
+        for literal, field in self.parts:
+            chunks.append(literal)
+            if field is not None:
+                if values is None:
+                    values = {
+                        'user': message.author.display_name,
+                        'mention': message.author.mention,
+                        'server': message.guild.name if message.guild else '',
+                        'channel': getattr(message.channel, 'name', '') or ''
+                    }
+                chunks.append(values[field])
+        return ''.join(chunks)
+
+
+class CustomCommand:
+    """單一自定義指令"""
+
+    __slots__ = ('id', 'name', 'aliases', 'description', 'template')
+
+    def __init__(self, command_id, name, aliases, description, response_text):
+        self.id = command_id
+        self.name = name
+        self.aliases = tuple(aliases or ())
+        self.description = description
+        self.template = ResponseTemplate(response_text)
+
+
+class CustomCommandTable:
+    """自定義指令分派表的不可變快照"""
+
+    __slots__ = ('version', 'commands', '_lookup')
+
+    def __init__(self, version, commands):
+        self.version = version
+        self.commands = tuple(commands)
+        self._lookup = {}
+        for command in self.commands:
+            for key in (command.name,) + command.aliases:
+                self._lookup.setdefault(key.lower(), command)
+
+    def get(self, name):
+        """以指令名稱或別名查找指令"""
+        return self._lookup.get(name.lower())
+
+    def __len__(self):
+        return len(self.commands)
+
+
+# 當前使用中的分派表；更新時整體替換引用，訊息處理路徑不需查詢資料庫
+_table = CustomCommandTable(0, ())
+_publish_lock = threading.Lock()
+
+
+def get_command_table():
+    """獲取當前的自定義指令分派表"""
+    return _table
+
+
+def publish_commands(commands):
+    """以新的指令列表建立下一版本分派表並原子替換"""
+    global _table
+    with _publish_lock:
+        _table = CustomCommandTable(_table.version + 1, commands)
+        return _table
+
+
+def load_custom_commands(web_db=None):
+    """從資料庫載入自定義指令並發布新分派表"""
+    if web_db is None:
+        from web_models import get_web_database
+        web_db = get_web_database()
+    return publish_commands(
+        CustomCommand(row.id, row.command_name, row.command_aliases, row.description, row.response_text)
+        for row in web_db.get_custom_commands()
+    )
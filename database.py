@@ -0,0 +1,240 @@
+"""
+資料庫引擎註冊表 - 整個進程共用的連接池
+機器人與網站的資料庫管理器按連接字串共用同一個引擎，表格只在首次取得引擎時創建
+SQLite 檔案資料庫預設啟用生產模式：WAL 與調整過的 PRAGMA，寫入經由單一寫入線程依序執行
+"""
+
+import functools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from migrations import upgrade
+
+# 無法使用的遠端資料庫（改用本地 SQLite）
+UNAVAILABLE_DATABASE_HOSTS = ('ep-ancient-waterfall',)
+
+_engines = {}  # 連接字串 -> 引擎
+_writers = {}  # 連接字串 -> SQLite 寫入線程
+_schemas = set()  # 已創建表格的 (連接字串, metadata ID)
+_lock = threading.Lock()
+
+
+def resolve_database_url(default_url):
+    """獲取資料庫連接字串（未設置或不可用時使用本地 SQLite）"""
+    database_url = os.getenv('DATABASE_URL', default_url)
+    if not database_url:
+        return default_url
+    if 'sqlite' not in database_url and any(host in database_url for host in UNAVAILABLE_DATABASE_HOSTS):
+        return default_url
+    return database_url
+
+
+class PoolStatistics:
+    """連接池的取得次數、等待時間與超時統計"""
+
+    __slots__ = ('checkouts', 'total_wait', 'max_wait', 'timeouts', '_lock')
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+
+
+class InstrumentedQueuePool(QueuePool):
+    """記錄取得連接等待時間的 QueuePool"""
+
+    def __init__(self, *args, statistics=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statistics = statistics or PoolStatistics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.statistics.record(0.0, timed_out=True)
+            raise
+        self.statistics.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # dispose() 會以 recreate() 重建連接池，統計需要沿用
+        pool = super().recreate()
+        pool.statistics = self.statistics
+        return pool
+
+
+def _is_sqlite_file(database_url):
+    return database_url.startswith('sqlite') and not (':memory:' in database_url or database_url.rstrip('/') == 'sqlite:')
+
+
+def sqlite_production_mode():
+    """是否啟用 SQLite 生產模式（WAL、PRAGMA 與單一寫入線程）"""
+    return os.getenv('SQLITE_PRODUCTION_MODE', 'true').lower() == 'true'
+
+
+def _sqlite_pragmas():
+    """每個新連接要設置的 PRAGMA"""
+    return (
+        ('journal_mode', 'WAL'),  # 讀取不會被寫入阻塞
+        ('synchronous', os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')),  # WAL 下 NORMAL 不會損壞資料庫
+        ('busy_timeout', int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))),
+        ('cache_size', -int(os.getenv('SQLITE_CACHE_SIZE_KB', '20000'))),  # 負數單位為 KiB
+        ('mmap_size', int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))),
+        ('temp_store', 'MEMORY'),
+    )
+
+
+def _configure_sqlite(engine):
+    """在每個新連接上設置 PRAGMA"""
+    pragmas = _sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+class SQLiteWriter:
+    """SQLite 單一寫入線程：寫入依序在同一線程執行，避免多個線程爭奪寫鎖"""
+
+    def __init__(self, name):
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """提交寫入並等待結果（在寫入線程內呼叫時直接執行）"""
+        if threading.current_thread() is self._thread:
+            return func(*args, **kwargs)
+        future = Future()
+        self._queue.put((future, time.perf_counter(), func, args, kwargs))
+        return future.result()
+
+    def _run(self):
+        while True:
+            future, queued_at, func, args, kwargs = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            wait = time.perf_counter() - queued_at
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            self.completed += 1
+
+    def get_stats(self):
+        return {
+            'depth': self._queue.qsize(),
+            'completed': self.completed,
+            'avg_wait_ms': round(self.total_wait / self.completed * 1000, 3) if self.completed else 0,
+            'max_wait_ms': round(self.max_wait * 1000, 3),
+        }
+
+
+def write_operation(func):
+    """資料庫管理器寫入方法的裝飾器：SQLite 生產模式下交給單一寫入線程執行"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        writer = _writers.get(self.database_url)
+        if writer is None:
+            return func(self, *args, **kwargs)
+        return writer.submit(func, self, *args, **kwargs)
+    return wrapper
+
+
+def _engine_options(database_url):
+    """依資料庫類型設置連接池參數"""
+    if database_url.startswith('sqlite') and not _is_sqlite_file(database_url):
+        # 內存資料庫只能使用 SQLAlchemy 預設的單連接池
+        return {'connect_args': {'check_same_thread': False}}
+
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+    }
+    if database_url.startswith('sqlite'):
+        options['connect_args'] = {'check_same_thread': False}
+    else:
+        # 遠端資料庫：回收閒置連接並在取出前檢查是否已被伺服器關閉
+        options['pool_recycle'] = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+        options['pool_pre_ping'] = True
+    return options
+
+
+def get_engine(database_url, metadata=None):
+    """獲取共用引擎（首次取得時創建），並確保 metadata 的表格已存在且已套用遷移"""
+    engine = _engines.get(database_url)
+    if engine is None or (metadata is not None and (database_url, id(metadata)) not in _schemas):
+        with _lock:
+            engine = _engines.get(database_url)
+            if engine is None:
+                engine = create_engine(database_url, **_engine_options(database_url))
+                if _is_sqlite_file(database_url) and sqlite_production_mode():
+                    _configure_sqlite(engine)
+                    _writers[database_url] = SQLiteWriter(f'sqlite-writer-{len(_writers)}')
+                _engines[database_url] = engine
+            if metadata is not None and (database_url, id(metadata)) not in _schemas:
+                metadata.create_all(bind=engine)
+                # 補上已部署資料庫缺少的索引與欄位
+                upgrade(engine)
+                _schemas.add((database_url, id(metadata)))
+    return engine
+
+
+def get_pool_stats():
+    """獲取所有共用引擎的連接池狀態"""
+    stats = {}
+    for database_url, engine in list(_engines.items()):
+        pool = engine.pool
+        entry = {'pool': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(0, pool.overflow()),
+                'max_overflow': pool._max_overflow,
+            })
+        statistics = getattr(pool, 'statistics', None)
+        if statistics is not None:
+            entry.update({
+                'checkouts': statistics.checkouts,
+                'avg_wait_ms': round(statistics.total_wait / statistics.checkouts * 1000, 3) if statistics.checkouts else 0,
+                'max_wait_ms': round(statistics.max_wait * 1000, 3),
+                'timeouts': statistics.timeouts,
+            })
+        writer = _writers.get(database_url)
+        if writer is not None:
+            entry['writer'] = writer.get_stats()
+        stats[engine.url.render_as_string(hide_password=True)] = entry
+    return stats
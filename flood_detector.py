@@ -0,0 +1,105 @@
+"""
+Discord Bot - 防洗版偵測模組
+以固定大小的環形緩衝追蹤每位用戶在每個頻道的發言頻率、重複內容與提及次數
+"""
+
+import time
+from collections import OrderedDict, deque
+
+
+class _ChannelUserState:
+    """單一用戶在單一頻道的滑動窗口狀態"""
+
+    __slots__ = ('timestamps', 'content_hashes', 'mentions', 'last_seen')
+
+    def __init__(self, max_messages, duplicate_window):
+        self.timestamps = deque(maxlen=max_messages)
+        self.content_hashes = deque(maxlen=duplicate_window)  # (時間, 內容雜湊)
+        self.mentions = deque(maxlen=max_messages)  # (時間, 提及數)
+        self.last_seen = 0.0
+
+    def reset(self):
+        """觸發處罰後清空，避免同一波訊息重複觸發"""
+        self.timestamps.clear()
+        self.content_hashes.clear()
+        self.mentions.clear()
+
+
+class FloodDetector:
+    """按用戶與頻道偵測洗版，閒置用戶自動淘汰以限制記憶體"""
+
+    def __init__(self, max_messages=6, interval=5.0, max_duplicates=3, duplicate_window=6,
+                 max_mentions=8, idle_ttl=300.0, max_tracked=50000):
+        self.max_messages = max_messages  # interval 秒內最多訊息數
+        self.interval = interval
+        self.max_duplicates = max_duplicates  # 最近 duplicate_window 則且 interval 秒內相同內容的上限
+        self.duplicate_window = duplicate_window
+        self.max_mentions = max_mentions  # interval 秒內最多提及數
+        self.idle_ttl = idle_ttl
+        self.max_tracked = max_tracked
+        self._states = OrderedDict()  # (伺服器ID, 頻道ID, 用戶ID) -> 狀態，按最後活動排序
+        self.triggered = 0
+
+    def __len__(self):
+        return len(self._states)
+
+    def check(self, message, now=None):
+        """記錄一則訊息，觸發洗版規則時返回原因，否則返回 None"""
+        if now is None:
+            now = time.monotonic()
+
+        key = (message.guild.id if message.guild else None, message.channel.id, message.author.id)
+        state = self._states.get(key)
+        if state is None:
+            state = _ChannelUserState(self.max_messages, self.duplicate_window)
+            self._states[key] = state
+        else:
+            self._states.move_to_end(key)
+        state.last_seen = now
+
+        reason = self._evaluate(state, message, now)
+        if reason:
+            state.reset()
+            self.triggered += 1
+
+        self._evict(now)
+        return reason
+
+    def _evaluate(self, state, message, now):
+        """依序檢查發言頻率、重複內容與提及次數"""
+        timestamps = state.timestamps
+        timestamps.append(now)
+        if len(timestamps) == self.max_messages and now - timestamps[0] <= self.interval:
+            return f'{self.interval:g} 秒內發送 {self.max_messages} 則訊息'
+
+        content = message.content.strip().lower()
+        if content:
+            content_hash = hash(content)
+            state.content_hashes.append((now, content_hash))
+            duplicates = sum(
+                1 for ts, value in state.content_hashes
+                if value == content_hash and now - ts <= self.interval
+            )
+            if duplicates >= self.max_duplicates:
+                return f'重複發送相同內容 {self.max_duplicates} 次'
+
+        mention_count = len(message.raw_mentions) + len(message.raw_role_mentions)
+        if mention_count:
+            state.mentions.append((now, mention_count))
+            recent = sum(count for ts, count in state.mentions if now - ts <= self.interval)
+            if recent >= self.max_mentions:
+                return f'{self.interval:g} 秒內提及 {recent} 次'
+        return None
+
+    def _evict(self, now):
+        """淘汰閒置或超出上限的最舊狀態（均攤 O(1)）"""
+        states = self._states
+        while states:
+            oldest_key = next(iter(states))
+            if len(states) <= self.max_tracked and now - states[oldest_key].last_seen <= self.idle_ttl:
+                break
+            del states[oldest_key]
+
+    def get_stats(self):
+        """獲取偵測器統計"""
+        return {'tracked': len(self._states), 'triggered': self.triggered}
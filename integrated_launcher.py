@@ -18,17 +18,11 @@ if not db_url or 'ep-ancient-waterfall' in db_url:
 
 from bot import DiscordBot
 from web_app import app, set_bot_instance
+from logging_config import setup_logging as configure_queue_logging
 
 def setup_logging():
-    """設置日誌配置"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('system.log', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    """設置日誌配置（佇列式，寫檔與輪替在背景線程進行）"""
+    configure_queue_logging('system.log')
 
 def run_flask_app():
     """在單獨線程中運行Flask應用"""
@@ -0,0 +1,100 @@
+"""
+日誌設置模組 - 非阻塞的佇列式日誌
+記錄端只把日誌放入佇列，由背景監聽線程負責格式化、寫入檔案與輪替
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# 網站面板可調整的日誌等級
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+_listener = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """不在記錄端格式化的 QueueHandler（同一進程內的佇列可直接傳遞記錄物件）"""
+
+    def prepare(self, record):
+        return record
+
+
+def _create_file_handler(log_file):
+    """依環境變數建立按大小或按時間輪替的檔案處理器"""
+    rotation = os.getenv('LOG_ROTATION', 'size').lower()
+    backup_count = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    if rotation == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file,
+            when=os.getenv('LOG_ROTATE_WHEN', 'midnight'),
+            backupCount=backup_count,
+            encoding='utf-8'
+        )
+    return logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+        backupCount=backup_count,
+        encoding='utf-8'
+    )
+
+
+def setup_logging(log_file):
+    """設置佇列式日誌（根記錄器只掛 QueueHandler）"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = _create_file_handler(log_file)
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+
+    default_level = 'DEBUG' if os.getenv('DEBUG', 'False').lower() == 'true' else 'INFO'
+    level = os.getenv('LOG_LEVEL', default_level).upper()
+    root.setLevel(level if level in LOG_LEVELS else 'INFO')
+
+    _listener.start()
+    # 正常退出時寫完佇列中剩餘的日誌
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """停止背景監聽線程並寫出剩餘日誌"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def set_log_level(level, logger_name=None):
+    """在運行時調整日誌等級（logger_name 為空時調整根記錄器）"""
+    level = level.upper()
+    if level not in LOG_LEVELS:
+        raise ValueError(f'未知的日誌等級: {level}')
+    logging.getLogger(logger_name).setLevel(level)
+
+
+def get_log_levels():
+    """獲取根記錄器與已設置等級的記錄器的當前等級"""
+    levels = {'root': logging.getLevelName(logging.getLogger().level)}
+    for name, logger in sorted(logging.root.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            levels[name] = logging.getLevelName(logger.level)
+    return levels
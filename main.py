@@ -8,17 +8,11 @@ import asyncio
 import logging
 import os
 from bot import DiscordBot
+from logging_config import setup_logging as configure_queue_logging
 
 def setup_logging():
-    """設置日誌配置"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('bot.log', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    """設置日誌配置（佇列式，寫檔與輪替在背景線程進行）"""
+    configure_queue_logging('bot.log')
 
 async def main():
     """主要執行函數"""
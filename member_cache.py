@@ -0,0 +1,234 @@
+"""
+成員快取 - 伺服器成員的分塊載入模式與成員快取統計
+MEMBER_CHUNKING 為 startup 時沿用 discord.py 在就緒前分塊載入所有伺服器成員的做法；
+lazy 時機器人立即就緒，之後在背景逐一分塊；on_demand 時只在指令或網站需要成員列表時才分塊。
+分塊完成後建立該伺服器的成員申請狀態索引與名稱搜尋索引
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from itertools import chain, islice
+
+import discord
+
+from metrics import CHUNKED_GUILDS, MEMBER_CACHE_BYTES, MEMBER_CACHE_MEMBERS, MEMBER_CHUNK_DURATION
+
+logger = logging.getLogger(__name__)
+
+CHUNK_STARTUP = 'startup'
+CHUNK_LAZY = 'lazy'
+CHUNK_ON_DEMAND = 'on_demand'
+
+MAX_CONCURRENT_CHUNKS = 2  # 分塊請求經由網關發送且有速率限制，同時分塊的伺服器不宜過多
+MEMORY_SAMPLE_SIZE = 200  # 估算內存用量時取樣的成員數
+
+# 估算成員內存時不計入的共用物件（伺服器、身分組、頻道與連線狀態由所有成員共用）
+_SHARED_TYPES = (
+    discord.Guild, discord.Role, discord.abc.GuildChannel,
+    discord.state.ConnectionState, type, bool
+)
+
+
+def member_cache_flags(config):
+    """按配置建立成員快取旗標（joined：快取加入事件與分塊載入的成員；voice：快取語音頻道中的成員）"""
+    return discord.MemberCacheFlags(joined=config.MEMBER_CACHE_JOINED, voice=config.MEMBER_CACHE_VOICE)
+
+
+def _deep_sizeof(obj, seen):
+    """物件及其專屬子物件的大小（位元組），共用物件與已計算過的物件不重複計入"""
+    if obj is None or isinstance(obj, _SHARED_TYPES) or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        children = chain(obj.keys(), obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        children = obj
+    elif isinstance(obj, (str, bytes)):
+        return size
+    else:
+        slots = chain.from_iterable(
+            (slots,) if isinstance(slots, str) else slots
+            for slots in (getattr(cls, '__slots__', ()) for cls in type(obj).__mro__)
+        )
+        children = [getattr(obj, slot, None) for slot in slots if slot != '__weakref__']
+        if hasattr(obj, '__dict__'):
+            children.append(obj.__dict__)
+    return size + sum(_deep_sizeof(child, seen) for child in children)
+
+
+def estimate_member_bytes(guilds, sample_size=MEMORY_SAMPLE_SIZE):
+    """以取樣成員的平均大小估算所有伺服器成員快取的內存用量，返回 (成員數, 估算位元組數)
+
+    包含成員與用戶物件及各伺服器成員字典本身，不含用戶快取的弱引用字典
+    """
+    member_lists = [guild.members for guild in guilds]
+    total = sum(len(members) for members in member_lists)
+    if not total:
+        return 0, 0
+    seen = set()
+    sampled = 0
+    sampled_bytes = 0
+    for members in member_lists:
+        if not members:
+            continue
+        # 按各伺服器成員數的比例、等間隔取樣
+        count = max(1, sample_size * len(members) // total)
+        for member in islice(members, 0, None, max(1, len(members) // count)):
+            sampled_bytes += _deep_sizeof(member, seen)
+            sampled += 1
+    dict_bytes = sum(sys.getsizeof(guild._members) for guild in guilds)
+    return total, sampled_bytes * total // sampled + dict_bytes
+
+
+class MemberChunker:
+    """按模式分塊載入伺服器成員，記錄分塊耗時，分塊完成後建立該伺服器的成員索引"""
+
+    def __init__(self, bot, mode=CHUNK_STARTUP, cache_flags=None):
+        self.bot = bot
+        self.mode = mode
+        self.cache_flags = cache_flags
+        self.chunked = set()  # 已由此處分塊的伺服器ID（成員數與 member_count 不一致時 guild.chunked 不可靠）
+        self.durations = {}  # 伺服器ID -> 最近一次分塊耗時（秒）
+        self.startup_seconds = None  # startup 模式下連線至就緒（discord.py 分塊所有伺服器）的耗時
+        self._connected_at = None
+        self._tasks = {}  # 伺服器ID -> 分塊中的任務（同一伺服器的並發請求共用）
+        self._background_tasks = set()  # 不等待結果的背景分塊任務（保留引用，避免任務在完成前被回收）
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHUNKS)
+        self._background = None
+
+    def is_loaded(self, guild):
+        """伺服器成員是否已全部載入快取（startup 模式視為已載入）"""
+        return self.mode == CHUNK_STARTUP or guild.id in self.chunked or guild.chunked
+
+    async def on_connect(self):
+        if self._connected_at is None:
+            self._connected_at = time.perf_counter()
+
+    def on_ready(self):
+        """記錄啟動分塊耗時，lazy 模式開始在背景逐一分塊"""
+        if self.mode == CHUNK_STARTUP:
+            if self.startup_seconds is None and self._connected_at is not None:
+                self.startup_seconds = time.perf_counter() - self._connected_at
+                logger.info(f'啟動時分塊載入所有伺服器成員耗時 {self.startup_seconds:.2f} 秒')
+        elif self.mode == CHUNK_LAZY and (self._background is None or self._background.done()):
+            self._background = asyncio.create_task(self._chunk_all())
+
+    async def _chunk_all(self):
+        # 成員少的伺服器先載入，盡快讓多數伺服器可用
+        for guild in sorted(self.bot.guilds, key=lambda guild: guild.member_count or 0):
+            try:
+                await self.ensure_chunked(guild)
+            except Exception as e:
+                logger.warning(f'背景分塊伺服器 {guild.name} 失敗: {e}')
+        logger.info(f'背景分塊完成，已載入 {len(self.chunked)} 個伺服器的成員')
+
+    def schedule(self, guild):
+        """新加入的伺服器：lazy 模式在背景分塊，on_demand 模式等到需要時才分塊"""
+        if self.mode == CHUNK_LAZY:
+            self.start_chunk(guild)
+
+    def start_chunk(self, guild):
+        """不論模式，在背景開始分塊伺服器成員且不等待完成（已載入或分塊中時不重複發出）"""
+        if self.is_loaded(guild) or guild.id in self._tasks:
+            return
+        task = asyncio.ensure_future(self._chunk_in_background(guild))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _chunk_in_background(self, guild):
+        try:
+            await self.ensure_chunked(guild)
+        except Exception as e:
+            logger.warning(f'背景分塊伺服器 {guild.name} 失敗: {e}')
+
+    def forget(self, guild_id):
+        self.chunked.discard(guild_id)
+        self.durations.pop(guild_id, None)
+
+    async def ensure_chunked(self, guild):
+        """確保伺服器成員已全部載入快取（已載入時立即返回；同一伺服器同時只發出一次分塊請求）"""
+        if self.is_loaded(guild):
+            return guild
+        task = self._tasks.get(guild.id)
+        if task is None:
+            task = asyncio.ensure_future(self._chunk(guild))
+            self._tasks[guild.id] = task
+            task.add_done_callback(lambda _: self._tasks.pop(guild.id, None))
+        await asyncio.shield(task)
+        return guild
+
+    async def _chunk(self, guild):
+        async with self._semaphore:
+            start = time.perf_counter()
+            await guild.chunk(cache=True)
+            elapsed = time.perf_counter() - start
+        MEMBER_CHUNK_DURATION.labels().observe(elapsed)
+        self.chunked.add(guild.id)
+        self.durations[guild.id] = elapsed
+        logger.info(f'伺服器 {guild.name} 已載入 {len(guild.members)} 位成員（耗時 {elapsed:.2f} 秒）')
+        index_guild(guild)
+
+    def get_stats(self):
+        """獲取分塊與成員快取統計"""
+        guilds = self.bot.guilds
+        members, estimated_bytes = estimate_member_bytes(guilds)
+        return {
+            'mode': self.mode,
+            'cache_flags': dict(self.cache_flags) if self.cache_flags is not None else None,
+            'guilds': len(guilds),
+            'chunked_guilds': sum(1 for guild in guilds if self.is_loaded(guild)),
+            'members': members,
+            'member_count': sum(guild.member_count or 0 for guild in guilds),
+            'users': len(self.bot.users),
+            'estimated_bytes': estimated_bytes,
+            'startup_chunk_seconds': round(self.startup_seconds, 3) if self.startup_seconds is not None else None,
+            'chunks': len(self.durations),
+            'chunk_seconds': round(sum(self.durations.values()), 3),
+            'max_chunk_seconds': round(max(self.durations.values(), default=0.0), 3)
+        }
+
+
+def index_guild(guild):
+    """以伺服器目前已載入的成員建立（或重建）成員申請狀態索引與名稱搜尋索引"""
+    from member_directory import get_member_directory
+    from member_index import get_member_index
+
+    index = get_member_index()
+    if index.loaded:
+        index.build_guild(guild)
+    return get_member_directory().build_guild(guild)
+
+
+_chunker = None
+
+
+def setup_member_chunking(bot, mode, cache_flags=None):
+    """建立成員分塊器並註冊連線時間記錄與成員快取指標"""
+    global _chunker
+    _chunker = MemberChunker(bot, mode, cache_flags)
+    bot.add_listener(_chunker.on_connect, 'on_connect')
+
+    CHUNKED_GUILDS.callback = lambda: sum(1 for guild in bot.guilds if _chunker.is_loaded(guild))
+    MEMBER_CACHE_MEMBERS.callback = lambda: sum(len(guild.members) for guild in bot.guilds)
+    MEMBER_CACHE_BYTES.callback = lambda: estimate_member_bytes(bot.guilds)[1]
+    return _chunker
+
+
+def get_member_chunker():
+    """獲取成員分塊器（機器人尚未建立時返回 None）"""
+    return _chunker
+
+
+def members_loaded(guild):
+    """伺服器成員是否已全部載入快取（未使用分塊器時視為已載入）"""
+    return _chunker is None or _chunker.is_loaded(guild)
+
+
+async def ensure_members_loaded(guild):
+    """需要完整成員列表前呼叫：lazy / on_demand 模式下伺服器尚未分塊時先分塊載入"""
+    if _chunker is not None:
+        await _chunker.ensure_chunked(guild)
+    return guild
@@ -0,0 +1,176 @@
+"""
+成員目錄 - 所有伺服器成員的名稱搜尋索引
+按伺服器維護用戶名、顯示名稱與暱稱的排序前綴索引和三字元組索引，
+由成員事件增量更新，供網站的成員即時搜尋使用
+"""
+
+import bisect
+import threading
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+TRIGRAM_SIZE = 3
+
+
+def member_names(member):
+    """成員可被搜尋的名稱（用戶名、全域顯示名稱、伺服器暱稱），轉為不分大小寫的比對鍵並去除重複"""
+    names = (member.name, member.global_name, member.nick)
+    return tuple(dict.fromkeys(name.casefold() for name in names if name))
+
+
+def trigrams(text):
+    return {text[i:i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+
+class GuildDirectory:
+    """單一伺服器的名稱索引"""
+
+    def __init__(self):
+        self.names = {}  # 成員ID -> 比對鍵
+        self.sorted_keys = []  # (比對鍵, 成員ID)，按比對鍵排序，用於前綴搜尋
+        self.trigrams = {}  # 三字元組 -> 成員ID集合，用於子字串搜尋
+
+    def add(self, member_id, keys):
+        self.remove(member_id)
+        self.names[member_id] = keys
+        for key in keys:
+            bisect.insort(self.sorted_keys, (key, member_id))
+            for trigram in trigrams(key):
+                self.trigrams.setdefault(trigram, set()).add(member_id)
+
+    def remove(self, member_id):
+        keys = self.names.pop(member_id, None)
+        if keys is None:
+            return
+        for key in keys:
+            position = bisect.bisect_left(self.sorted_keys, (key, member_id))
+            if position < len(self.sorted_keys) and self.sorted_keys[position] == (key, member_id):
+                del self.sorted_keys[position]
+            for trigram in trigrams(key):
+                members = self.trigrams.get(trigram)
+                if members is not None:
+                    members.discard(member_id)
+                    if not members:
+                        del self.trigrams[trigram]
+
+    def search(self, query, limit):
+        """先以前綴比對（按名稱排序），不足 limit 時再以三字元組找出包含查詢字串的成員"""
+        found = {}
+        position = bisect.bisect_left(self.sorted_keys, (query,))
+        while position < len(self.sorted_keys) and len(found) < limit:
+            key, member_id = self.sorted_keys[position]
+            if not key.startswith(query):
+                break
+            found.setdefault(member_id, None)
+            position += 1
+
+        if len(found) < limit and len(query) >= TRIGRAM_SIZE:
+            candidate_sets = []
+            for trigram in trigrams(query):
+                members = self.trigrams.get(trigram)
+                if not members:
+                    return list(found)
+                candidate_sets.append(members)
+            candidate_sets.sort(key=len)
+            candidates = candidate_sets[0].intersection(*candidate_sets[1:])
+            matches = []
+            for member_id in candidates:
+                if member_id in found:
+                    continue
+                keys = [key for key in self.names.get(member_id, ()) if query in key]
+                if keys:
+                    matches.append((min(len(key) for key in keys), member_id))
+            # 名稱越短與查詢越接近，排在前面
+            matches.sort()
+            for _, member_id in matches[:limit - len(found)]:
+                found[member_id] = None
+        return list(found)
+
+
+class MemberDirectory:
+    """所有伺服器的成員名稱索引"""
+
+    def __init__(self):
+        self._guilds = {}  # 伺服器ID -> GuildDirectory
+        self._lock = threading.Lock()
+        self.searches = 0
+
+    def build_guild(self, guild):
+        """以伺服器目前的成員列表建立（或重建）該伺服器的索引"""
+        directory = GuildDirectory()
+        entries = []
+        for member in guild.members:
+            keys = member_names(member)
+            directory.names[member.id] = keys
+            for key in keys:
+                entries.append((key, member.id))
+                for trigram in trigrams(key):
+                    directory.trigrams.setdefault(trigram, set()).add(member.id)
+        entries.sort()
+        directory.sorted_keys = entries
+        with self._lock:
+            self._guilds[guild.id] = directory
+        return len(directory.names)
+
+    def remove_guild(self, guild_id):
+        with self._lock:
+            self._guilds.pop(guild_id, None)
+
+    def update_member(self, member):
+        """成員加入或名稱變更時更新索引"""
+        with self._lock:
+            directory = self._guilds.get(member.guild.id)
+            if directory is None:
+                return
+            keys = member_names(member)
+            if directory.names.get(member.id) != keys:
+                directory.add(member.id, keys)
+
+    def remove_member(self, guild_id, member_id):
+        with self._lock:
+            directory = self._guilds.get(guild_id)
+            if directory is not None:
+                directory.remove(member_id)
+
+    def has_guild(self, guild_id):
+        return guild_id in self._guilds
+
+    def search(self, query, guild_ids=None, limit=DEFAULT_SEARCH_LIMIT):
+        """搜尋名稱以查詢字串開頭（或包含查詢字串）的成員，返回 (伺服器ID, 成員ID) 列表"""
+        query = query.strip().casefold()
+        if not query:
+            return []
+        with self._lock:
+            self.searches += 1
+            if guild_ids is None:
+                guild_ids = list(self._guilds)
+            results = []
+            for guild_id in guild_ids:
+                directory = self._guilds.get(guild_id)
+                if directory is None:
+                    continue
+                results.extend((guild_id, member_id) for member_id in directory.search(query, limit - len(results)))
+                if len(results) >= limit:
+                    break
+            return results
+
+    def get_stats(self):
+        """獲取索引統計"""
+        with self._lock:
+            return {
+                'guilds': len(self._guilds),
+                'members': sum(len(directory.names) for directory in self._guilds.values()),
+                'trigrams': sum(len(directory.trigrams) for directory in self._guilds.values()),
+                'searches': self.searches
+            }
+
+
+_member_directory = None
+
+
+def get_member_directory():
+    """獲取成員目錄（延遲初始化）"""
+    global _member_directory
+    if _member_directory is None:
+        _member_directory = MemberDirectory()
+    return _member_directory
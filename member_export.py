@@ -0,0 +1,146 @@
+"""
+成員匯出 - 伺服器成員的篩選、游標分頁與 NDJSON 串流
+直接從機器人的成員快取逐一輸出，不在內存中組裝整份成員列表；
+分頁按成員ID遞增排序，游標為上一頁最後一位成員的ID；串流按成員快取順序輸出，不排序
+"""
+
+import heapq
+import json
+from datetime import datetime, timezone
+from operator import attrgetter
+
+from member_index import MEMBER_STATUSES
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 100  # 串流時每次寫出的行數
+
+_member_id = attrgetter('id')
+
+
+def _parse_time(value, name):
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} 必須是 ISO 8601 日期或時間')
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+class MemberFilters:
+    """成員篩選條件（身分組、加入時間區間、申請狀態）"""
+
+    def __init__(self, role=None, joined_after=None, joined_before=None, statuses=None):
+        self.role = role
+        self.joined_after = joined_after
+        self.joined_before = joined_before
+        self.statuses = statuses
+
+    @classmethod
+    def from_params(cls, params, guild):
+        """從請求參數解析篩選條件，參數無效時拋出 ValueError"""
+        role = None
+        if params.get('role'):
+            value = str(params['role']).strip()
+            role = guild.get_role(int(value)) if value.isdigit() else None
+            if role is None:
+                role = next((item for item in guild.roles if item.name == value), None)
+            if role is None:
+                raise ValueError(f'找不到身分組: {value}')
+
+        statuses = None
+        if params.get('status'):
+            statuses = [status.strip() for status in str(params['status']).split(',') if status.strip()]
+            unknown = [status for status in statuses if status not in MEMBER_STATUSES]
+            if unknown:
+                raise ValueError(f'未知的申請狀態: {", ".join(unknown)}')
+
+        return cls(
+            role=role,
+            joined_after=_parse_time(params['joined_after'], 'joined_after') if params.get('joined_after') else None,
+            joined_before=_parse_time(params['joined_before'], 'joined_before') if params.get('joined_before') else None,
+            statuses=statuses
+        )
+
+    def matches(self, member):
+        if member.bot:
+            return False
+        if self.role is not None and member.get_role(self.role.id) is None:
+            return False
+        if self.joined_after is not None or self.joined_before is not None:
+            if member.joined_at is None:
+                return False
+            if self.joined_after is not None and member.joined_at < self.joined_after:
+                return False
+            if self.joined_before is not None and member.joined_at >= self.joined_before:
+                return False
+        return True
+
+
+def iter_members(guild, filters, index=None, after=None):
+    """逐一產生符合條件、ID 大於 after 的成員（未排序）
+
+    有申請狀態篩選時只走訪成員申請狀態索引中對應狀態的成員
+    """
+    if filters.statuses is not None and index is not None:
+        member_ids, _ = index.members(guild.id, filters.statuses)
+        candidates = (guild.get_member(member_id) for member_id in member_ids)
+    else:
+        # 複製成員引用列表，避免機器人線程在走訪期間修改成員字典
+        candidates = guild.members
+    for member in candidates:
+        if member is None or (after is not None and member.id <= after):
+            continue
+        if filters.matches(member):
+            yield member
+
+
+def member_to_dict(member, index=None):
+    """成員的匯出欄位"""
+    data = {
+        'id': str(member.id),
+        'name': member.display_name,
+        'joined_at': member.joined_at.isoformat() if member.joined_at else '',
+        'roles': [role.name for role in member.roles if not role.is_default()]
+    }
+    if index is not None:
+        data['application_status'] = index.get_status(member.guild.id, member.id)
+    return data
+
+
+def get_member_page(guild, filters, index=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """獲取一頁成員，返回 (成員資料, 下一頁游標, 符合條件且在游標之後的成員數)"""
+    matched = 0
+
+    def counted():
+        nonlocal matched
+        for member in iter_members(guild, filters, index, after):
+            matched += 1
+            yield member
+
+    # 只保留最小的 limit + 1 個ID，不排序整份成員列表
+    page = heapq.nsmallest(limit + 1, counted(), key=_member_id)
+    has_more = len(page) > limit
+    page = page[:limit]
+    next_cursor = str(page[-1].id) if has_more else None
+    return [member_to_dict(member, index) for member in page], next_cursor, matched
+
+
+def stream_members_ndjson(guild, filters, index=None, after=None):
+    """以 NDJSON 逐批輸出成員（每行一位成員），最後一行為 {"done": true, "count": 總數}
+
+    按成員快取順序邊走訪邊輸出（不按ID排序），第一批在走訪到 STREAM_BATCH_SIZE 位成員後即寫出；
+    after 仍只輸出ID大於 after 的成員
+    """
+    count = 0
+    batch = []
+    for member in iter_members(guild, filters, index, after):
+        count += 1
+        batch.append(json.dumps(member_to_dict(member, index), ensure_ascii=False))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+    yield json.dumps({'done': True, 'count': count}) + '\n'
@@ -0,0 +1,194 @@
+"""
+成員申請狀態索引 - 按伺服器記錄每位成員的申請狀態（未申請、待審核、已通過、已拒絕）
+on_ready 時建立一次，之後由成員加入/離開與申請狀態變更增量維護，
+查詢某個狀態的成員時只走訪該狀態的成員，耗時與結果數量成正比
+"""
+
+import threading
+from itertools import chain, islice
+
+UNAPPLIED = 'unapplied'
+
+# 成員狀態 -> 顯示名稱
+MEMBER_STATUSES = {
+    UNAPPLIED: '未申請',
+    'pending': '待審核',
+    'approved': '已通過',
+    'rejected': '已拒絕',
+}
+
+
+class MemberStatusIndex:
+    """按伺服器、按申請狀態分組的成員索引（機器人與伺服器擁有者不列入）
+
+    每位用戶的狀態取其最新一份申請的狀態，沒有申請記錄的成員為未申請
+    """
+
+    def __init__(self, db=None):
+        self._db = db
+        self._application_status = {}  # 用戶ID -> 最新申請狀態
+        self._guilds = {}  # 伺服器ID -> {狀態: {成員ID: None}}（按加入索引的順序）
+        self._member_guilds = {}  # 成員ID -> 所在的已索引伺服器ID
+        self._recent_changes = None  # 載入申請狀態期間發生的變更，載入完成後覆蓋查詢結果
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    @property
+    def db(self):
+        if self._db is None:
+            from models import get_bot_database
+            self._db = get_bot_database()
+        return self._db
+
+    def load_statuses(self):
+        """從資料庫載入所有用戶的最新申請狀態並重新分組已索引的成員（同步，於資料庫線程池執行）"""
+        with self._lock:
+            self._recent_changes = {}
+        statuses = {int(user_id): status for user_id, status in self.db.get_latest_application_statuses()}
+        with self._lock:
+            statuses.update(self._recent_changes)
+            self._recent_changes = None
+            self._application_status = statuses
+            for guild_id, buckets in self._guilds.items():
+                members = list(chain.from_iterable(buckets.values()))
+                self._guilds[guild_id] = self._group(members)
+            self.loaded = True
+        return len(statuses)
+
+    def _group(self, member_ids):
+        buckets = {status: {} for status in MEMBER_STATUSES}
+        for member_id in member_ids:
+            status = self._application_status.get(member_id, UNAPPLIED)
+            buckets.setdefault(status, {})[member_id] = None
+        return buckets
+
+    def build_guild(self, guild):
+        """以伺服器目前的成員列表建立（或重建）該伺服器的索引"""
+        member_ids = [member.id for member in guild.members if not member.bot and member.id != guild.owner_id]
+        with self._lock:
+            self._drop_guild(guild.id)
+            self._guilds[guild.id] = self._group(member_ids)
+            for member_id in member_ids:
+                self._member_guilds.setdefault(member_id, set()).add(guild.id)
+        return len(member_ids)
+
+    def remove_guild(self, guild_id):
+        """移除伺服器的索引"""
+        with self._lock:
+            self._drop_guild(guild_id)
+
+    def _drop_guild(self, guild_id):
+        buckets = self._guilds.pop(guild_id, None)
+        if buckets is None:
+            return
+        for member_id in chain.from_iterable(buckets.values()):
+            guilds = self._member_guilds.get(member_id)
+            if guilds is not None:
+                guilds.discard(guild_id)
+                if not guilds:
+                    del self._member_guilds[member_id]
+
+    def add_member(self, member):
+        """成員加入已索引的伺服器"""
+        if member.bot:
+            return
+        with self._lock:
+            buckets = self._guilds.get(member.guild.id)
+            if buckets is None:
+                return
+            status = self._application_status.get(member.id, UNAPPLIED)
+            buckets.setdefault(status, {})[member.id] = None
+            self._member_guilds.setdefault(member.id, set()).add(member.guild.id)
+
+    def remove_member(self, guild_id, member_id):
+        """成員離開伺服器"""
+        with self._lock:
+            buckets = self._guilds.get(guild_id)
+            if buckets is None:
+                return
+            status = self._application_status.get(member_id, UNAPPLIED)
+            buckets.get(status, {}).pop(member_id, None)
+            guilds = self._member_guilds.get(member_id)
+            if guilds is not None:
+                guilds.discard(guild_id)
+                if not guilds:
+                    del self._member_guilds[member_id]
+
+    def set_application_status(self, user_id, status):
+        """用戶的申請狀態變更，將該用戶移到所有已索引伺服器中對應的分組"""
+        user_id = int(user_id)
+        with self._lock:
+            if self._recent_changes is not None:
+                self._recent_changes[user_id] = status
+            previous = self._application_status.get(user_id, UNAPPLIED)
+            self._application_status[user_id] = status
+            if previous == status:
+                return
+            for guild_id in self._member_guilds.get(user_id, ()):
+                buckets = self._guilds[guild_id]
+                buckets.get(previous, {}).pop(user_id, None)
+                buckets.setdefault(status, {})[user_id] = None
+
+    def has_guild(self, guild_id):
+        return self.loaded and guild_id in self._guilds
+
+    def get_status(self, guild_id, member_id):
+        """獲取成員的申請狀態（成員不在索引中時返回 None）"""
+        with self._lock:
+            if guild_id not in self._guilds or member_id not in self._member_guilds:
+                return None
+            return self._application_status.get(member_id, UNAPPLIED)
+
+    def count(self, guild_id):
+        """獲取伺服器各狀態的成員數"""
+        with self._lock:
+            buckets = self._guilds.get(guild_id, {})
+            return {status: len(buckets.get(status, ())) for status in MEMBER_STATUSES}
+
+    def members(self, guild_id, statuses, offset=0, limit=None):
+        """按狀態列出伺服器成員ID，返回 (本頁成員ID, 符合的總數)"""
+        with self._lock:
+            buckets = self._guilds.get(guild_id, {})
+            groups = [buckets.get(status, {}) for status in statuses]
+            total = sum(len(group) for group in groups)
+            stop = None if limit is None else offset + limit
+            return list(islice(chain.from_iterable(groups), offset, stop)), total
+
+    def get_stats(self):
+        """獲取索引統計"""
+        return {
+            'loaded': self.loaded,
+            'guilds': len(self._guilds),
+            'members': len(self._member_guilds),
+            'applicants': len(self._application_status)
+        }
+
+
+_member_index = None
+
+
+def get_member_index():
+    """獲取成員申請狀態索引（延遲初始化）"""
+    global _member_index
+    if _member_index is None:
+        _member_index = MemberStatusIndex()
+    return _member_index
+
+
+def update_member_status(user_id, status):
+    """同步申請狀態變更到成員索引（索引尚未建立時無需處理）"""
+    if _member_index is not None:
+        _member_index.set_application_status(user_id, status)
+
+
+async def ensure_guild_index(guild):
+    """確保伺服器已建立索引（成員尚未分塊載入時先載入；尚未載入申請狀態時先在資料庫線程池中載入）"""
+    from member_cache import ensure_members_loaded
+    await ensure_members_loaded(guild)
+    index = get_member_index()
+    if not index.loaded:
+        from repositories import run_db
+        await run_db(index.load_statuses)
+    if not index.has_guild(guild.id):
+        index.build_guild(guild)
+    return index
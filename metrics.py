@@ -0,0 +1,315 @@
+"""
+效能指標模組 - 計數器與延遲直方圖
+記錄事件處理器、指令與網站到機器人的橋接呼叫耗時，以 Prometheus 文字格式輸出
+"""
+
+import asyncio
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+
+# 延遲直方圖的桶邊界（秒）
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# 伺服器成員分塊的桶邊界（秒，大型伺服器可能需要數分鐘）
+CHUNK_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value):
+    """轉義 Prometheus 標籤值"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    """組合 Prometheus 標籤字串"""
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """固定桶邊界的延遲直方圖（單一標籤組合）"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最後一格為 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """記錄一個觀測值"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """以桶邊界估算分位數（用於面板摘要）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class MetricFamily:
+    """同名指標的所有標籤組合"""
+
+    def __init__(self, name, kind, description, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.kind = kind  # counter / gauge / histogram
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        self.children = {}
+        self.callback = None  # 量表可使用回呼在輸出時取值（返回數值，或 {標籤值元組: 數值}）
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """獲取指定標籤值的子指標（直方圖返回 Histogram，其他返回單元素列表）"""
+        child = self.children.get(values)
+        if child is None:
+            with self._lock:
+                child = self.children.get(values)
+                if child is None:
+                    child = Histogram(self.buckets) if self.kind == 'histogram' else [0.0]
+                    self.children[values] = child
+        return child
+
+    def inc(self, *values, amount=1):
+        """計數器加一"""
+        child = self.labels(*values)
+        with self._lock:
+            child[0] += amount
+
+    def set(self, value, *values):
+        """設置量表數值"""
+        self.labels(*values)[0] = value
+
+    def refresh(self):
+        """以回呼更新量表數值"""
+        if self.callback is None:
+            return
+        try:
+            value = self.callback()
+        except Exception:
+            return
+        if isinstance(value, dict):
+            self.children = {values: [child_value] for values, child_value in value.items()}
+        else:
+            self.set(value)
+
+    def render(self):
+        """輸出 Prometheus 文字格式"""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.kind}']
+        self.refresh()
+        for values, child in sorted(self.children.items()):
+            if self.kind != 'histogram':
+                lines.append(f'{self.name}{_format_labels(self.label_names, values)} {child[0]}')
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, values, ("le", le))} {cumulative}')
+            labels = _format_labels(self.label_names, values)
+            lines.append(f'{self.name}_sum{labels} {child.sum}')
+            lines.append(f'{self.name}_count{labels} {child.count}')
+        return lines
+
+
+class MetricsRegistry:
+    """指標註冊表"""
+
+    def __init__(self):
+        self.families = {}
+
+    def register(self, name, kind, description, label_names=(), buckets=DEFAULT_BUCKETS):
+        """註冊（或取得已存在的）指標"""
+        family = self.families.get(name)
+        if family is None:
+            family = MetricFamily(name, kind, description, label_names, buckets)
+            self.families[name] = family
+        return family
+
+    def render_prometheus(self):
+        """以 Prometheus 文字格式輸出所有指標"""
+        lines = []
+        for family in self.families.values():
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """輸出給網站面板使用的摘要（次數、平均與估算分位數，單位毫秒）"""
+        result = {}
+        for family in self.families.values():
+            family.refresh()
+            entries = {}
+            for values, child in family.children.items():
+                key = ','.join(str(value) for value in values) or family.name
+                if family.kind == 'histogram':
+                    entries[key] = {
+                        'count': child.count,
+                        'avg_ms': round(child.sum / child.count * 1000, 3) if child.count else 0,
+                        'p50_ms': round(child.quantile(0.5) * 1000, 3),
+                        'p99_ms': round(child.quantile(0.99) * 1000, 3)
+                    }
+                else:
+                    entries[key] = child[0]
+            result[family.name] = entries
+        return result
+
+
+registry = MetricsRegistry()
+
+EVENT_DURATION = registry.register('grv_event_duration_seconds', 'histogram', '事件處理器耗時', ('event',))
+EVENT_ERRORS = registry.register('grv_event_errors_total', 'counter', '事件處理器未捕捉的錯誤數', ('event',))
+COMMAND_DURATION = registry.register('grv_command_duration_seconds', 'histogram', '指令執行耗時', ('command',))
+COMMAND_ERRORS = registry.register('grv_command_errors_total', 'counter', '指令執行失敗數', ('command',))
+BRIDGE_DURATION = registry.register('grv_bridge_duration_seconds', 'histogram', '網站到機器人橋接呼叫耗時', ('call',))
+GATEWAY_LATENCY = registry.register('grv_gateway_latency_seconds', 'gauge', 'Discord 網關心跳延遲')
+SHARD_LATENCY = registry.register('grv_shard_latency_seconds', 'gauge', '各分片的網關心跳延遲', ('shard',))
+SHARD_GUILDS = registry.register('grv_shard_guilds', 'gauge', '各分片負責的伺服器數', ('shard',))
+SHARD_EVENTS = registry.register('grv_shard_events_total', 'counter', '各分片處理的事件數', ('shard', 'event'))
+MEMBER_CHUNK_DURATION = registry.register('grv_member_chunk_duration_seconds', 'histogram', '伺服器成員分塊載入耗時', buckets=CHUNK_BUCKETS)
+CHUNKED_GUILDS = registry.register('grv_chunked_guilds', 'gauge', '成員已全部載入快取的伺服器數')
+MEMBER_CACHE_MEMBERS = registry.register('grv_member_cache_members', 'gauge', '成員快取中的成員數')
+MEMBER_CACHE_BYTES = registry.register('grv_member_cache_bytes', 'gauge', '成員快取的估算內存用量（位元組）')
+LOOP_LAG = registry.register('grv_event_loop_lag_seconds', 'gauge', '事件循環延遲（最近一次取樣）')
+LOOP_LAG_HISTOGRAM = registry.register('grv_event_loop_lag_distribution_seconds', 'histogram', '事件循環延遲分佈')
+
+
+def event_shard(args):
+    """從事件參數（伺服器、訊息、成員等）取得所屬分片ID，與伺服器無關的事件返回 None
+
+    on_shard_* 事件的參數本身就是分片ID
+    """
+    for arg in args:
+        if isinstance(arg, int):
+            return arg
+        shard_id = getattr(arg, 'shard_id', None)
+        if shard_id is None:
+            shard_id = getattr(getattr(arg, 'guild', None), 'shard_id', None)
+        if shard_id is not None:
+            return shard_id
+    return None
+
+
+def timed_event(event_name):
+    """事件處理器裝飾器：記錄耗時、未捕捉的錯誤與各分片的事件數"""
+    histogram = EVENT_DURATION.labels(event_name)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            shard_id = event_shard(args)
+            SHARD_EVENTS.inc('-' if shard_id is None else str(shard_id), event_name)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                EVENT_ERRORS.inc(event_name)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def observe_command(command_name, seconds, failed=False):
+    """記錄一次指令執行"""
+    COMMAND_DURATION.labels(command_name).observe(seconds)
+    if failed:
+        COMMAND_ERRORS.inc(command_name)
+
+
+def observe_bridge(call_name, seconds):
+    """記錄一次網站到機器人的橋接呼叫"""
+    BRIDGE_DURATION.labels(call_name).observe(seconds)
+
+
+async def monitor_event_loop_lag(interval=1.0):
+    """定期量測事件循環延遲（實際喚醒時間與預期的差值）"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        LOOP_LAG.set(lag)
+        LOOP_LAG_HISTOGRAM.labels().observe(lag)
+
+
+def _latency(value):
+    return 0.0 if value is None or math.isnan(value) or math.isinf(value) else value  # 未連接時為 NaN
+
+
+def shard_latencies(bot):
+    """各分片的心跳延遲 [(分片ID, 秒)]（未分片的機器人視為分片 0）"""
+    latencies = getattr(bot, 'latencies', None)  # 只有 AutoShardedBot 提供
+    if latencies is None:
+        return [(bot.shard_id or 0, _latency(bot.latency))]
+    return [(shard_id, _latency(latency)) for shard_id, latency in latencies]
+
+
+def shard_summary(bot):
+    """各分片的狀態摘要（分片ID、延遲、伺服器數、成員數、是否已斷線）"""
+    shards = {shard_id: {'id': shard_id, 'latency_ms': round(latency * 1000, 1), 'guilds': 0, 'members': 0}
+              for shard_id, latency in shard_latencies(bot)}
+    for guild in bot.guilds:
+        shard = shards.get(guild.shard_id)
+        if shard is not None:
+            shard['guilds'] += 1
+            shard['members'] += guild.member_count or 0
+    shard_infos = getattr(bot, 'shards', None)
+    for shard_id, shard in shards.items():
+        info = shard_infos.get(shard_id) if shard_infos else None
+        shard['closed'] = info.is_closed() if info is not None else bot.is_closed()
+    return sorted(shards.values(), key=lambda shard: shard['id'])
+
+
+def setup_metrics(bot):
+    """為機器人註冊指令計時鉤子、網關與各分片延遲量表以及事件循環延遲監控"""
+    GATEWAY_LATENCY.callback = lambda: _latency(bot.latency)
+    SHARD_LATENCY.callback = lambda: {(str(shard_id),): latency for shard_id, latency in shard_latencies(bot)}
+
+    def shard_guilds():
+        counts = {(str(shard_id),): 0 for shard_id, _ in shard_latencies(bot)}
+        for guild in bot.guilds:
+            key = (str(guild.shard_id),)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    SHARD_GUILDS.callback = shard_guilds
+
+    @bot.before_invoke
+    async def start_command_timer(ctx):
+        ctx.metrics_start = time.perf_counter()
+
+    @bot.after_invoke
+    async def record_command_timer(ctx):
+        start = getattr(ctx, 'metrics_start', None)
+        if start is not None and ctx.command is not None:
+            observe_command(ctx.command.qualified_name, time.perf_counter() - start, ctx.command_failed)
+
+    monitor = {'task': None}
+
+    @bot.listen('on_ready')
+    async def start_loop_monitor():
+        if monitor['task'] is None or monitor['task'].done():
+            monitor['task'] = asyncio.create_task(monitor_event_loop_lag())
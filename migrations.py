@@ -0,0 +1,102 @@
+"""
+資料庫遷移 - 有版本號的結構變更
+create_all 只會創建不存在的表格；已部署資料庫缺少的索引與欄位由這裡的遷移依序補上，不刪除任何資料
+新增遷移時在 MIGRATIONS 末尾加入下一個版本號，並在模型定義中同步加入相同的索引或欄位
+"""
+
+import logging
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = 'schema_migrations'
+
+
+def _has_table(connection, table):
+    return inspect(connection).has_table(table)
+
+
+def _create_index(connection, name, table, columns):
+    """創建索引（表格不存在時跳過，之後由 create_all 按模型定義創建）"""
+    if _has_table(connection, table):
+        connection.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'))
+
+
+def _add_column(connection, table, column, column_type):
+    """為已存在的表格加入缺少的欄位"""
+    if not _has_table(connection, table):
+        return
+    existing = {info['name'] for info in inspect(connection).get_columns(table)}
+    if column not in existing:
+        connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}'))
+
+
+def _hot_lookup_indexes(connection):
+    """為常用的篩選欄位加入複合索引"""
+    _create_index(connection, 'ix_team_applications_status_created_at', 'team_applications', ('status', 'created_at'))
+    _create_index(connection, 'ix_team_applications_user_id_status', 'team_applications', ('user_id', 'status'))
+    _create_index(connection, 'ix_password_resets_username_code', 'password_resets', ('username', 'verification_code'))
+    _create_index(connection, 'ix_voice_states_user_guild', 'voice_states', ('user_id', 'guild_id'))
+    _create_index(connection, 'ix_web_users_role_is_active', 'web_users', ('role', 'is_active'))
+
+
+def _web_user_contact_columns(connection):
+    """網站用戶加入電子郵件與電話欄位"""
+    _add_column(connection, 'web_users', 'email', 'VARCHAR(120)')
+    _add_column(connection, 'web_users', 'phone', 'VARCHAR(30)')
+
+
+def _application_keyset_index(connection):
+    """待審核申請的游標分頁索引 (status, created_at, id)，取代原本的 (status, created_at)"""
+    _create_index(connection, 'ix_team_applications_status_created_id', 'team_applications', ('status', 'created_at', 'id'))
+    connection.execute(text('DROP INDEX IF EXISTS ix_team_applications_status_created_at'))
+
+
+def _application_guild_column(connection):
+    """申請記錄加入所屬伺服器欄位（多伺服器模式下通知與指派身分組使用）"""
+    _add_column(connection, 'team_applications', 'guild_id', 'VARCHAR(50)')
+
+
+# (版本號, 說明, 遷移函數)，版本號只能遞增
+MIGRATIONS = [
+    (1, '熱門查詢欄位索引', _hot_lookup_indexes),
+    (2, '網站用戶聯絡資料欄位', _web_user_contact_columns),
+    (3, '申請游標分頁索引', _application_keyset_index),
+    (4, '申請所屬伺服器欄位', _application_guild_column),
+]
+
+
+def _ensure_migrations_table(connection):
+    connection.execute(text(
+        f'CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(200), '
+        'applied_at TIMESTAMP)'
+    ))
+
+
+def get_schema_version(engine):
+    """獲取資料庫目前的結構版本"""
+    with engine.begin() as connection:
+        _ensure_migrations_table(connection)
+        return connection.execute(text(f'SELECT MAX(version) FROM {MIGRATIONS_TABLE}')).scalar() or 0
+
+
+def upgrade(engine):
+    """依序執行尚未套用的遷移，返回套用的版本號列表"""
+    applied = []
+    with engine.begin() as connection:
+        _ensure_migrations_table(connection)
+        done = {row[0] for row in connection.execute(text(f'SELECT version FROM {MIGRATIONS_TABLE}'))}
+        for version, description, migrate in MIGRATIONS:
+            if version in done:
+                continue
+            migrate(connection)
+            connection.execute(
+                text(f'INSERT INTO {MIGRATIONS_TABLE} (version, description, applied_at) VALUES (:version, :description, :applied_at)'),
+                {'version': version, 'description': description, 'applied_at': datetime.utcnow()}
+            )
+            applied.append(version)
+            logger.info(f'已套用資料庫遷移 {version}: {description}')
+    return applied
@@ -5,9 +5,12 @@ Discord Bot - 資料庫模型
 
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, JSON
+from sqlalchemy import Column, Index, Integer, String, Text, DateTime, Boolean, JSON, func, tuple_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from database import get_engine, resolve_database_url, write_operation
+from application_stats import invalidate_application_stats
+from member_index import update_member_status
 
 Base = declarative_base()
 
@@ -15,6 +18,11 @@ class TeamApplication(Base):
     """戰隊申請模型"""
     __tablename__ = 'team_applications'
     
+    __table_args__ = (
+        Index('ix_team_applications_status_created_id', 'status', 'created_at', 'id'),
+        Index('ix_team_applications_user_id_status', 'user_id', 'status'),
+    )
+    
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String(50), nullable=False)  # Discord用戶ID
     username = Column(String(100), nullable=False)  # Discord用戶名
@@ -28,32 +36,24 @@ class TeamApplication(Base):
     reviewed_at = Column(DateTime)
     reviewed_by = Column(String(50))  # 審核者的Discord ID
     rejection_reason = Column(Text)  # 拒絕原因
+    guild_id = Column(String(50))  # 提交申請的伺服器ID（舊記錄為空）
 
 class DatabaseManager:
     """資料庫管理器"""
     
     def __init__(self):
-        import os
-        self.database_url = os.getenv('DATABASE_URL', 'sqlite:////tmp/grv_team_bot.db')
-        
-        # Ensure SQLite is used if database is not available
-        if 'sqlite' not in self.database_url:
-            if not self.database_url or 'ep-ancient-waterfall' in self.database_url:
-                self.database_url = 'sqlite:////tmp/grv_team_bot.db'
+        self.database_url = resolve_database_url('sqlite:////tmp/grv_team_bot.db')
         
-        # Configure SQLAlchemy for SQLite compatibility
-        kwargs = {'check_same_thread': False} if 'sqlite' in self.database_url else {}
-        self.engine = create_engine(self.database_url, connect_args=kwargs)
+        # 使用進程共用的引擎與連接池（表格只在首次取得時創建）
+        self.engine = get_engine(self.database_url, Base.metadata)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-        
-        # 創建所有表格
-        Base.metadata.create_all(bind=self.engine)
     
     def get_session(self):
         """獲取資料庫會話"""
         return self.SessionLocal()
     
-    def add_application(self, user_id, username, display_name, game_id, avatar_url, photos, application_text=""):
+    @write_operation
+    def add_application(self, user_id, username, display_name, game_id, avatar_url, photos, application_text="", guild_id=None):
         """添加新申請"""
         session = self.get_session()
         try:
@@ -64,10 +64,13 @@ class DatabaseManager:
                 game_id=game_id,
                 avatar_url=avatar_url,
                 application_photos=photos,
-                application_text=application_text
+                application_text=application_text,
+                guild_id=guild_id
             )
             session.add(application)
             session.commit()
+            invalidate_application_stats()
+            update_member_status(user_id, application.status)
             return application.id
         finally:
             session.close()
@@ -80,6 +83,33 @@ class DatabaseManager:
         finally:
             session.close()
     
+    def get_pending_applications_page(self, limit, after=None, before=None):
+        """以 (created_at, id) 游標分頁獲取待審核申請（由舊到新）
+        
+        after/before 為 (created_at, id)，返回 (本頁申請, 該方向是否還有更多)
+        """
+        session = self.get_session()
+        try:
+            key = tuple_(TeamApplication.created_at, TeamApplication.id)
+            query = session.query(TeamApplication).filter(TeamApplication.status == 'pending')
+            if before is not None:
+                query = query.filter(key < tuple_(*before)).order_by(
+                    TeamApplication.created_at.desc(), TeamApplication.id.desc()
+                )
+            else:
+                if after is not None:
+                    query = query.filter(key > tuple_(*after))
+                query = query.order_by(TeamApplication.created_at, TeamApplication.id)
+            
+            rows = query.limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if before is not None:
+                rows.reverse()
+            return rows, has_more
+        finally:
+            session.close()
+    
     def get_application_by_id(self, app_id):
         """根據ID獲取申請"""
         session = self.get_session()
@@ -88,6 +118,7 @@ class DatabaseManager:
         finally:
             session.close()
     
+    @write_operation
     def update_application_status(self, app_id, status, reviewed_by, rejection_reason=None):
         """更新申請狀態"""
         session = self.get_session()
@@ -100,10 +131,146 @@ class DatabaseManager:
                 if rejection_reason:
                     application.rejection_reason = rejection_reason
                 session.commit()
+                invalidate_application_stats()
+                latest_id = session.query(func.max(TeamApplication.id)).filter(
+                    TeamApplication.user_id == application.user_id
+                ).scalar()
+                # 成員索引取最新一份申請的狀態，審核舊申請不影響
+                if application.id == latest_id:
+                    update_member_status(application.user_id, status)
+                return True
+            return False
+        finally:
+            session.close()
+
+    @write_operation
+    def bulk_update_application_status(self, app_ids, status, reviewed_by, rejection_reason=None):
+        """以單一交易更新多份待審核申請的狀態
+        
+        返回 (已更新的申請, 找不到或已審核而跳過的ID)
+        """
+        session = self.get_session()
+        try:
+            app_ids = list(dict.fromkeys(int(app_id) for app_id in app_ids))
+            applications = session.query(TeamApplication).filter(
+                TeamApplication.id.in_(app_ids),
+                TeamApplication.status == 'pending'
+            ).all()
+            reviewed_at = datetime.utcnow()
+            for application in applications:
+                application.status = status
+                application.reviewed_by = reviewed_by
+                application.reviewed_at = reviewed_at
+                if rejection_reason:
+                    application.rejection_reason = rejection_reason
+            updated_ids = [application.id for application in applications]
+            updated_users = {application.user_id for application in applications}
+            session.commit()
+            
+            if not updated_ids:
+                return [], app_ids
+            invalidate_application_stats()
+            # 成員索引取最新一份申請的狀態，只更新本次審核到其最新申請的用戶
+            latest_ids = session.query(func.max(TeamApplication.id)).filter(
+                TeamApplication.user_id.in_(updated_users)
+            ).group_by(TeamApplication.user_id)
+            updated = set(updated_ids)
+            for user_id, app_id in session.query(TeamApplication.user_id, TeamApplication.id).filter(
+                TeamApplication.id.in_(latest_ids)
+            ):
+                if app_id in updated:
+                    update_member_status(user_id, status)
+            # 提交後以一次查詢重新載入，讓返回的申請在會話關閉後仍可讀取
+            applications = session.query(TeamApplication).filter(TeamApplication.id.in_(updated_ids)).all()
+            return applications, [app_id for app_id in app_ids if app_id not in updated]
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def get_pending_application_ids(self, limit=None):
+        """獲取待審核申請的ID（由舊到新，最多 limit 個）"""
+        session = self.get_session()
+        try:
+            return [row.id for row in session.query(TeamApplication.id)
+                    .filter(TeamApplication.status == 'pending')
+                    .order_by(TeamApplication.created_at, TeamApplication.id)
+                    .limit(limit)]
+        finally:
+            session.close()
+    
+    @write_operation
+    def update_application_photos(self, app_id, photos):
+        """更新申請照片"""
+        session = self.get_session()
+        try:
+            application = session.query(TeamApplication).filter_by(id=app_id).first()
+            if application:
+                application.application_photos = photos
+                session.commit()
                 return True
             return False
         finally:
             session.close()
+    
+    def get_application_by_user_id(self, user_id):
+        """根據Discord用戶ID獲取申請"""
+        session = self.get_session()
+        try:
+            return session.query(TeamApplication).filter_by(user_id=str(user_id)).first()
+        finally:
+            session.close()
+    
+    def get_latest_application_statuses(self):
+        """獲取每位用戶最新一份申請的狀態，返回 (用戶ID, 狀態) 列表"""
+        session = self.get_session()
+        try:
+            latest_ids = session.query(func.max(TeamApplication.id)).group_by(TeamApplication.user_id)
+            return session.query(TeamApplication.user_id, TeamApplication.status).filter(
+                TeamApplication.id.in_(latest_ids)
+            ).all()
+        finally:
+            session.close()
+
+    def get_application_stats(self, since):
+        """以聚合查詢統計各狀態數量、每日申請量與最早的待審核申請時間"""
+        session = self.get_session()
+        try:
+            status_counts = dict(
+                session.query(TeamApplication.status, func.count(TeamApplication.id))
+                .group_by(TeamApplication.status)
+                .all()
+            )
+            day = func.date(TeamApplication.created_at)
+            daily_counts = [
+                (str(date), count) for date, count in
+                session.query(day, func.count(TeamApplication.id))
+                .filter(TeamApplication.created_at >= since)
+                .group_by(day)
+                .order_by(day)
+                .all()
+            ]
+            oldest_pending = (
+                session.query(func.min(TeamApplication.created_at))
+                .filter(TeamApplication.status == 'pending')
+                .scalar()
+            )
+            return status_counts, daily_counts, oldest_pending
+        finally:
+            session.close()
+
+def encode_cursor(application):
+    """將申請的 (created_at, id) 編碼為分頁游標字串"""
+    return f'{application.created_at.isoformat()}_{application.id}'
+
+def decode_cursor(cursor):
+    """解析分頁游標字串，格式錯誤時返回 None"""
+    try:
+        created_at, app_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(app_id)
+    except (AttributeError, ValueError):
+        return None
 
 # 全局資料庫管理器實例
 _bot_db_instance = None
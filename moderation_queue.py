@@ -0,0 +1,128 @@
+"""
+Discord Bot - 審核動作佇列
+按伺服器排隊處理敏感詞命中：同頻道訊息合併批量刪除，同用戶警告私信合併為一則
+"""
+
+import asyncio
+import logging
+import time
+
+import discord
+
+# 批量刪除 API 單次最多 100 則訊息
+BULK_DELETE_LIMIT = 100
+
+
+class GuildModerationQueue:
+    """單一伺服器的審核佇列"""
+
+    def __init__(self, guild_id, batch_window=1.0):
+        self.logger = logging.getLogger(__name__)
+        self.guild_id = guild_id
+        self.batch_window = batch_window  # 收到第一個動作後等待合併的秒數
+        self.queue = asyncio.Queue()
+        self.worker = None
+        self.drained_batches = 0
+        self.drained_actions = 0
+        self.last_drain_ms = 0.0
+        self.max_drain_ms = 0.0
+
+    def put(self, message, matched_words):
+        """加入一個待處理的命中訊息"""
+        self.queue.put_nowait((message, matched_words))
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        """持續處理佇列直到清空"""
+        while not self.queue.empty():
+            await asyncio.sleep(self.batch_window)
+            start = time.perf_counter()
+            batch = []
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._drain(batch)
+            except Exception as e:
+                self.logger.error(f'審核佇列處理失敗 (伺服器 {self.guild_id}): {e}')
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.drained_batches += 1
+            self.drained_actions += len(batch)
+            self.last_drain_ms = elapsed_ms
+            self.max_drain_ms = max(self.max_drain_ms, elapsed_ms)
+
+    async def _drain(self, batch):
+        """執行一批動作：按頻道批量刪除、按用戶合併警告"""
+        by_channel = {}
+        by_user = {}
+        for message, matched_words in batch:
+            channel_entry = by_channel.setdefault(message.channel.id, (message.channel, []))
+            channel_entry[1].append(message)
+            user_entry = by_user.setdefault(message.author.id, (message.author, {}))
+            for word in matched_words:
+                user_entry[1].setdefault(word, None)
+
+        for channel, messages in by_channel.values():
+            await self._delete_messages(channel, messages)
+
+        for user, words in by_user.values():
+            try:
+                await user.send(f"⚠️ 訊息包含不允許的詞彙: {', '.join(words)}")
+            except (discord.Forbidden, discord.HTTPException):
+                pass
+
+    async def _delete_messages(self, channel, messages):
+        """批量刪除訊息，批量失敗時退回逐則刪除"""
+        for i in range(0, len(messages), BULK_DELETE_LIMIT):
+            chunk = messages[i:i + BULK_DELETE_LIMIT]
+            try:
+                if len(chunk) == 1 or not hasattr(channel, 'delete_messages'):
+                    for message in chunk:
+                        await message.delete()
+                else:
+                    await channel.delete_messages(chunk)
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                # 超過14天的訊息無法批量刪除，改為逐則處理
+                self.logger.debug(f'批量刪除失敗，改為逐則刪除: {e}')
+                for message in chunk:
+                    try:
+                        await message.delete()
+                    except discord.HTTPException:
+                        pass
+
+    def get_stats(self):
+        """獲取佇列統計"""
+        return {
+            'depth': self.queue.qsize(),
+            'drained_batches': self.drained_batches,
+            'drained_actions': self.drained_actions,
+            'last_drain_ms': round(self.last_drain_ms, 2),
+            'max_drain_ms': round(self.max_drain_ms, 2)
+        }
+
+
+class ModerationQueue:
+    """所有伺服器的審核佇列管理器"""
+
+    def __init__(self, batch_window=1.0):
+        self.batch_window = batch_window
+        self.guild_queues = {}
+
+    def enqueue(self, message, matched_words):
+        """將命中敏感詞的訊息排入對應伺服器的佇列"""
+        guild_id = message.guild.id if message.guild else None
+        queue = self.guild_queues.get(guild_id)
+        if queue is None:
+            queue = GuildModerationQueue(guild_id, self.batch_window)
+            self.guild_queues[guild_id] = queue
+        queue.put(message, matched_words)
+
+    def get_depth(self):
+        """獲取所有佇列的待處理總數"""
+        return sum(queue.queue.qsize() for queue in self.guild_queues.values())
+
+    def get_stats(self):
+        """獲取每個伺服器的佇列統計"""
+        return {str(guild_id): queue.get_stats() for guild_id, queue in list(self.guild_queues.items())}
@@ -0,0 +1,117 @@
+"""
+非同步資料存取層 - 在專用線程池中執行資料庫查詢
+機器人端以 await 呼叫，查詢執行期間事件循環可以繼續處理網關事件
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = None
+
+
+def get_db_executor():
+    """獲取資料庫專用線程池（線程數不超過連接池大小，避免等待連接）"""
+    global _executor
+    if _executor is None:
+        workers = int(os.getenv('DB_EXECUTOR_WORKERS', os.getenv('DB_POOL_SIZE', '5')))
+        _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='db')
+    return _executor
+
+
+async def run_db(func, *args, **kwargs):
+    """在資料庫線程池中執行同步的資料庫函數"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(func, *args, **kwargs))
+
+
+class ApplicationRepository:
+    """戰隊申請的非同步存取"""
+
+    def __init__(self, db=None):
+        if db is None:
+            from models import get_bot_database
+            db = get_bot_database()
+        self.db = db
+
+    async def add_application(self, user_id, username, display_name, game_id, avatar_url, photos, application_text="", guild_id=None):
+        return await run_db(self.db.add_application, user_id, username, display_name,
+                            game_id, avatar_url, photos, application_text, guild_id)
+
+    async def get_application_by_id(self, app_id):
+        return await run_db(self.db.get_application_by_id, app_id)
+
+    async def get_application_by_user_id(self, user_id):
+        return await run_db(self.db.get_application_by_user_id, user_id)
+
+    async def get_pending_applications(self):
+        return await run_db(self.db.get_pending_applications)
+
+    async def get_pending_applications_page(self, limit, after=None, before=None):
+        return await run_db(self.db.get_pending_applications_page, limit, after, before)
+
+    async def get_pending_count(self):
+        from application_stats import get_application_stats_service
+        stats = await run_db(get_application_stats_service().get_stats)
+        return stats['counts']['pending']
+
+    async def update_application_status(self, app_id, status, reviewed_by, rejection_reason=None):
+        return await run_db(self.db.update_application_status, app_id, status, reviewed_by, rejection_reason)
+
+    async def bulk_update_application_status(self, app_ids, status, reviewed_by, rejection_reason=None):
+        return await run_db(self.db.bulk_update_application_status, app_ids, status, reviewed_by, rejection_reason)
+
+    async def get_pending_application_ids(self, limit=None):
+        return await run_db(self.db.get_pending_application_ids, limit)
+
+    async def update_application_photos(self, app_id, photos):
+        return await run_db(self.db.update_application_photos, app_id, photos)
+
+
+class WebRepository:
+    """網站資料（歡迎設置、網站用戶、自定義指令等）的非同步存取"""
+
+    def __init__(self, web_db=None):
+        if web_db is None:
+            from web_models import get_web_database
+            web_db = get_web_database()
+        self.web_db = web_db
+
+    async def get_welcome_settings(self, guild_id, enabled_only=False):
+        return await run_db(self.web_db.get_welcome_settings, guild_id, enabled_only)
+
+    async def get_user_by_id(self, user_id):
+        return await run_db(self.web_db.get_user_by_id, user_id)
+
+    async def get_user_by_username(self, username):
+        return await run_db(self.web_db.get_user_by_username, username)
+
+    async def get_admin_users(self):
+        return await run_db(self.web_db.get_admin_users)
+
+    async def get_custom_commands(self):
+        return await run_db(self.web_db.get_custom_commands)
+
+    async def get_sensitive_words(self):
+        return await run_db(self.web_db.get_sensitive_words)
+
+
+_application_repository = None
+_web_repository = None
+
+
+def get_application_repository():
+    """獲取戰隊申請存取層（延遲初始化）"""
+    global _application_repository
+    if _application_repository is None:
+        _application_repository = ApplicationRepository()
+    return _application_repository
+
+
+def get_web_repository():
+    """獲取網站資料存取層（延遲初始化）"""
+    global _web_repository
+    if _web_repository is None:
+        _web_repository = WebRepository()
+    return _web_repository
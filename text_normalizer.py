@@ -0,0 +1,119 @@
+"""
+Discord Bot - 文字正規化模組
+在敏感詞過濾前將訊息折疊為統一形式：NFKC、零寬字元移除、相似字元折疊與繁簡轉換
+"""
+
+import unicodedata
+from functools import lru_cache
+
+# 零寬與不可見格式字元（直接移除）
+ZERO_WIDTH_CHARS = (
+    '\u00ad'  # 軟連字號
+    '\u034f'  # 組合字形連接符
+    '\u061c'  # 阿拉伯字母標記
+    '\u115f\u1160\u3164\uffa0'  # 韓文填充字元
+    '\u17b4\u17b5'
+    '\u180b\u180c\u180d\u180e'
+    '\u200b\u200c\u200d\u200e\u200f'  # 零寬空格 / 連接符 / 方向標記
+    '\u202a\u202b\u202c\u202d\u202e'
+    '\u2060\u2061\u2062\u2063\u2064'
+    '\u2066\u2067\u2068\u2069'
+    '\ufe00\ufe01\ufe02\ufe03\ufe04\ufe05\ufe06\ufe07'  # 變體選擇符
+    '\ufe08\ufe09\ufe0a\ufe0b\ufe0c\ufe0d\ufe0e\ufe0f'
+    '\ufeff'  # BOM
+)
+
+# 相似字元折疊（NFKC 不會處理的小型大寫字母、西里爾與希臘字母等）
+# 格式：目標字母 -> 所有會被折疊成它的字元
+CONFUSABLE_GROUPS = {
+    'a': 'ᴀаɑαⱥ',
+    'b': 'ʙвβƀ',
+    'c': 'ᴄсϲ',
+    'd': 'ᴅԁđ',
+    'e': 'ᴇеєεɛ',
+    'f': 'ꜰғ',
+    'g': 'ɢɡǥ',
+    'h': 'ʜнһ',
+    'i': 'ɪіιıɩ',
+    'j': 'ᴊј',
+    'k': 'ᴋкκ',
+    'l': 'ʟӏł',
+    'm': 'ᴍм',
+    'n': 'ɴпη',
+    'o': 'ᴏоοσ',
+    'p': 'ᴘрρ',
+    'q': 'ǫԛ',
+    'r': 'ʀɼ',
+    's': 'ꜱѕ',
+    't': 'ᴛтτ',
+    'u': 'ᴜυ',
+    'v': 'ᴠνѵ',
+    'w': 'ᴡԝω',
+    'x': 'хχ',
+    'y': 'ʏуγү',
+    'z': 'ᴢ',
+}
+
+# 常用繁體字 -> 簡體字對照（每項兩個字元：繁體、簡體）
+TRADITIONAL_TO_SIMPLIFIED = (
+    '們们 個个 來来 這这 說说 話话 為为 時时 會会 對对 國国 學学 從从 還还 沒没 後后 過过 發发 髮发 '
+    '現现 點点 關关 問问 題题 開开 見见 長长 體体 聽听 親亲 愛爱 義义 專专 業业 東东 車车 馬马 鳥鸟 魚鱼 '
+    '龍龙 門门 間间 聞闻 電电 腦脑 號号 機机 氣气 樂乐 無无 實实 寫写 應应 當当 經经 頭头 錢钱 買买 賣卖 '
+    '讀读 認认 識识 讓让 請请 謝谢 給给 紅红 綠绿 藍蓝 黃黄 書书 畫画 圖图 場场 報报 歲岁 歡欢 觀观 戰战 '
+    '隊队 員员 務务 動动 勞劳 華华 萬万 與与 變变 語语 詞词 論论 調调 護护 傳传 價价 優优 兒儿 內内 幾几 '
+    '億亿 麼么 廣广 將将 帶带 幫帮 師师 強强 總总 滿满 漢汉 灣湾 爾尔 狀状 獎奖 環环 產产 畢毕 盡尽 監监 '
+    '碼码 礎础 禮礼 種种 積积 窮穷 筆笔 節节 簡简 級级 紀纪 約约 結结 絕绝 統统 網网 線线 練练 組组 細细 '
+    '續续 聯联 職职 舊旧 艦舰 藝艺 處处 術术 衛卫 複复 規规 視视 覺觉 計计 記记 設设 許许 試试 詳详 誰谁 '
+    '課课 負负 財财 貨货 質质 賽赛 趕赶 跡迹 躍跃 較较 輕轻 輸输 辦办 邊边 運运 遠远 適适 選选 遺遗 醫医 '
+    '鐘钟 鐵铁 錯错 鍵键 陽阳 隨随 險险 難难 雙双 雞鸡 離离 靜静 頁页 順顺 須须 預预 領领 顏颜 風风 飛飞 '
+    '飯饭 餓饿 館馆 驗验 鬥斗 麗丽 黨党 齊齐 齒齿 龜龟 殺杀 罵骂 幹干 賤贱 媽妈 爺爷 雜杂 聖圣 嗎吗 讚赞 '
+    '贏赢 賭赌 脫脱 槍枪 彈弹 詐诈 騙骗 帳账 廢废 殘残 傷伤 幣币 錄录 廳厅 慶庆 憑凭 戲戏 擊击 擔担 據据 '
+    '擴扩 攝摄 敗败 敵敌 數数 斷断 曆历 歷历 楊杨 標标 樣样 橋桥 檢检 權权 歐欧 決决 況况 淚泪 測测 溫温 '
+    '滅灭 漁渔 澤泽 濟济 燈灯 營营 爭争 牆墙 獨独 獲获 瑪玛 異异 療疗 盤盘 眾众 確确 稱称 穩稳 競竞 範范 '
+    '糧粮 紙纸 終终 絲丝 維维 緒绪 緣缘 縣县 繼继 罷罢 羅罗 聲声 肅肃 腳脚 膠胶 興兴 舉举 艱艰 莊庄 蘋苹 '
+    '蝦虾 蟲虫 補补 裝装 裡里 覽览 訂订 訊讯 託托 訪访 評评 譯译 貓猫 豐丰 貝贝 貴贵 費费 資资 賓宾 賬账 '
+    '贈赠 趙赵 軍军 軟软 轉转 農农 達达 遲迟 郵邮 鄉乡 針针 銀银 鋼钢 鏡镜 閉闭 閱阅 陸陆 隱隐 雖虽 靈灵 '
+    '響响 頂顶 項项 頻频 類类 飲饮 餘余 驚惊 髒脏 鬧闹 鮮鲜 麥麦 團团 區区 單单 嚴严 園园 圍围 壓压 壞坏 '
+    '夢梦 奪夺 奮奋 婦妇 孫孙 寶宝 導导 層层 島岛 庫库 徵征 憶忆 懷怀 戶户 掃扫 掛挂 換换 擇择 晉晋 暫暂 '
+    '條条 極极 構构 槓杠 歸归 殼壳 湯汤 準准 溝沟 燒烧 爛烂 牽牵 猶犹 獅狮 瘋疯 癢痒 盜盗 睏困 礦矿 禍祸 '
+    '筍笋 籃篮 紐纽 純纯 紗纱 納纳 緊紧 編编 縮缩 繩绳 罰罚 羨羡 習习 聰聪 膚肤 臉脸 臨临 蓋盖 薦荐 藥药 '
+    '蘭兰 虛虚 蠻蛮 衝冲 襲袭 訴诉 詩诗 誇夸 誤误 誠诚 謊谎 證证 議议 豬猪 貧贫 販贩 貼贴 賀贺 賴赖 購购 '
+    '贊赞 趨趋 蹤踪 '
+)
+
+
+def _build_translation_table():
+    """建立一次性的字元轉換表（零寬移除 + 相似字元 + 繁簡轉換）"""
+    table = {}
+    for pair in TRADITIONAL_TO_SIMPLIFIED.split():
+        traditional, simplified = pair
+        if traditional != simplified:
+            table[ord(traditional)] = simplified
+    for target, sources in CONFUSABLE_GROUPS.items():
+        for ch in sources:
+            table[ord(ch)] = target
+    for ch in ZERO_WIDTH_CHARS:
+        table[ord(ch)] = None
+    return table
+
+
+# 模組載入時建立，之後只讀
+TRANSLATION_TABLE = _build_translation_table()
+
+# 正規化結果快取大小（以內容為鍵，重複的洗版訊息只會正規化一次）
+NORMALIZE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text):
+    """將文字折疊為過濾用的統一形式"""
+    if text.isascii():
+        # ASCII 文字 NFKC 與折疊皆無作用，只需轉小寫
+        return text.lower()
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return text.translate(TRANSLATION_TABLE)
+
+
+def get_cache_info():
+    """獲取正規化快取統計"""
+    return normalize_text.cache_info()
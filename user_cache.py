@@ -0,0 +1,133 @@
+"""
+網站用戶快取 - Flask-Login 用戶載入器使用的 LRU/TTL 快取
+每個已登入的請求（包括面板的 JSON 輪詢）直接從內存取得輕量用戶記錄，修改用戶的端點負責使快取失效
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# 快取記錄中保存的用戶欄位
+USER_FIELDS = (
+    'id', 'username', 'password_hash', 'role', 'discord_id', 'email', 'phone', 'is_active',
+    'is_approved', 'approval_status', 'last_login', 'created_at', 'created_by'
+)
+
+
+class CachedUser:
+    """與資料庫會話無關的輕量用戶記錄，提供模板與權限檢查使用的屬性和方法"""
+
+    __slots__ = USER_FIELDS
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user):
+        for field in USER_FIELDS:
+            setattr(self, field, getattr(user, field, None))
+
+    def get_id(self):
+        return str(self.id)
+
+    def check_password(self, password):
+        """驗證密碼"""
+        from web_models import WebUser
+        return WebUser.check_password(self, password)
+
+    def get_role_display(self):
+        """獲取權限顯示名稱"""
+        from web_models import WebUser
+        return WebUser.get_role_display(self)
+
+
+class UserCache:
+    """按用戶ID的 LRU 快取，記錄超過 TTL 後重新查詢"""
+
+    def __init__(self, web_db=None, max_size=None, ttl=None):
+        self._web_db = web_db
+        self.max_size = max_size if max_size is not None else int(os.getenv('USER_CACHE_SIZE', '1024'))
+        self.ttl = ttl if ttl is not None else float(os.getenv('USER_CACHE_TTL', '60'))
+        self._entries = OrderedDict()  # 用戶ID -> (過期時間, CachedUser)
+        self._generation = 0  # 每次失效遞增，避免查詢期間失效的舊記錄被寫回快取
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def web_db(self):
+        if self._web_db is None:
+            from web_models import get_web_database
+            self._web_db = get_web_database()
+        return self._web_db
+
+    def get(self, user_id):
+        """獲取用戶記錄，未快取或已過期時查詢資料庫（用戶不存在時返回 None）"""
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        user = self.web_db.get_user_by_id(user_id)
+        if user is None:
+            return None
+        cached = CachedUser(user)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user_id] = (time.monotonic() + self.ttl, cached)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return cached
+
+    def put(self, user):
+        """以最新的用戶資料更新快取（例如登入時資料庫尚未寫入的 last_login）"""
+        cached = CachedUser(user)
+        with self._lock:
+            self._entries[cached.id] = (time.monotonic() + self.ttl, cached)
+            self._entries.move_to_end(cached.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._generation += 1
+
+    def invalidate(self, user_id=None):
+        """清除指定用戶（或全部）的快取"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(user_id), None)
+            self._generation += 1
+
+    def get_stats(self):
+        """獲取快取統計"""
+        return {
+            'entries': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+_user_cache = None
+
+
+def get_user_cache():
+    """獲取網站用戶快取（延遲初始化）"""
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = UserCache()
+    return _user_cache
+
+
+def invalidate_user(user_id=None):
+    """使用戶快取失效（快取尚未建立時無需處理）"""
+    if _user_cache is not None:
+        _user_cache.invalidate(user_id)
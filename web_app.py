@@ -4,7 +4,7 @@
 """
 # type: ignore
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session as flask_session
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, stream_with_context, session as flask_session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 import discord
@@ -13,12 +13,29 @@ import threading
 import logging
 import os
 import json
+import re
+import time
 from datetime import datetime, timedelta
 import random
 import string
 from web_models import WebUser, UserRole, BotCommand, get_web_database, PasswordReset, WelcomeSettings
-from models import get_bot_database
+from models import get_bot_database, encode_cursor, decode_cursor
 from email_service import get_email_service
+from word_filter import get_snapshot, load_sensitive_words
+from custom_commands import get_command_table, load_custom_commands
+from logging_config import get_log_levels, set_log_level
+from database import get_pool_stats
+from application_stats import get_application_stats_service
+from welcome_cache import get_welcome_cache
+from user_cache import get_user_cache
+from write_behind import get_write_behind
+from repositories import run_db
+from member_index import ensure_guild_index, get_member_index
+from member_directory import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, get_member_directory
+from member_cache import ensure_members_loaded, get_member_chunker, members_loaded
+from member_export import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MemberFilters, get_member_page, stream_members_ndjson
+from bulk_review import MAX_BULK_REVIEW, REVIEW_ACTIONS, get_review_notifier, notify_reviewed, summarize, unsent_results
+from metrics import observe_bridge, shard_summary, registry as metrics_registry
 
 app = Flask(__name__, template_folder='web/templates', static_folder='web/static')
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'your-secret-key-here')
@@ -36,8 +53,8 @@ def get_databases():
 
 @login_manager.user_loader
 def load_user(user_id):
-    web_db, _ = get_databases()
-    return web_db.get_user_by_id(int(user_id))
+    # 從用戶快取取得輕量記錄，已快取時不查詢資料庫
+    return get_user_cache().get(user_id)
 
 # 權限裝飾器
 def require_role(required_role):
@@ -59,6 +76,9 @@ def require_role(required_role):
         return wrapper
     return decorator
 
+# 申請管理頁面每頁顯示數量
+APPLICATIONS_PAGE_SIZE = 20
+
 # 獲取機器人實例的全局變數
 discord_bot_instance = None
 global_voice_client = None  # 全局語音客戶端（用於 TTS）
@@ -68,6 +88,42 @@ def set_bot_instance(bot):
     global discord_bot_instance
     discord_bot_instance = bot
 
+def run_on_bot_loop(coro, timeout=None):
+    """在機器人事件循環中執行協程並等待結果（記錄橋接呼叫耗時）"""
+    start = time.perf_counter()
+    call_name = coro.__name__
+    try:
+        return asyncio.run_coroutine_threadsafe(coro, discord_bot_instance.bot.loop).result(timeout=timeout)  # type: ignore
+    finally:
+        observe_bridge(call_name, time.perf_counter() - start)
+
+def get_target_guild(guild_id=None):
+    """獲取請求指定的伺服器（guild_id 參數）；未指定時只有機器人僅在一個伺服器時使用該伺服器，否則返回 None"""
+    bot = discord_bot_instance.bot  # type: ignore
+    if guild_id is None:
+        guild_id = request.args.get('guild_id') or (request.get_json(silent=True) or {}).get('guild_id')
+    if guild_id:
+        try:
+            return bot.get_guild(int(guild_id))
+        except (TypeError, ValueError):
+            return None
+    return bot.guilds[0] if len(bot.guilds) == 1 else None
+
+def load_guild_members(guild):
+    """需要完整成員列表前確保伺服器成員已分塊載入（lazy / on_demand 模式下首次載入大型伺服器可能需要數秒）"""
+    if not members_loaded(guild):
+        run_on_bot_loop(ensure_members_loaded(guild), timeout=60)
+
+def start_loading_members(guild):
+    """在機器人事件循環中開始背景分塊載入伺服器成員，不等待完成（不論分塊模式）"""
+    chunker = get_member_chunker()
+    if chunker is not None:
+        discord_bot_instance.bot.loop.call_soon_threadsafe(chunker.start_chunk, guild)  # type: ignore
+
+def guild_not_found():
+    """找不到伺服器時的錯誤回應"""
+    return jsonify({'error': '伺服器未找到（機器人在多個伺服器時請指定 guild_id）'}), 404
+
 def set_voice_client(vc):
     """設置全局語音客戶端"""
     global global_voice_client
@@ -100,15 +156,10 @@ def login():
                 flash('您的帳號還未通過隊長審核，請耐心等待', 'error')
                 return render_template('login.html')
             
-            # 更新最後登錄時間
-            web_db, _ = get_databases()
-            session = web_db.get_session()
-            try:
-                user.last_login = datetime.utcnow()  # type: ignore
-                session.merge(user)
-                session.commit()
-            finally:
-                session.close()
+            # 更新最後登錄時間（延遲批量寫入，不阻塞登錄；用戶快取立即使用新值）
+            user.last_login = datetime.utcnow()  # type: ignore
+            get_write_behind().set(WebUser, user.id, last_login=user.last_login)
+            get_user_cache().put(user)
             
             login_user(user)
             flash(f'歡迎回來，{user.username}！', 'success')
@@ -148,35 +199,20 @@ def register():
         # 創建新用戶（is_approved=False，需要隊長審核）
         try:
             web_db, _ = get_databases()
-            session = web_db.get_session()
-            try:
-                new_user = WebUser(
-                    username=username,
-                    role=UserRole.MEDIUM,
-                    is_active=True,
-                    is_approved=False,  # 待審核
-                    approval_status='pending',
-                    created_by='self_register',
-                    created_at=datetime.utcnow()
-                )
-                new_user.set_password(password)
-                session.add(new_user)
-                session.commit()
-                
-                # 發送Discord DM申請到隊長
-                if discord_bot_instance and hasattr(discord_bot_instance, 'bot'):
-                    try:
-                        asyncio.run_coroutine_threadsafe(
-                            send_account_approval_request(username),
-                            discord_bot_instance.bot.loop
-                        )
-                    except Exception as e:
-                        print(f"發送申請DM失敗: {e}")
-                
-                flash('✅ 註冊成功！請耐心等待隊長審核', 'success')
-                return redirect(url_for('login'))
-            finally:
-                session.close()
+            web_db.register_user(username, password)
+            
+            # 發送Discord DM申請到隊長
+            if discord_bot_instance and hasattr(discord_bot_instance, 'bot'):
+                try:
+                    asyncio.run_coroutine_threadsafe(
+                        send_account_approval_request(username),
+                        discord_bot_instance.bot.loop
+                    )
+                except Exception as e:
+                    print(f"發送申請DM失敗: {e}")
+            
+            flash('✅ 註冊成功！請耐心等待隊長審核', 'success')
+            return redirect(url_for('login'))
         except Exception as e:
             flash(f'創建帳號失敗: {str(e)}', 'error')
             return render_template('register.html')
@@ -217,21 +253,13 @@ async def send_account_approval_request(username):
             async def approve_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
                 try:
                     web_db, _ = get_databases()
-                    session = web_db.get_session()
-                    try:
-                        acc = session.query(WebUser).filter_by(username=self.username).first()
-                        if acc:
-                            acc.is_approved = True  # type: ignore
-                            acc.approval_status = 'approved'  # type: ignore
-                            session.commit()
-                            await interaction.response.send_message(f"✅ 已批准用戶 {self.username}！", ephemeral=True)
-                            # 禁用按鈕
-                            button.disabled = True
-                            await interaction.message.edit(view=self.view)  # type: ignore
-                        else:
-                            await interaction.response.send_message(f"❌ 找不到用戶 {self.username}", ephemeral=True)
-                    finally:
-                        session.close()
+                    if await run_db(web_db.set_user_approval, self.username, 'approved'):
+                        await interaction.response.send_message(f"✅ 已批准用戶 {self.username}！", ephemeral=True)
+                        # 禁用按鈕
+                        button.disabled = True
+                        await interaction.message.edit(view=self.view)  # type: ignore
+                    else:
+                        await interaction.response.send_message(f"❌ 找不到用戶 {self.username}", ephemeral=True)
                 except Exception as e:
                     await interaction.response.send_message(f"❌ 批准失敗: {str(e)}", ephemeral=True)
             
@@ -239,21 +267,14 @@ async def send_account_approval_request(username):
             async def reject_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
                 try:
                     web_db, _ = get_databases()
-                    session = web_db.get_session()
-                    try:
-                        acc = session.query(WebUser).filter_by(username=self.username).first()
-                        if acc:
-                            # 刪除帳號而不是只改狀態，讓用戶可以重新用同一用戶名註冊
-                            session.delete(acc)
-                            session.commit()
-                            await interaction.response.send_message(f"❌ 已拒絕用戶 {self.username}，帳號已刪除！", ephemeral=True)
-                            # 禁用按鈕
-                            button.disabled = True
-                            await interaction.message.edit(view=self.view)  # type: ignore
-                        else:
-                            await interaction.response.send_message(f"❌ 找不到用戶 {self.username}", ephemeral=True)
-                    finally:
-                        session.close()
+                    # 刪除帳號而不是只改狀態，讓用戶可以重新用同一用戶名註冊
+                    if await run_db(web_db.delete_user, self.username):
+                        await interaction.response.send_message(f"❌ 已拒絕用戶 {self.username}，帳號已刪除！", ephemeral=True)
+                        # 禁用按鈕
+                        button.disabled = True
+                        await interaction.message.edit(view=self.view)  # type: ignore
+                    else:
+                        await interaction.response.send_message(f"❌ 找不到用戶 {self.username}", ephemeral=True)
                 except Exception as e:
                     await interaction.response.send_message(f"❌ 拒絕失敗: {str(e)}", ephemeral=True)
         
@@ -278,19 +299,13 @@ def approve_account():
     if not user:
         return jsonify({'error': '用戶不存在'}), 404
     
-    session = web_db.get_session()
     try:
-        user.is_approved = True  # type: ignore
-        user.approval_status = 'approved'  # type: ignore
-        session.merge(user)
-        session.commit()
+        web_db.set_user_approval(username, 'approved')
         
         # 可選：發送DM確認給用戶
         return jsonify({'success': True, 'message': f'已批准用戶 {username}'})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
-    finally:
-        session.close()
 
 @app.route('/api/reject-account', methods=['POST'])
 @login_required
@@ -306,17 +321,12 @@ def reject_account():
     if not user:
         return jsonify({'error': '用戶不存在'}), 404
     
-    session = web_db.get_session()
     try:
-        user.approval_status = 'rejected'  # type: ignore
-        session.merge(user)
-        session.commit()
+        web_db.set_user_approval(username, 'rejected')
         
         return jsonify({'success': True, 'message': f'已拒絕用戶 {username}'})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
-    finally:
-        session.close()
 
 @app.route('/api/change-username', methods=['POST'])
 @login_required
@@ -335,24 +345,16 @@ def change_username():
     if existing:
         return jsonify({'error': '此用戶名已被使用'}), 400
     
-    session = web_db.get_session()
     try:
-        user = session.query(WebUser).filter_by(id=current_user.id).first()
-        if not user:
+        if not web_db.update_user_fields(current_user.id, username=new_username):
             return jsonify({'error': '用戶不存在'}), 404
         
-        user.username = new_username
-        session.commit()
-        
         # 更新當前用戶物件以保持會話一致性
         current_user.username = new_username
         
         return jsonify({'success': True, 'message': '用戶名已更改', 'new_username': new_username})
     except Exception as e:
-        session.rollback()
         return jsonify({'error': str(e)}), 400
-    finally:
-        session.close()
 
 @app.route('/logout')
 @login_required
@@ -370,9 +372,8 @@ def dashboard():
         flash('你的權限不夠，請去私信隊長來申請', 'error')
         return render_template('restricted.html')
     
-    # 獲取基本統計
-    _, bot_db = get_databases()
-    pending_applications = len(bot_db.get_pending_applications())
+    # 獲取基本統計（聚合查詢並短暫快取）
+    application_stats = get_application_stats_service().get_stats()
     
     # 獲取機器人狀態
     bot_status = {
@@ -382,9 +383,18 @@ def dashboard():
     }
     
     return render_template('dashboard.html', 
-                         pending_applications=pending_applications,
+                         pending_applications=application_stats['counts']['pending'],
+                         application_stats=application_stats,
                          bot_status=bot_status)
 
+@app.route('/api/applications/stats')
+@login_required
+@require_role(UserRole.MEDIUM)
+def application_stats_api():
+    """獲取申請統計API（各狀態數量、每日申請量、審核積壓）"""
+    service = get_application_stats_service()
+    return jsonify({**service.get_stats(), 'cache': service.get_cache_info()})
+
 @app.route('/applications')
 @login_required
 def applications():
@@ -394,8 +404,25 @@ def applications():
         return redirect(url_for('dashboard'))
     
     _, bot_db = get_databases()
-    applications = bot_db.get_pending_applications()
-    return render_template('applications.html', applications=applications)
+    after = decode_cursor(request.args.get('after'))
+    before = decode_cursor(request.args.get('before'))
+    applications, has_more = bot_db.get_pending_applications_page(
+        APPLICATIONS_PAGE_SIZE, after=after, before=None if after else before
+    )
+    if before and not after and not applications:
+        # 前面的申請已被審核，回到第一頁
+        before = None
+        applications, has_more = bot_db.get_pending_applications_page(APPLICATIONS_PAGE_SIZE)
+    if before and not after:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after is not None, has_more
+    
+    return render_template('applications.html',
+                         applications=applications,
+                         total_pending=get_application_stats_service().get_stats()['counts']['pending'],
+                         prev_cursor=encode_cursor(applications[0]) if has_prev and applications else None,
+                         next_cursor=encode_cursor(applications[-1]) if has_next and applications else None)
 
 @app.route('/api/application/<int:app_id>/approve', methods=['POST'])
 @login_required
@@ -429,6 +456,57 @@ def reject_application(app_id):
     else:
         return jsonify({'error': '操作失敗'}), 400
 
+@app.route('/api/applications/bulk-review', methods=['POST'])
+@login_required
+def bulk_review_applications():
+    """批量審核申請API（ids 為申請ID列表，或 all 為 true 時審核全部待審核申請）"""
+    if current_user.role == UserRole.LOW:
+        return jsonify({'error': '權限不足'}), 403
+    
+    data = request.json or {}
+    status = REVIEW_ACTIONS.get(data.get('action'))
+    if status is None:
+        return jsonify({'error': '無效的審核動作'}), 400
+    reason = (data.get('reason') or '').strip() or ('未提供原因' if status == 'rejected' else None)
+    
+    _, bot_db = get_databases()
+    if data.get('all'):
+        app_ids = bot_db.get_pending_application_ids(MAX_BULK_REVIEW)
+    else:
+        try:
+            app_ids = [int(app_id) for app_id in data.get('ids') or []]
+        except (TypeError, ValueError):
+            return jsonify({'error': '無效的申請ID'}), 400
+    if not app_ids:
+        return jsonify({'error': '沒有選擇任何申請'}), 400
+    if len(app_ids) > MAX_BULK_REVIEW:
+        return jsonify({'error': f'單次最多審核 {MAX_BULK_REVIEW} 份申請'}), 400
+    
+    applications, skipped = bot_db.bulk_update_application_status(app_ids, status, str(current_user.id), reason)
+    
+    if discord_bot_instance and hasattr(discord_bot_instance, 'bot') and not discord_bot_instance.bot.is_closed():
+        bot = discord_bot_instance.bot
+        guild = get_target_guild()  # 沒有記錄伺服器的舊申請使用此伺服器
+        try:
+            results = run_on_bot_loop(
+                notify_reviewed(get_review_notifier(bot), applications, status, reason, guild), timeout=300
+            )
+        except TimeoutError:
+            # 狀態已更新，通知仍在機器人事件循環中繼續發送
+            results = unsent_results(applications, status, 'pending')
+    else:
+        # 機器人未連接：狀態已更新，但無法私信通知
+        results = unsent_results(applications, status, 'skipped')
+    
+    report = summarize(results, skipped)
+    action = '接受' if status == 'approved' else '拒絕'
+    message = f'已{action} {report["updated"]} 份申請'
+    if report['dm_pending']:
+        message += '，私信通知仍在背景發送中'
+    if data.get('all') and len(app_ids) == MAX_BULK_REVIEW:
+        message += f'（單次最多 {MAX_BULK_REVIEW} 份，如仍有待審核的申請請再次執行）'
+    return jsonify({'success': True, 'message': message, **report})
+
 @app.route('/welcome')
 @login_required
 @require_role(UserRole.HIGH)
@@ -438,13 +516,23 @@ def welcome_settings():
         flash('機器人未連接', 'error')
         return redirect(url_for('dashboard'))
     
-    web_db, _ = get_databases()
-    session = web_db.get_session()
-    guild_id = str(discord_bot_instance.bot.guilds[0].id) if discord_bot_instance.bot.guilds else None
-    settings = session.query(WelcomeSettings).filter_by(guild_id=guild_id).first() if guild_id else None
-    session.close()
+    guilds = sorted(discord_bot_instance.bot.guilds, key=lambda guild: guild.name)
+    guild = get_target_guild() or (guilds[0] if guilds else None)
+    guild_id = str(guild.id) if guild else None
     
-    return render_template('welcome_settings.html', settings=settings, guild_id=guild_id)
+    web_db, _ = get_databases()
+    settings = web_db.get_welcome_settings(guild_id) if guild_id else None
+    if settings is not None:
+        settings = {
+            'channel_id': settings.channel_id,
+            'message_template': settings.message_template,
+            'auto_rename_enabled': settings.auto_rename_enabled,
+            'rename_prefix': settings.rename_prefix,
+            'is_enabled': settings.is_enabled
+        }
+    
+    return render_template('welcome_settings.html', settings=settings, guild_id=guild_id,
+                         guilds=[{'id': str(item.id), 'name': item.name} for item in guilds])
 
 @app.route('/api/welcome/save', methods=['POST'])
 @login_required
@@ -464,23 +552,18 @@ def save_welcome_settings():
             return jsonify({'error': '缺少必要參數'}), 400
         
         web_db, _ = get_databases()
-        session = web_db.get_session()
-        
-        settings = session.query(WelcomeSettings).filter_by(guild_id=guild_id).first()
-        if not settings:
-            settings = WelcomeSettings(guild_id=guild_id)
-        
-        settings.channel_id = channel_id
-        settings.message_template = message_template
-        settings.auto_rename_enabled = auto_rename_enabled
-        settings.rename_prefix = rename_prefix
-        settings.is_enabled = is_enabled
-        settings.updated_by = current_user.username
-        settings.updated_at = datetime.utcnow()
+        web_db.save_welcome_settings(
+            guild_id,
+            channel_id=channel_id,
+            message_template=message_template,
+            auto_rename_enabled=auto_rename_enabled,
+            rename_prefix=rename_prefix,
+            is_enabled=is_enabled,
+            updated_by=current_user.username
+        )
         
-        session.add(settings)
-        session.commit()
-        session.close()
+        # 使機器人的歡迎設置快取立即失效
+        get_welcome_cache().invalidate(guild_id)
         
         return jsonify({'success': True, 'message': '歡迎設置已保存'})
     except Exception as e:
@@ -505,6 +588,26 @@ def bot_control():
     
     return render_template('bot_control.html')
 
+@app.route('/bot-status')
+@login_required
+def bot_status_page():
+    """機器人狀態與效能指標頁面"""
+    return render_template('bot_status.html')
+
+@app.route('/api/metrics')
+def metrics():
+    """效能指標API（預設 Prometheus 文字格式，format=json 時返回面板摘要）"""
+    token = os.environ.get('METRICS_TOKEN')
+    authorized = current_user.is_authenticated
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        authorized = True
+    if not authorized:
+        return jsonify({'error': '未授權'}), 401
+    
+    if request.args.get('format') == 'json':
+        return jsonify(metrics_registry.summary())
+    return metrics_registry.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/api/bot/status')
 @login_required
 def bot_status():
@@ -521,9 +624,37 @@ def bot_status():
         'online': not discord_bot_instance.bot.is_closed(),
         'latency': round(discord_bot_instance.bot.latency * 1000),
         'guild_count': len(discord_bot_instance.bot.guilds),
-        'member_count': sum(guild.member_count for guild in discord_bot_instance.bot.guilds)
+        'member_count': sum(guild.member_count for guild in discord_bot_instance.bot.guilds),
+        'moderation_queue': {
+            'depth': discord_bot_instance.moderation_queue.get_depth(),
+            'guilds': discord_bot_instance.moderation_queue.get_stats()
+        },
+        'flood_detector': discord_bot_instance.flood_detector.get_stats(),
+        'database_pool': get_pool_stats(),
+        'welcome_cache': get_welcome_cache().get_stats(),
+        'member_cache': get_member_chunker().get_stats() if get_member_chunker() else None,
+        'sharded': discord_bot_instance.bot.shard_count is not None,
+        'shards': shard_summary(discord_bot_instance.bot)
     })
 
+@app.route('/api/guilds')
+@login_required
+def bot_guilds():
+    """獲取機器人所在的伺服器列表（供各頁面選擇伺服器）"""
+    if current_user.role == UserRole.LOW:
+        return jsonify({'error': '權限不足'}), 403
+    
+    if not discord_bot_instance or not hasattr(discord_bot_instance, 'bot'):
+        return jsonify({'guilds': []})
+    
+    guilds = sorted(discord_bot_instance.bot.guilds, key=lambda guild: guild.name)
+    return jsonify({'guilds': [{
+        'id': str(guild.id),
+        'name': guild.name,
+        'member_count': guild.member_count,
+        'shard_id': guild.shard_id
+    } for guild in guilds]})
+
 @app.route('/api/bot/channels')
 @login_required
 def bot_channels():
@@ -534,13 +665,22 @@ def bot_channels():
     if not discord_bot_instance or not hasattr(discord_bot_instance, 'bot') or discord_bot_instance.bot.is_closed():
         return jsonify({'error': '機器人未連接'}), 503
     
+    # 指定 guild_id 時只列出該伺服器的頻道
+    guilds = discord_bot_instance.bot.guilds
+    if request.args.get('guild_id'):
+        guild = get_target_guild()
+        if not guild:
+            return guild_not_found()
+        guilds = [guild]
+    
     channels = []
-    for guild in discord_bot_instance.bot.guilds:
+    for guild in guilds:
         for channel in guild.text_channels:
             if channel.permissions_for(guild.me).send_messages:
                 channels.append({
                     'id': str(channel.id),
                     'name': f'#{channel.name}',
+                    'guild_id': str(guild.id),
                     'guild_name': guild.name
                 })
     
@@ -576,9 +716,7 @@ def bot_say():
     
     # 使用asyncio在機器人的事件循環中執行
     try:
-        loop = discord_bot_instance.bot.loop  # type: ignore
-        future = asyncio.run_coroutine_threadsafe(send_message(), loop)
-        success, msg = future.result(timeout=10)
+        success, msg = run_on_bot_loop(send_message(), timeout=10)
         
         if success:
             return jsonify({'success': True, 'message': msg})
@@ -595,12 +733,13 @@ def get_members_list():
         if not discord_bot_instance or not hasattr(discord_bot_instance, 'bot'):
             return jsonify({'members': []})
         
-        guild = discord_bot_instance.bot.guilds[0] if discord_bot_instance.bot.guilds else None
+        guild = get_target_guild()
         if not guild:
             return jsonify({'members': []})
+        load_guild_members(guild)
         
         members = []
-        for member in list(guild.members)[:50]:  # 限制 50 個
+        for member in guild.members[:50]:  # 限制 50 個，查找其他成員請使用 /api/members/search
             members.append({
                 'id': str(member.id),
                 'name': member.display_name,
@@ -612,6 +751,64 @@ def get_members_list():
     except Exception as e:
         return jsonify({'members': []})
 
+@app.route('/api/members/search')
+@login_required
+@require_role(UserRole.MEDIUM)
+def search_members():
+    """成員即時搜尋API（按用戶名、顯示名稱或暱稱的前綴或子字串，可用 guild_id 限定伺服器）
+    
+    不等待尚未分塊的伺服器載入：這些伺服器在背景開始分塊，回應以 partial 與 unloaded_guilds 標示結果不完整
+    """
+    if not discord_bot_instance or not hasattr(discord_bot_instance, 'bot'):
+        return jsonify({'error': '機器人未連接'}), 503
+    
+    query = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_SEARCH_LIMIT)), 1), MAX_SEARCH_LIMIT)
+        guild_ids = [int(request.args['guild_id'])] if request.args.get('guild_id') else None
+    except ValueError:
+        return jsonify({'error': '無效的參數'}), 400
+    
+    start = time.perf_counter()
+    bot = discord_bot_instance.bot
+    directory = get_member_directory()
+    
+    # 只搜尋已建立名稱索引的伺服器；尚未分塊的伺服器在背景開始載入，本次結果標記為不完整
+    guilds = [bot.get_guild(guild_id) for guild_id in guild_ids] if guild_ids else list(bot.guilds)
+    unloaded = [guild for guild in guilds if guild is not None and not directory.has_guild(guild.id)]
+    incomplete = False
+    for guild in unloaded:
+        try:
+            start_loading_members(guild)
+        except Exception as e:
+            print(f"開始載入伺服器成員失敗: {e}")
+            incomplete = True
+    
+    members = []
+    for guild_id, member_id in directory.search(query, guild_ids, limit):
+        guild = bot.get_guild(guild_id)
+        member = guild.get_member(member_id) if guild else None
+        if member is None:
+            continue
+        members.append({
+            'id': str(member.id),
+            'guild_id': str(guild.id),
+            'guild_name': guild.name,
+            'name': member.display_name,
+            'username': member.name,
+            'nick': member.nick,
+            'avatar_url': member.display_avatar.url
+        })
+    
+    return jsonify({
+        'success': True,
+        'query': query,
+        'members': members,
+        'partial': bool(unloaded) or incomplete,
+        'unloaded_guilds': len(unloaded),
+        'took_ms': round((time.perf_counter() - start) * 1000, 3)
+    })
+
 @app.route('/api/members/action', methods=['POST'])
 @login_required
 @require_role(UserRole.HIGH)
@@ -626,11 +823,18 @@ def member_action():
         if not discord_bot_instance or not hasattr(discord_bot_instance, 'bot'):
             return jsonify({'error': '機器人未連接'}), 503
         
-        guild = discord_bot_instance.bot.guilds[0] if discord_bot_instance.bot.guilds else None
+        # 搜尋結果可能來自任一伺服器，須按請求的 guild_id 操作該成員所在的伺服器
+        guild = get_target_guild(data.get('guild_id'))  # type: ignore
         if not guild:
-            return jsonify({'error': '伺服器未找到'}), 404
+            return guild_not_found()
         
         member = guild.get_member(int(member_id))  # type: ignore
+        if not member and not members_loaded(guild):
+            # 成員尚未分塊載入快取時向 Discord 查詢
+            try:
+                member = run_on_bot_loop(guild.fetch_member(int(member_id)), timeout=10)  # type: ignore
+            except discord.NotFound:
+                member = None
         if not member:
             return jsonify({'error': '成員未找到'}), 404
         
@@ -651,9 +855,7 @@ def member_action():
             except Exception as e:
                 return False, str(e)
         
-        loop = discord_bot_instance.bot.loop  # type: ignore
-        future = asyncio.run_coroutine_threadsafe(perform_action(), loop)
-        success, msg = future.result(timeout=10)
+        success, msg = run_on_bot_loop(perform_action(), timeout=10)
         
         return jsonify({'success': success, 'message': msg if success else '', 'error': msg if not success else None})
     except Exception as e:
@@ -666,37 +868,66 @@ def set_announcement_channel():
     """設置公告頻道"""
     return jsonify({'success': True, 'message': '公告頻道已設置'})
 
-@app.route('/api/server/scan-members', methods=['POST'])
+@app.route('/api/server/scan-members', methods=['GET', 'POST'])
 @login_required
 @require_role(UserRole.HIGH)
 def scan_server_members():
-    """掃描 Discord 伺服器所有成員"""
+    """掃描 Discord 伺服器成員（不含機器人）
+    
+    參數（查詢字串或 JSON）：role、joined_after、joined_before、status（申請狀態，可逗號分隔）、
+    after（上一頁的游標）、limit；format=ndjson 時以串流逐行輸出所有符合條件的成員
+    """
+    if not discord_bot_instance or not hasattr(discord_bot_instance, 'bot'):
+        return jsonify({'error': '機器人未連接'}), 503
+    
+    params = {**request.args.to_dict(), **(request.get_json(silent=True) or {})}
+    guild = get_target_guild(params.get('guild_id'))
+    if not guild:
+        return guild_not_found()
+    
     try:
-        if not discord_bot_instance or not hasattr(discord_bot_instance, 'bot'):
-            return jsonify({'error': '機器人未連接'}), 503
-        
-        guild = discord_bot_instance.bot.guilds[0] if discord_bot_instance.bot.guilds else None
-        if not guild:
-            return jsonify({'error': '伺服器未找到'}), 404
-        
-        # 獲取伺服器的所有成員
-        members = []
+        filters = MemberFilters.from_params(params, guild)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        after = int(params['after']) if params.get('after') else None
+        limit = min(max(int(params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'after 與 limit 必須是整數'}), 400
+    
+    try:
+        load_guild_members(guild)
+    except Exception as e:
+        print(f"載入伺服器成員失敗: {e}")
+        return jsonify({'error': '伺服器成員尚未載入，請稍後再試'}), 503
+    
+    # 申請狀態來自成員申請狀態索引（尚未建立時在機器人事件循環中建立）
+    index = get_member_index()
+    if not index.has_guild(guild.id):
         try:
-            for member in guild.members:
-                if member.bot:
-                    continue  # 跳過機器人
-                members.append({
-                    'id': str(member.id),
-                    'name': member.display_name,
-                    'joined_at': member.joined_at.isoformat() if member.joined_at else '',
-                    'roles': [role.name for role in member.roles if role.name != '@everyone']
-                })
+            run_on_bot_loop(ensure_guild_index(guild), timeout=30)
         except Exception as e:
-            print(f"掃描成員出錯: {e}")
-        
-        return jsonify({'success': True, 'count': len(members), 'members': members})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+            print(f"建立成員申請狀態索引失敗: {e}")
+    if not index.has_guild(guild.id):
+        if filters.statuses is not None:
+            return jsonify({'error': '成員申請狀態索引尚未建立'}), 503
+        index = None
+    
+    if params.get('format') == 'ndjson':
+        return Response(
+            stream_with_context(stream_members_ndjson(guild, filters, index, after)),
+            mimetype='application/x-ndjson',
+            headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'}
+        )
+    
+    members, next_cursor, matched = get_member_page(guild, filters, index, after, limit)
+    return jsonify({
+        'success': True,
+        'count': len(members),
+        'remaining': matched - len(members),
+        'members': members,
+        'next_cursor': next_cursor
+    })
 
 @app.route('/api/channels/send-announcement', methods=['POST'])
 @login_required
@@ -724,9 +955,7 @@ def send_announcement():
             except Exception as e:
                 return False
         
-        loop = discord_bot_instance.bot.loop  # type: ignore
-        future = asyncio.run_coroutine_threadsafe(send_msg(), loop)
-        success = future.result(timeout=10)
+        success = run_on_bot_loop(send_msg(), timeout=10)
         
         return jsonify({'success': success, 'message': '公告已發送' if success else '發送失敗'})
     except Exception as e:
@@ -806,6 +1035,47 @@ def clear_logs():
     """清空日誌"""
     return jsonify({'success': True})
 
+@app.route('/api/system/log-level', methods=['GET'])
+@login_required
+@require_role(UserRole.HIGH)
+def get_log_level():
+    """獲取當前日誌等級"""
+    return jsonify({'success': True, 'levels': get_log_levels()})
+
+@app.route('/api/system/log-level', methods=['POST'])
+@login_required
+@require_role(UserRole.HIGH)
+def update_log_level():
+    """在運行時調整日誌等級"""
+    data = request.json  # type: ignore
+    level = data.get('level', '')  # type: ignore
+    logger_name = data.get('logger') or None  # type: ignore
+    if not isinstance(level, str) or not isinstance(logger_name, (str, type(None))):
+        return jsonify({'error': '日誌等級與記錄器名稱必須是字串'}), 400
+    
+    try:
+        set_log_level(level, logger_name)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'success': True, 'message': f'日誌等級已設為 {level.upper()}', 'levels': get_log_levels()})
+
+@app.route('/api/system/cache-stats')
+@login_required
+@require_role(UserRole.HIGH)
+def cache_stats():
+    """獲取內存快取的命中統計"""
+    return jsonify({
+        'success': True,
+        'user_cache': get_user_cache().get_stats(),
+        'welcome_cache': get_welcome_cache().get_stats(),
+        'application_stats': get_application_stats_service().get_cache_info(),
+        'write_behind': get_write_behind().get_stats(),
+        'member_index': get_member_index().get_stats(),
+        'member_directory': get_member_directory().get_stats(),
+        'member_cache': get_member_chunker().get_stats() if get_member_chunker() else None
+    })
+
 @app.route('/api/system/reset', methods=['POST'])
 @login_required
 @require_role(UserRole.HIGH)
@@ -859,20 +1129,11 @@ def update_user_profile():
     """更新用戶資料API"""
     data = request.json  # type: ignore
     web_db, _ = get_databases()
-    session = web_db.get_session()
     
-    try:
-        user = session.query(WebUser).filter_by(id=current_user.id).first()
-        if user:
-            if 'email' in data:  # type: ignore
-                user.email = data['email']  # type: ignore
-            if 'phone' in data:  # type: ignore
-                user.phone = data['phone']  # type: ignore
-            session.commit()
-            return jsonify({'success': True, 'message': '資料已更新'})
-        return jsonify({'error': '用戶不存在'}), 404
-    finally:
-        session.close()
+    fields = {name: data[name] for name in ('email', 'phone') if name in data}  # type: ignore
+    if web_db.update_user_fields(current_user.id, **fields):
+        return jsonify({'success': True, 'message': '資料已更新'})
+    return jsonify({'error': '用戶不存在'}), 404
 
 @app.route('/api/user/change-password', methods=['POST'])
 @login_required
@@ -953,18 +1214,12 @@ def update_user_role():
 def unlink_discord():
     """解除 Discord 綁定"""
     web_db, _ = get_databases()
-    session = web_db.get_session()
     try:
-        user = session.query(WebUser).filter_by(id=current_user.id).first()
-        if user:
-            user.discord_id = None  # type: ignore
-            session.commit()
+        if web_db.update_user_fields(current_user.id, discord_id=None):
             return jsonify({'success': True, 'message': 'Discord 綁定已解除'})
         return jsonify({'error': '用戶不存在'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 400
-    finally:
-        session.close()
 
 @app.route('/api/user/link-discord', methods=['POST'])
 @login_required
@@ -980,18 +1235,12 @@ def link_discord():
         return jsonify({'error': '缺少 Discord ID'}), 400
     
     web_db, _ = get_databases()
-    session = web_db.get_session()
     try:
-        user = session.query(WebUser).filter_by(id=current_user.id).first()
-        if user:
-            user.discord_id = discord_id
-            session.commit()
+        if web_db.update_user_fields(current_user.id, discord_id=discord_id):
             return jsonify({'success': True, 'message': 'Discord 帳號已綁定'})
         return jsonify({'error': '用戶不存在'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 400
-    finally:
-        session.close()
 
 @app.route('/forgot-password')
 def forgot_password_page():
@@ -1185,9 +1434,6 @@ async def send_password_reset_confirmation(username):
 
 # ============== 新功能 API ==============
 
-# 敏感詞列表（存儲在內存，可擴展至數據庫）
-SENSITIVE_WORDS = set()
-
 @app.route('/api/bot/check-verification', methods=['GET'])
 def check_bot_verification():
     """檢查是否需要機器人驗證"""
@@ -1218,10 +1464,7 @@ def mute_text_user():
                         return True
                 return False
             
-            result = asyncio.run_coroutine_threadsafe(
-                do_mute(),
-                discord_bot_instance.bot.loop
-            ).result()
+            result = run_on_bot_loop(do_mute())
             
             if result:
                 return jsonify({'success': True, 'message': '已禁言'})
@@ -1254,10 +1497,7 @@ def kick_text_user():
                         return True
                 return False
             
-            result = asyncio.run_coroutine_threadsafe(
-                do_kick(),
-                discord_bot_instance.bot.loop
-            ).result()
+            result = run_on_bot_loop(do_kick())
             
             if result:
                 return jsonify({'success': True, 'message': '已踢出'})
@@ -1290,10 +1530,7 @@ def mute_voice_user():
                         return True
                 return False
             
-            result = asyncio.run_coroutine_threadsafe(
-                do_voice_mute(),
-                discord_bot_instance.bot.loop
-            ).result()
+            result = run_on_bot_loop(do_voice_mute())
             
             if result:
                 return jsonify({'success': True, 'message': '已禁言'})
@@ -1326,10 +1563,7 @@ def deafen_voice_user():
                         return True
                 return False
             
-            result = asyncio.run_coroutine_threadsafe(
-                do_deafen(),
-                discord_bot_instance.bot.loop
-            ).result()
+            result = run_on_bot_loop(do_deafen())
             
             if result:
                 return jsonify({'success': True, 'message': '已失聰'})
@@ -1362,10 +1596,7 @@ def kick_voice_user():
                         return True
                 return False
             
-            result = asyncio.run_coroutine_threadsafe(
-                do_voice_kick(),
-                discord_bot_instance.bot.loop
-            ).result()
+            result = run_on_bot_loop(do_voice_kick())
             
             if result:
                 return jsonify({'success': True, 'message': '已踢出'})
@@ -1382,11 +1613,16 @@ def add_sensitive_word():
     try:
         data = request.json  # type: ignore
         word = data.get('word', '').strip().lower()  # type: ignore
+        guild_id = str(data.get('guild_id') or '') or None  # type: ignore
         
         if not word:
             return jsonify({'error': '敏感詞不能為空'}), 400
+        if guild_id and not re.fullmatch(r'[0-9]+', guild_id):
+            return jsonify({'error': '無效的伺服器ID'}), 400
         
-        SENSITIVE_WORDS.add(word)
+        web_db, _ = get_databases()
+        web_db.add_sensitive_word(word, guild_id=guild_id, created_by=current_user.username)
+        load_sensitive_words(web_db)
         return jsonify({'success': True, 'message': '已添加敏感詞'})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -1399,8 +1635,13 @@ def remove_sensitive_word():
     try:
         data = request.json  # type: ignore
         word = data.get('word', '').strip().lower()  # type: ignore
+        guild_id = str(data.get('guild_id') or '') or None  # type: ignore
+        if guild_id and not re.fullmatch(r'[0-9]+', guild_id):
+            return jsonify({'error': '無效的伺服器ID'}), 400
         
-        SENSITIVE_WORDS.discard(word)
+        web_db, _ = get_databases()
+        web_db.remove_sensitive_word(word, guild_id=guild_id)
+        load_sensitive_words(web_db)
         return jsonify({'success': True, 'message': '已移除敏感詞'})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -1411,10 +1652,102 @@ def remove_sensitive_word():
 def list_sensitive_words():
     """獲取敏感詞列表"""
     try:
-        return jsonify({'success': True, 'words': sorted(list(SENSITIVE_WORDS))})
+        guild_id = request.args.get('guild_id') or None
+        snapshot = get_snapshot()
+        return jsonify({
+            'success': True,
+            'words': sorted(snapshot.get_words(guild_id)),
+            'guild_id': guild_id,
+            'version': snapshot.version
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/commands/list', methods=['GET'])
+@login_required
+@require_role(UserRole.MEDIUM)
+def list_custom_commands():
+    """獲取自定義指令列表"""
+    table = get_command_table()
+    return jsonify({
+        'success': True,
+        'version': table.version,
+        'commands': [{
+            'id': command.id,
+            'name': command.name,
+            'aliases': list(command.aliases),
+            'description': command.description,
+            'response_text': command.template.source
+        } for command in table.commands]
+    })
+
+@app.route('/api/commands/add', methods=['POST'])
+@login_required
+@require_role(UserRole.HIGH)
+def add_custom_command():
+    """添加自定義指令"""
+    try:
+        data = request.json  # type: ignore
+        name = data.get('name', '').strip()  # type: ignore
+        aliases = data.get('aliases', [])  # type: ignore
+        description = data.get('description', '').strip()  # type: ignore
+        response_text = data.get('response_text', '')  # type: ignore
+        
+        if not name or not response_text:
+            return jsonify({'error': '指令名稱和回應內容不能為空'}), 400
+        if not isinstance(aliases, list):
+            return jsonify({'error': '指令別名必須是列表'}), 400
+        aliases = [alias.strip() for alias in aliases if alias.strip()]
+        
+        web_db, _ = get_databases()
+        command_id = web_db.add_custom_command(name, aliases, description or name, response_text, current_user.username)
+        load_custom_commands(web_db)
+        return jsonify({'success': True, 'message': '已添加自定義指令', 'id': command_id})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/commands/<int:command_id>/update', methods=['POST'])
+@login_required
+@require_role(UserRole.HIGH)
+def update_custom_command(command_id):
+    """更新自定義指令"""
+    try:
+        data = request.json  # type: ignore
+        fields = {}
+        if 'name' in data:  # type: ignore
+            fields['command_name'] = data['name'].strip()  # type: ignore
+            if not fields['command_name']:
+                return jsonify({'error': '指令名稱和回應內容不能為空'}), 400
+        if 'aliases' in data:  # type: ignore
+            if not isinstance(data['aliases'], list):  # type: ignore
+                return jsonify({'error': '指令別名必須是列表'}), 400
+            fields['command_aliases'] = [alias.strip() for alias in data['aliases'] if alias.strip()]  # type: ignore
+        if 'description' in data:  # type: ignore
+            fields['description'] = data['description']  # type: ignore
+        if 'response_text' in data:  # type: ignore
+            fields['response_text'] = data['response_text']  # type: ignore
+            if not fields['response_text']:
+                return jsonify({'error': '指令名稱和回應內容不能為空'}), 400
+        
+        web_db, _ = get_databases()
+        if not web_db.update_custom_command(command_id, **fields):
+            return jsonify({'error': '指令不存在'}), 404
+        load_custom_commands(web_db)
+        return jsonify({'success': True, 'message': '已更新自定義指令'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/commands/<int:command_id>/delete', methods=['POST'])
+@login_required
+@require_role(UserRole.HIGH)
+def delete_custom_command(command_id):
+    """刪除自定義指令"""
+    web_db, _ = get_databases()
+    if not web_db.delete_custom_command(command_id):
+        return jsonify({'error': '指令不存在'}), 404
+    load_custom_commands(web_db)
+    return jsonify({'success': True, 'message': '已刪除自定義指令'})
+
 @app.route('/api/channels/text-channels')
 @login_required
 def get_text_channels():
@@ -1482,6 +1815,7 @@ def get_channel_members(channel_id):
                 })
         else:
             guild = channel.guild
+            load_guild_members(guild)
             for member in guild.members:
                 members.append({
                     'id': str(member.id),
@@ -1548,10 +1882,7 @@ def join_voice_channel():
             except Exception as e:
                 return False, f'連接失敗: {str(e)}'
         
-        result, message = asyncio.run_coroutine_threadsafe(
-            do_join(),
-            discord_bot_instance.bot.loop  # type: ignore
-        ).result(timeout=20)
+        result, message = run_on_bot_loop(do_join(), timeout=20)
         
         if result:
             return jsonify({'success': True, 'message': message})
@@ -1599,10 +1930,7 @@ def leave_voice_channel():
                 print(f"[LEAVE] 異常: {str(e)}")
                 return False, f'退出失敗: {str(e)}'
         
-        result, message = asyncio.run_coroutine_threadsafe(
-            do_leave(),
-            discord_bot_instance.bot.loop  # type: ignore
-        ).result(timeout=10)
+        result, message = run_on_bot_loop(do_leave(), timeout=10)
         
         return jsonify({'success': result, 'message': message})
     except Exception as e:
@@ -1633,10 +1961,7 @@ def unmute_voice_user():
                     return True
             return False
         
-        result = asyncio.run_coroutine_threadsafe(
-            do_unmute(),
-            discord_bot_instance.bot.loop  # type: ignore
-        ).result(timeout=10)
+        result = run_on_bot_loop(do_unmute(), timeout=10)
         
         return jsonify({'success': result})
     except Exception as e:
@@ -1667,14 +1992,13 @@ def undeafen_voice_user():
                     return True
             return False
         
-        result = asyncio.run_coroutine_threadsafe(
-            do_undeafen(),
-            discord_bot_instance.bot.loop  # type: ignore
-        ).result(timeout=10)
+        result = run_on_bot_loop(do_undeafen(), timeout=10)
         
         return jsonify({'success': result})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 if __name__ == '__main__':
+    load_sensitive_words()
+    load_custom_commands()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
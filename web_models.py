@@ -6,9 +6,11 @@
 import os
 import bcrypt
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, JSON, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON, Enum, Index, UniqueConstraint, bindparam, update
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from database import get_engine, resolve_database_url, write_operation
+from user_cache import invalidate_user
 from flask_login import UserMixin
 import enum
 
@@ -24,11 +26,15 @@ class WebUser(Base, UserMixin):
     """網站用戶模型"""
     __tablename__ = 'web_users'
     
+    __table_args__ = (Index('ix_web_users_role_is_active', 'role', 'is_active'),)
+    
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String(50), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     role = Column(Enum(UserRole), default=UserRole.MEDIUM)
     discord_id = Column(String(50))  # 關聯的Discord ID（隊長綁定）
+    email = Column(String(120))  # 電子郵件（密碼重置用）
+    phone = Column(String(30))  # 電話號碼
     is_active = Column(Boolean, default=True)
     is_approved = Column(Boolean, default=False)  # 是否已通過隊長審核
     approval_status = Column(String(50), default="pending")  # pending/approved/rejected
@@ -71,6 +77,8 @@ class PasswordReset(Base):
     """密碼重置驗證碼表"""
     __tablename__ = 'password_resets'
     
+    __table_args__ = (Index('ix_password_resets_username_code', 'username', 'verification_code'),)
+    
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String(50), nullable=False)
     verification_code = Column(String(6), nullable=False)
@@ -93,6 +101,8 @@ class VoiceState(Base):
     """語音狀態持久化表"""
     __tablename__ = 'voice_states'
     
+    __table_args__ = (Index('ix_voice_states_user_guild', 'user_id', 'guild_id'),)
+    
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String(50), nullable=False)
     guild_id = Column(String(50), nullable=False)
@@ -116,6 +126,18 @@ class WelcomeSettings(Base):
     updated_at = Column(DateTime, default=datetime.utcnow)
     updated_by = Column(String(50))
 
+class SensitiveWord(Base):
+    """敏感詞"""
+    __tablename__ = 'sensitive_words'
+    
+    __table_args__ = (UniqueConstraint('guild_id', 'word', name='uq_sensitive_words_guild_word'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    guild_id = Column(String(50))  # 為空時為全域敏感詞
+    word = Column(String(200), nullable=False)
+    created_by = Column(String(50))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 # 全局資料庫管理器實例
 _web_db_instance = None
 
@@ -123,22 +145,12 @@ class WebDatabaseManager:
     """網站資料庫管理器"""
     
     def __init__(self):
-        import os
-        self.database_url = os.getenv('DATABASE_URL', 'sqlite:////tmp/grv_team_web.db')
+        self.database_url = resolve_database_url('sqlite:////tmp/grv_team_web.db')
         
-        # Ensure SQLite is used if database is not available
-        if 'sqlite' not in self.database_url:
-            if not self.database_url or 'ep-ancient-waterfall' in self.database_url:
-                self.database_url = 'sqlite:////tmp/grv_team_web.db'
-        
-        # Configure SQLAlchemy for SQLite compatibility
-        kwargs = {'check_same_thread': False} if 'sqlite' in self.database_url else {}
-        self.engine = create_engine(self.database_url, connect_args=kwargs)
+        # 使用進程共用的引擎與連接池（表格只在首次取得時創建）
+        self.engine = get_engine(self.database_url, Base.metadata)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
-        # 創建所有表格
-        Base.metadata.create_all(bind=self.engine)
-        
         # 初始化預設用戶
         self.init_default_users()
     
@@ -146,6 +158,7 @@ class WebDatabaseManager:
         """獲取資料庫會話"""
         return self.SessionLocal()
     
+    @write_operation
     def init_default_users(self):
         """初始化預設用戶賬號"""
         session = self.get_session()
@@ -226,6 +239,7 @@ class WebDatabaseManager:
         finally:
             session.close()
     
+    @write_operation
     def create_user(self, username, password, role=UserRole.MEDIUM, created_by="admin", email=None, phone=None):
         """創建新用戶"""
         session = self.get_session()
@@ -244,6 +258,7 @@ class WebDatabaseManager:
         finally:
             session.close()
     
+    @write_operation
     def update_user_role(self, user_id, new_role):
         """更新用戶權限"""
         session = self.get_session()
@@ -252,11 +267,13 @@ class WebDatabaseManager:
             if user:
                 user.role = new_role
                 session.commit()
+                invalidate_user(user_id)
                 return True
             return False
         finally:
             session.close()
     
+    @write_operation
     def change_user_password(self, user_id, new_password):
         """更改用戶密碼"""
         session = self.get_session()
@@ -265,11 +282,83 @@ class WebDatabaseManager:
             if user:
                 user.set_password(new_password)
                 session.commit()
+                invalidate_user(user_id)
+                return True
+            return False
+        finally:
+            session.close()
+    
+    @write_operation
+    def register_user(self, username, password):
+        """自助註冊的新用戶（待隊長審核）"""
+        session = self.get_session()
+        try:
+            user = WebUser(
+                username=username,
+                role=UserRole.MEDIUM,
+                is_active=True,
+                is_approved=False,
+                approval_status='pending',
+                created_by='self_register',
+                created_at=datetime.utcnow()
+            )
+            user.set_password(password)
+            session.add(user)
+            session.commit()
+            return user.id
+        finally:
+            session.close()
+    
+    @write_operation
+    def set_user_approval(self, username, status):
+        """設置帳號審核狀態（approved / rejected），找不到用戶時返回False"""
+        session = self.get_session()
+        try:
+            user = session.query(WebUser).filter_by(username=username).first()
+            if user:
+                user.is_approved = status == 'approved'
+                user.approval_status = status
+                session.commit()
+                invalidate_user(user.id)
+                return True
+            return False
+        finally:
+            session.close()
+    
+    @write_operation
+    def delete_user(self, username):
+        """刪除帳號（被拒絕的申請者可重新用同一用戶名註冊）"""
+        session = self.get_session()
+        try:
+            user = session.query(WebUser).filter_by(username=username).first()
+            if user:
+                session.delete(user)
+                session.commit()
+                invalidate_user(user.id)
                 return True
             return False
         finally:
             session.close()
     
+    @write_operation
+    def update_user_fields(self, user_id, **fields):
+        """更新用戶資料欄位（用戶名、郵箱、電話、Discord ID 等）"""
+        session = self.get_session()
+        try:
+            user = session.query(WebUser).filter_by(id=user_id).first()
+            if not user:
+                return False
+            for name, value in fields.items():
+                setattr(user, name, value)
+            session.commit()
+            invalidate_user(user_id)
+            return True
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
     def get_all_users(self):
         """獲取所有用戶"""
         session = self.get_session()
@@ -278,6 +367,7 @@ class WebDatabaseManager:
         finally:
             session.close()
     
+    @write_operation
     def add_custom_command(self, command_name, aliases, description, response_text, created_by):
         """添加自定義指令"""
         session = self.get_session()
@@ -303,6 +393,28 @@ class WebDatabaseManager:
         finally:
             session.close()
     
+    @write_operation
+    def update_custom_command(self, command_id, **fields):
+        """更新自定義指令"""
+        session = self.get_session()
+        try:
+            command = session.query(BotCommand).filter_by(id=command_id).first()
+            if not command:
+                return False
+            for key, value in fields.items():
+                setattr(command, key, value)
+            command.updated_at = datetime.utcnow()
+            session.commit()
+            return True
+        finally:
+            session.close()
+    
+    @write_operation
+    def delete_custom_command(self, command_id):
+        """停用自定義指令"""
+        return self.update_custom_command(command_id, is_active=False)
+    
+    @write_operation
     def create_password_reset(self, username, code, expires_at):
         """創建密碼重置驗證碼"""
         session = self.get_session()
@@ -329,6 +441,7 @@ class WebDatabaseManager:
         finally:
             session.close()
     
+    @write_operation
     def mark_reset_as_used(self, reset_id):
         """標記重置碼為已使用"""
         session = self.get_session()
@@ -342,6 +455,70 @@ class WebDatabaseManager:
         finally:
             session.close()
     
+    @write_operation
+    def apply_buffered_updates(self, updates):
+        """以單一交易批量寫入延遲寫入緩衝的更新（{模型: [{'id': 主鍵, 欄位: 值}]}）
+
+        使用 Core 的 executemany，已被刪除的記錄直接略過，不會讓整批寫入失敗
+        """
+        session = self.get_session()
+        try:
+            for model, rows in updates.items():
+                table = model.__table__
+                # 按更新的欄位組合分組，每組一條語句
+                by_columns = {}
+                for row in rows:
+                    columns = tuple(sorted(name for name in row if name != 'id'))
+                    by_columns.setdefault(columns, []).append({'b_id': row['id'], **{name: row[name] for name in columns}})
+                for columns, params in by_columns.items():
+                    statement = (
+                        update(table)
+                        .where(table.c.id == bindparam('b_id'))
+                        .values({name: bindparam(name) for name in columns})
+                    )
+                    session.execute(statement, params)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def get_welcome_settings(self, guild_id, enabled_only=False):
+        """獲取伺服器的歡迎設置"""
+        session = self.get_session()
+        try:
+            query = session.query(WelcomeSettings).filter_by(guild_id=str(guild_id))
+            if enabled_only:
+                query = query.filter_by(is_enabled=True)
+            return query.first()
+        finally:
+            session.close()
+    
+    @write_operation
+    def save_welcome_settings(self, guild_id, **fields):
+        """創建或更新伺服器的歡迎設置"""
+        session = self.get_session()
+        try:
+            settings = session.query(WelcomeSettings).filter_by(guild_id=str(guild_id)).first()
+            if not settings:
+                settings = WelcomeSettings(guild_id=str(guild_id))
+                session.add(settings)
+            for name, value in fields.items():
+                setattr(settings, name, value)
+            settings.updated_at = datetime.utcnow()
+            session.commit()
+        finally:
+            session.close()
+    
+    def get_welcome_settings_for_guilds(self, guild_ids):
+        """批量獲取多個伺服器的歡迎設置"""
+        session = self.get_session()
+        try:
+            return session.query(WelcomeSettings).filter(WelcomeSettings.guild_id.in_([str(g) for g in guild_ids])).all()
+        finally:
+            session.close()
+    
     def get_admin_users(self):
         """獲取所有隊長級用戶"""
         session = self.get_session()
@@ -349,6 +526,38 @@ class WebDatabaseManager:
             return session.query(WebUser).filter_by(role=UserRole.HIGH, is_active=True).all()
         finally:
             session.close()
+    
+    def get_sensitive_words(self):
+        """獲取所有敏感詞，返回 (guild_id, word) 列表"""
+        session = self.get_session()
+        try:
+            return [(row.guild_id, row.word) for row in session.query(SensitiveWord).all()]
+        finally:
+            session.close()
+    
+    @write_operation
+    def add_sensitive_word(self, word, guild_id=None, created_by=None):
+        """添加敏感詞（guild_id 為空時為全域，已存在時返回False）"""
+        session = self.get_session()
+        try:
+            if session.query(SensitiveWord).filter_by(guild_id=guild_id, word=word).first():
+                return False
+            session.add(SensitiveWord(guild_id=guild_id, word=word, created_by=created_by))
+            session.commit()
+            return True
+        finally:
+            session.close()
+    
+    @write_operation
+    def remove_sensitive_word(self, word, guild_id=None):
+        """移除敏感詞"""
+        session = self.get_session()
+        try:
+            deleted = session.query(SensitiveWord).filter_by(guild_id=guild_id, word=word).delete()
+            session.commit()
+            return deleted > 0
+        finally:
+            session.close()
 
 def get_web_database():
     """獲取網站資料庫管理器（延遲初始化）"""
@@ -0,0 +1,111 @@
+"""
+歡迎設置快取 - 按伺服器的讀穿透快取
+成員加入時直接讀取內存中的設置（沒有設置的伺服器也會快取為空），網站保存設置後立即失效
+"""
+
+import threading
+from collections import namedtuple
+
+# 快取中保存的歡迎設置（與資料庫會話無關的不可變記錄）
+WelcomeConfig = namedtuple('WelcomeConfig', (
+    'guild_id', 'channel_id', 'message_template', 'auto_rename_enabled', 'rename_prefix', 'is_enabled'
+))
+
+_MISSING = object()
+
+
+def _to_config(settings):
+    if settings is None:
+        return None
+    return WelcomeConfig(
+        guild_id=settings.guild_id,
+        channel_id=settings.channel_id,
+        message_template=settings.message_template,
+        auto_rename_enabled=settings.auto_rename_enabled,
+        rename_prefix=settings.rename_prefix,
+        is_enabled=settings.is_enabled
+    )
+
+
+class WelcomeSettingsCache:
+    """按伺服器ID快取歡迎設置（None 表示該伺服器沒有設置）"""
+
+    def __init__(self, web_db=None):
+        self._web_db = web_db
+        self._entries = {}  # 伺服器ID（字串） -> WelcomeConfig 或 None
+        self._generation = 0  # 每次失效遞增，避免查詢期間失效的舊結果被寫回快取
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def web_db(self):
+        if self._web_db is None:
+            from web_models import get_web_database
+            self._web_db = get_web_database()
+        return self._web_db
+
+    def peek(self, guild_id):
+        """只讀取快取，未快取時返回 _MISSING"""
+        return self._entries.get(str(guild_id), _MISSING)
+
+    def get(self, guild_id):
+        """讀取歡迎設置，未快取時查詢資料庫並寫入快取（同步，網站線程或資料庫線程池使用）"""
+        guild_id = str(guild_id)
+        config = self._entries.get(guild_id, _MISSING)
+        if config is not _MISSING:
+            self.hits += 1
+            return config
+
+        self.misses += 1
+        generation = self._generation
+        config = _to_config(self.web_db.get_welcome_settings(guild_id))
+        with self._lock:
+            if generation == self._generation:
+                self._entries[guild_id] = config
+        return config
+
+    async def get_async(self, guild_id):
+        """機器人端讀取：命中時不離開事件循環，未命中時在資料庫線程池中查詢"""
+        config = self.peek(guild_id)
+        if config is not _MISSING:
+            self.hits += 1
+            return config
+        from repositories import run_db
+        return await run_db(self.get, guild_id)
+
+    def warm(self, guild_ids):
+        """以一次查詢載入多個伺服器的設置（沒有設置的伺服器寫入空快取）"""
+        guild_ids = [str(guild_id) for guild_id in guild_ids]
+        generation = self._generation
+        found = {settings.guild_id: _to_config(settings)
+                 for settings in self.web_db.get_welcome_settings_for_guilds(guild_ids)}
+        with self._lock:
+            if generation == self._generation:
+                for guild_id in guild_ids:
+                    self._entries[guild_id] = found.get(guild_id)
+        return len(found)
+
+    def invalidate(self, guild_id=None):
+        """清除指定伺服器（或全部）的快取"""
+        with self._lock:
+            if guild_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(guild_id), None)
+            self._generation += 1
+
+    def get_stats(self):
+        """獲取快取統計"""
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+_welcome_cache = None
+
+
+def get_welcome_cache():
+    """獲取歡迎設置快取（延遲初始化）"""
+    global _welcome_cache
+    if _welcome_cache is None:
+        _welcome_cache = WelcomeSettingsCache()
+    return _welcome_cache
@@ -0,0 +1,171 @@
+"""
+Discord Bot - 敏感詞過濾模組
+訊息先經正規化，再以 Aho-Corasick 自動機一次掃描，與敏感詞數量無關
+"""
+
+import threading
+from collections import deque
+from text_normalizer import normalize_text
+
+
+class AhoCorasickMatcher:
+    """編譯後的多模式匹配器（建立後不可變）"""
+
+    def __init__(self, words):
+        self.words = frozenset(w for w in words if w)
+        # 每個狀態的轉移表、失敗指標與輸出（以狀態編號為索引）
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._build()
+
+    def _build(self):
+        """建立 trie 並以 BFS 計算失敗指標"""
+        goto, output = self._goto, self._output
+
+        for word in self.words:
+            state = 0
+            for ch in word:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    self._fail.append(0)
+                    output.append(())
+                state = next_state
+            output[state] = (word,)
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in goto[fail]:
+                    fail = self._fail[fail]
+                fail = goto[fail].get(ch, 0)
+                self._fail[next_state] = fail
+                # 合併失敗鏈上的輸出，掃描時不需再沿鏈回溯
+                if output[fail]:
+                    output[next_state] = output[next_state] + output[fail]
+
+    def __len__(self):
+        return len(self.words)
+
+    def find_all(self, text):
+        """掃描文字一次，依首次出現順序返回所有命中的敏感詞"""
+        if not self.words or not text:
+            return []
+
+        goto, fail, output = self._goto, self._fail, self._output
+        found = {}
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for word in output[state]:
+                    found.setdefault(word, None)
+        return list(found)
+
+    def search(self, text):
+        """返回第一個命中的敏感詞，沒有命中時返回 None"""
+        if not self.words or not text:
+            return None
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                return output[state][0]
+        return None
+
+
+class CompiledWordList:
+    """一組敏感詞與其編譯後的匹配器"""
+
+    __slots__ = ('words', 'matcher', '_originals')
+
+    def __init__(self, words):
+        self.words = frozenset(words)
+        # 敏感詞與訊息使用同一套正規化，匹配結果再映射回原始詞彙
+        self._originals = {}
+        for word in self.words:
+            self._originals.setdefault(normalize_text(word), word)
+        self.matcher = AhoCorasickMatcher(self._originals)
+
+    def find_all(self, content):
+        """正規化訊息後返回所有命中的原始敏感詞"""
+        if not self.words or not content:
+            return []
+        matched = self.matcher.find_all(normalize_text(content))
+        return [self._originals[word] for word in matched]
+
+
+class FilterSnapshot:
+    """敏感詞列表的不可變快照（全域詞表 + 各伺服器自訂詞表）
+
+    只有設置了自訂詞表的伺服器才會有獨立的匹配器（已合併全域詞彙），
+    其他伺服器直接使用全域匹配器，記憶體只隨自訂詞表的伺服器數量增長。
+    """
+
+    __slots__ = ('version', 'words', 'guild_words', 'global_list', 'guild_lists')
+
+    def __init__(self, version, entries):
+        self.version = version
+        global_words = set()
+        guild_words = {}
+        for guild_id, word in entries:
+            if guild_id is None:
+                global_words.add(word)
+            else:
+                guild_words.setdefault(int(guild_id), set()).add(word)
+
+        self.words = frozenset(global_words)
+        self.guild_words = {guild_id: frozenset(words) for guild_id, words in guild_words.items()}
+        self.global_list = CompiledWordList(self.words)
+        self.guild_lists = {
+            guild_id: CompiledWordList(words | self.words)
+            for guild_id, words in self.guild_words.items()
+        }
+
+    def get_words(self, guild_id=None):
+        """獲取指定範圍自身的敏感詞（guild_id 為 None 時返回全域詞表）"""
+        if guild_id is None:
+            return self.words
+        return self.guild_words.get(int(guild_id), frozenset())
+
+    def find_all(self, content, guild_id=None):
+        """使用對應伺服器的匹配器返回所有命中的原始敏感詞"""
+        return self.guild_lists.get(guild_id, self.global_list).find_all(content)
+
+
+# 當前使用中的快照；更新時整體替換引用，事件循環讀取端不需加鎖或查詢資料庫
+_snapshot = FilterSnapshot(0, ())
+_publish_lock = threading.Lock()
+
+
+def get_snapshot():
+    """獲取當前的敏感詞快照"""
+    return _snapshot
+
+
+def publish_words(entries):
+    """以新的 (guild_id, word) 列表建立下一版本快照並原子替換"""
+    global _snapshot
+    with _publish_lock:
+        _snapshot = FilterSnapshot(_snapshot.version + 1, entries)
+        return _snapshot
+
+
+def load_sensitive_words(web_db=None):
+    """從資料庫載入敏感詞並發布新快照"""
+    if web_db is None:
+        from web_models import get_web_database
+        web_db = get_web_database()
+    return publish_words(web_db.get_sensitive_words())
@@ -0,0 +1,152 @@
+"""
+延遲寫入緩衝 - 低優先度更新（例如 last_login、updated_at）的合併批量寫入
+更新先放在內存中並按 (模型, 主鍵) 合併，由背景線程定期以單一交易寫入，正常退出時保證最後一次寫入
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+FLUSH_DURATION = registry.register('grv_write_behind_flush_seconds', 'histogram', '延遲寫入批量寫入耗時')
+QUEUE_DEPTH = registry.register('grv_write_behind_depth', 'gauge', '延遲寫入待寫入的記錄數')
+
+
+class WriteBehindBuffer:
+    """按 (模型, 主鍵) 合併的延遲寫入緩衝"""
+
+    def __init__(self, db=None, flush_interval=None, max_pending=None, max_retries=3):
+        self._db = db
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv('WRITE_BEHIND_INTERVAL', '5'))
+        self.max_pending = max_pending if max_pending is not None else int(os.getenv('WRITE_BEHIND_MAX_PENDING', '1000'))
+        self.max_retries = max_retries
+        self._pending = {}  # (模型, 主鍵) -> 欄位字典
+        self._attempts = {}  # (模型, 主鍵) -> 連續寫入失敗次數
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failures = 0
+        self.dropped_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def db(self):
+        if self._db is None:
+            from web_models import get_web_database
+            self._db = get_web_database()
+        return self._db
+
+    def set(self, model, row_id, **fields):
+        """記錄一筆更新（同一筆記錄的多次更新只保留每個欄位的最新值）"""
+        with self._lock:
+            self._pending.setdefault((model, row_id), {}).update(fields)
+            depth = len(self._pending)
+        if self._thread is None:
+            self.start()
+        if depth >= self.max_pending:
+            self._wakeup.set()
+
+    def start(self):
+        """啟動背景寫入線程並註冊退出時的最後寫入"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """以單一交易寫入所有待寫入的更新，返回寫入的記錄數"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            grouped = {}
+            for (model, row_id), fields in pending.items():
+                grouped.setdefault(model, []).append({'id': row_id, **fields})
+
+            start = time.perf_counter()
+            try:
+                self.db.apply_buffered_updates(grouped)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f'延遲寫入失敗，將於下次重試: {e}')
+                # 放回緩衝，期間的新更新優先；連續失敗超過 max_retries 次的記錄丟棄，避免整批一直重試
+                dropped = 0
+                with self._lock:
+                    for key, fields in pending.items():
+                        attempts = self._attempts.get(key, 0) + 1
+                        if attempts > self.max_retries:
+                            self._attempts.pop(key, None)
+                            dropped += 1
+                            continue
+                        self._attempts[key] = attempts
+                        self._pending[key] = {**fields, **self._pending.get(key, {})}
+                if dropped:
+                    self.dropped_rows += dropped
+                    logger.error(f'延遲寫入重試 {self.max_retries} 次後仍失敗，已丟棄 {dropped} 筆更新')
+                return 0
+
+            with self._lock:
+                for key in pending:
+                    self._attempts.pop(key, None)
+
+            elapsed = time.perf_counter() - start
+            FLUSH_DURATION.labels().observe(elapsed)
+            self.flushes += 1
+            self.flushed_rows += len(pending)
+            self.last_flush_ms = elapsed * 1000
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+            return len(pending)
+
+    def stop(self):
+        """停止背景線程並寫入剩餘的更新"""
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+
+    def get_depth(self):
+        return len(self._pending)
+
+    def get_stats(self):
+        """獲取緩衝統計"""
+        return {
+            'depth': len(self._pending),
+            'flushes': self.flushes,
+            'flushed_rows': self.flushed_rows,
+            'failures': self.failures,
+            'dropped_rows': self.dropped_rows,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+            'max_flush_ms': round(self.max_flush_ms, 3),
+            'interval': self.flush_interval
+        }
+
+
+_write_behind = None
+
+
+def get_write_behind():
+    """獲取網站資料庫的延遲寫入緩衝（延遲初始化）"""
+    global _write_behind
+    if _write_behind is None:
+        _write_behind = WriteBehindBuffer()
+        QUEUE_DEPTH.callback = _write_behind.get_depth
+    return _write_behind